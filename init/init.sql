@@ -1,5 +1,17 @@
 -- Barber Booking SaaS Database Schema
 
+-- btree_gist lets the appointments exclusion constraint mix = and && operators
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+-- pg_trgm indexes customer names and phone numbers for fuzzy and partial search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Time range occupied by an appointment. Minute intervals never depend on the
+-- session timezone, so the function is safe to mark IMMUTABLE and index.
+CREATE OR REPLACE FUNCTION appointment_period(start_at TIMESTAMP WITH TIME ZONE, minutes INTEGER)
+RETURNS TSTZRANGE AS $$
+    SELECT tstzrange(start_at, start_at + make_interval(mins => minutes));
+$$ LANGUAGE sql IMMUTABLE;
+
 -- Shops table
 CREATE TABLE shops (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -23,7 +35,9 @@ CREATE TABLE barbers (
     working_hours JSONB NOT NULL DEFAULT '[]', -- Array of {start: "08:00", end: "12:45"}
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Target of the appointments (barber_id, shop_id) foreign key
+    CONSTRAINT barbers_id_shop_id_key UNIQUE (id, shop_id)
 );
 
 -- Services table
@@ -57,14 +71,58 @@ CREATE TABLE customers (
     name VARCHAR(255) NOT NULL,
     email VARCHAR(255),
     phone VARCHAR(20) NOT NULL,
+    -- E.164 form of phone ("+1-555-9001" -> "+15559001"); numbers are stored
+    -- with their country code, and a leading 00 is read as +
+    phone_e164 VARCHAR(24) GENERATED ALWAYS AS (
+        '+' || regexp_replace(regexp_replace(phone, '^\s*00', ''), '\D', '', 'g')
+    ) STORED,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
--- Appointments table
-CREATE TABLE appointments (
+-- Recurring appointments ("every 2 weeks on Tuesday at 10:00"): an
+-- RRULE-style pattern (FREQ, INTERVAL as every, BYDAY as weekdays, UNTIL,
+-- COUNT as max_occurrences) in the shop's local time. Occurrences up to
+-- materialized_until are appointments rows carrying series_id; later ones are
+-- only computed when read. Reads and `python -m app.cli extend-series` move
+-- materialized_until forward; occurrences that were not free when they were
+-- materialized are recorded in skipped_dates instead.
+CREATE TABLE appointment_series (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    barber_id UUID NOT NULL REFERENCES barbers(id) ON DELETE CASCADE,
+    shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+    barber_id UUID NOT NULL,
+    customer_id UUID NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
+    service_id UUID NOT NULL REFERENCES services(id) ON DELETE RESTRICT,
+    frequency VARCHAR(10) NOT NULL CHECK (frequency IN ('daily', 'weekly', 'monthly')),
+    every INTEGER NOT NULL DEFAULT 1 CHECK (every BETWEEN 1 AND 52),
+    weekdays TEXT[] NOT NULL DEFAULT '{}', -- weekly only; empty means the weekday of start_date
+    start_date DATE NOT NULL,
+    start_time TIME NOT NULL, -- shop-local wall-clock time
+    until DATE,
+    max_occurrences INTEGER CHECK (max_occurrences > 0),
+    duration_minutes INTEGER NOT NULL,
+    price INTEGER NOT NULL, -- in cents, per occurrence
+    discount INTEGER DEFAULT 0,
+    booking_fee INTEGER DEFAULT 0,
+    surcharge INTEGER DEFAULT 0,
+    notes TEXT,
+    materialized_until DATE NOT NULL,
+    skipped_dates DATE[] NOT NULL DEFAULT '{}',
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (barber_id, shop_id) REFERENCES barbers(id, shop_id) ON DELETE CASCADE,
+    CONSTRAINT check_series_weekdays_valid
+        CHECK (weekdays <@ ARRAY['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'])
+);
+
+-- Appointments table, hash-partitioned by shop: each shop's bookings live in
+-- one partition, so per-shop queries that filter on shop_id only touch that
+-- partition. The primary key has to include the partition key.
+CREATE TABLE appointments (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+    barber_id UUID NOT NULL,
     customer_id UUID NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
     service_id UUID NOT NULL REFERENCES services(id) ON DELETE RESTRICT,
     appointment_date TIMESTAMP WITH TIME ZONE NOT NULL,
@@ -76,21 +134,122 @@ CREATE TABLE appointments (
     total_price INTEGER GENERATED ALWAYS AS (price - discount + booking_fee + surcharge) STORED,
     status VARCHAR(20) DEFAULT 'scheduled' CHECK (status IN ('scheduled', 'confirmed', 'in_progress', 'completed', 'cancelled', 'no_show')),
     notes TEXT,
+    -- Set on occurrences of a recurring appointment
+    series_id UUID REFERENCES appointment_series(id) ON DELETE SET NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, shop_id),
+    -- Keeps shop_id in step with the barber's shop
+    FOREIGN KEY (barber_id, shop_id) REFERENCES barbers(id, shop_id) ON DELETE CASCADE
+) PARTITION BY HASH (shop_id);
+
+-- Partitions. Exclusion constraints can't be declared on a partitioned table,
+-- so each partition gets its own; a barber's appointments all share the
+-- barber's shop, and so one partition, which makes that sufficient.
+-- No two active appointments may overlap for the same barber.
+DO $$
+DECLARE
+    partition_name TEXT;
+BEGIN
+    FOR remainder IN 0..15 LOOP
+        partition_name := format('appointments_p%s', lpad(remainder::text, 2, '0'));
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF appointments FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            partition_name, remainder
+        );
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist ('
+            'barber_id WITH =, appointment_period(appointment_date, duration_minutes) WITH &&'
+            ') WHERE (status NOT IN (''cancelled'', ''no_show''))',
+            partition_name, partition_name || '_no_overlap'
+        );
+    END LOOP;
+END $$;
+
+-- Archive of finished appointments (completed, cancelled or no_show) older
+-- than ARCHIVE_AFTER_DAYS, moved out of appointments in small batches by
+-- `python -m app.cli archive-appointments`, so the hot table and its indexes
+-- only hold the recent past. Same columns, with total_price stored as it was
+-- and when each row was archived. No exclusion constraint: none of these
+-- rows block a barber's time. Rows are never updated, so pages are packed full.
+CREATE TABLE appointments_archive (
+    id UUID PRIMARY KEY,
+    shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+    barber_id UUID NOT NULL,
+    customer_id UUID NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
+    service_id UUID NOT NULL REFERENCES services(id) ON DELETE RESTRICT,
+    appointment_date TIMESTAMP WITH TIME ZONE NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    discount INTEGER DEFAULT 0,
+    booking_fee INTEGER DEFAULT 0,
+    surcharge INTEGER DEFAULT 0,
+    total_price INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    notes TEXT,
+    series_id UUID REFERENCES appointment_series(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (barber_id, shop_id) REFERENCES barbers(id, shop_id) ON DELETE CASCADE
+) WITH (fillfactor = 100);
+
+-- Idempotency-Key store for booking writes: the response to the first
+-- request with each key, replayed to retries of it until expires_at.
+-- status_code is NULL while that first request is still running. The API
+-- workers delete expired rows.
+CREATE TABLE idempotency_keys (
+    key VARCHAR(255) PRIMARY KEY,
+    fingerprint BYTEA NOT NULL, -- sha256 of the method, path, query and body
+    status_code SMALLINT,
+    content_type VARCHAR(100),
+    body BYTEA,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
 
 -- Indexes for performance
 CREATE INDEX idx_barbers_shop_id ON barbers(shop_id);
 CREATE INDEX idx_services_shop_id ON services(shop_id);
 CREATE INDEX idx_surcharge_settings_barber_id ON surcharge_settings(barber_id);
-CREATE INDEX idx_appointments_barber_id ON appointments(barber_id);
+-- Indexes on appointments are created on every partition
+CREATE INDEX idx_appointments_barber_date ON appointments(barber_id, appointment_date);
+CREATE INDEX idx_appointments_shop_date ON appointments(shop_id, appointment_date);
 CREATE INDEX idx_appointments_customer_id ON appointments(customer_id);
 CREATE INDEX idx_appointments_service_id ON appointments(service_id);
-CREATE INDEX idx_appointments_date ON appointments(appointment_date);
+CREATE INDEX idx_appointments_date ON appointments(appointment_date, id);
 CREATE INDEX idx_appointments_status ON appointments(status);
+CREATE INDEX idx_appointments_series ON appointments(series_id, appointment_date);
+-- Finished appointments in date order, for the archiver
+CREATE INDEX idx_appointments_archivable ON appointments(appointment_date)
+    WHERE (status IN ('completed', 'cancelled', 'no_show'));
+-- The archive is read by id and by shop; the rest serve its foreign keys
+CREATE INDEX idx_appointments_archive_shop_date ON appointments_archive(shop_id, appointment_date);
+-- Exports read the archive in (appointment_date, id) order, as they do appointments
+CREATE INDEX idx_appointments_archive_date ON appointments_archive(appointment_date, id);
+CREATE INDEX idx_appointments_archive_barber_id ON appointments_archive(barber_id);
+CREATE INDEX idx_appointments_archive_customer_id ON appointments_archive(customer_id);
+CREATE INDEX idx_appointments_archive_service_id ON appointments_archive(service_id);
+CREATE INDEX idx_appointments_archive_series ON appointments_archive(series_id) WHERE series_id IS NOT NULL;
+CREATE INDEX idx_appointment_series_barber_id ON appointment_series(barber_id);
+-- Series whose booked occurrences need extending (extend-series)
+CREATE INDEX idx_appointment_series_materialized ON appointment_series(materialized_until) WHERE is_active;
+CREATE INDEX idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
 CREATE INDEX idx_customers_phone ON customers(phone);
 CREATE INDEX idx_customers_email ON customers(email);
+-- Customer search (GET /customers/search): exact and partial phone numbers,
+-- case-insensitive email prefixes (the C collation lets LIKE 'prefix%' and
+-- ORDER BY use the index), and typo-tolerant nearest-first name matching
+CREATE INDEX idx_customers_phone_e164 ON customers(phone_e164);
+CREATE INDEX idx_customers_phone_e164_trgm ON customers USING gin (phone_e164 gin_trgm_ops);
+CREATE INDEX idx_customers_email_lower ON customers((lower(email) COLLATE "C"));
+CREATE INDEX idx_customers_name_trgm ON customers USING gist (name gist_trgm_ops);
+-- Keyset pagination order for list endpoints: (created_at, id)
+CREATE INDEX idx_shops_created_at ON shops(created_at, id);
+CREATE INDEX idx_barbers_created_at ON barbers(created_at, id);
+CREATE INDEX idx_services_created_at ON services(created_at, id);
+CREATE INDEX idx_customers_created_at ON customers(created_at, id);
+CREATE INDEX idx_surcharge_settings_created_at ON surcharge_settings(barber_id, created_at, id);
 
 -- Constraints to ensure data integrity
 ALTER TABLE barbers ADD CONSTRAINT check_days_valid 
@@ -111,6 +270,182 @@ CREATE TRIGGER update_services_updated_at BEFORE UPDATE ON services FOR EACH ROW
 CREATE TRIGGER update_surcharge_settings_updated_at BEFORE UPDATE ON surcharge_settings FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_customers_updated_at BEFORE UPDATE ON customers FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_appointments_updated_at BEFORE UPDATE ON appointments FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_appointment_series_updated_at BEFORE UPDATE ON appointment_series FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Daily rollups behind GET /shops/{id}/stats: appointment count and
+-- total_price sum per shop, barber, shop-local day and status. Statement
+-- triggers keep them current from every write to appointments; each
+-- statement applies one aggregated delta per group, so bulk inserts cost one
+-- upsert per (barber, day, status) rather than one per row.
+-- `python -m app.cli reconcile-stats` checks them against appointments.
+CREATE TABLE appointment_daily_stats (
+    shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+    day DATE NOT NULL, -- in the shop's timezone
+    barber_id UUID NOT NULL REFERENCES barbers(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL,
+    appointments INTEGER NOT NULL DEFAULT 0,
+    total_price_sum BIGINT NOT NULL DEFAULT 0, -- in cents
+    PRIMARY KEY (shop_id, day, barber_id, status)
+);
+CREATE INDEX idx_appointment_daily_stats_barber_id ON appointment_daily_stats(barber_id);
+
+-- Adds the rows in new_rows and subtracts those in old_rows; an UPDATE only
+-- counts rows whose shop, barber, date, status or price changed, so editing
+-- notes leaves the rollups alone. The joins skip rows whose shop or barber
+-- is being deleted: their stats go with them by cascade. A NULL total_price
+-- (from a NULL discount or fee) adds nothing to total_price_sum.
+CREATE OR REPLACE FUNCTION apply_appointment_daily_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO appointment_daily_stats AS stats (shop_id, day, barber_id, status, appointments, total_price_sum)
+        SELECT n.shop_id, (n.appointment_date AT TIME ZONE COALESCE(s.timezone, 'UTC'))::date, n.barber_id, n.status,
+               count(*), COALESCE(sum(n.total_price), 0)
+        FROM new_rows n
+        JOIN shops s ON s.id = n.shop_id
+        JOIN barbers b ON b.id = n.barber_id
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (shop_id, day, barber_id, status) DO UPDATE
+        SET appointments = stats.appointments + EXCLUDED.appointments,
+            total_price_sum = stats.total_price_sum + EXCLUDED.total_price_sum;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO appointment_daily_stats AS stats (shop_id, day, barber_id, status, appointments, total_price_sum)
+        SELECT o.shop_id, (o.appointment_date AT TIME ZONE COALESCE(s.timezone, 'UTC'))::date, o.barber_id, o.status,
+               -count(*), -COALESCE(sum(o.total_price), 0)
+        FROM old_rows o
+        JOIN shops s ON s.id = o.shop_id
+        JOIN barbers b ON b.id = o.barber_id
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (shop_id, day, barber_id, status) DO UPDATE
+        SET appointments = stats.appointments + EXCLUDED.appointments,
+            total_price_sum = stats.total_price_sum + EXCLUDED.total_price_sum;
+    ELSE
+        WITH changed AS (
+            SELECT o.id
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            WHERE (o.shop_id, o.barber_id, o.appointment_date, o.status, o.total_price)
+                IS DISTINCT FROM (n.shop_id, n.barber_id, n.appointment_date, n.status, n.total_price)
+        ), deltas AS (
+            SELECT shop_id, barber_id, appointment_date, status, -1 AS sign, total_price
+            FROM old_rows WHERE id IN (SELECT id FROM changed)
+            UNION ALL
+            SELECT shop_id, barber_id, appointment_date, status, 1, total_price
+            FROM new_rows WHERE id IN (SELECT id FROM changed)
+        )
+        INSERT INTO appointment_daily_stats AS stats (shop_id, day, barber_id, status, appointments, total_price_sum)
+        SELECT d.shop_id, (d.appointment_date AT TIME ZONE COALESCE(s.timezone, 'UTC'))::date, d.barber_id, d.status,
+               sum(d.sign), COALESCE(sum(d.sign * d.total_price), 0)
+        FROM deltas d
+        JOIN shops s ON s.id = d.shop_id
+        JOIN barbers b ON b.id = d.barber_id
+        GROUP BY 1, 2, 3, 4
+        HAVING sum(d.sign) <> 0 OR COALESCE(sum(d.sign * d.total_price), 0) <> 0
+        ON CONFLICT (shop_id, day, barber_id, status) DO UPDATE
+        SET appointments = stats.appointments + EXCLUDED.appointments,
+            total_price_sum = stats.total_price_sum + EXCLUDED.total_price_sum;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables can only fire on one event
+CREATE TRIGGER appointment_daily_stats_insert AFTER INSERT ON appointments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION apply_appointment_daily_stats();
+CREATE TRIGGER appointment_daily_stats_update AFTER UPDATE ON appointments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION apply_appointment_daily_stats();
+CREATE TRIGGER appointment_daily_stats_delete AFTER DELETE ON appointments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION apply_appointment_daily_stats();
+
+-- Live schedule events (GET /shops/{id}/events): every committed change to
+-- appointments is announced on the appointment_changes channel, which each
+-- API worker LISTENs on once and fans out to its connected calendars.
+-- `seq` ids the event for Last-Event-ID resumes; NOTIFY delivers in commit
+-- order, so every worker sees events in the same order.
+CREATE SEQUENCE appointment_event_seq;
+
+-- One notification per changed row, carrying the row as JSON, or without it
+-- if that would pass NOTIFY's 8000 byte payload limit (clients fetch the
+-- appointment instead). A statement touching more than 100 rows, such as an
+-- import, sends one "reset" per shop instead, telling clients to reload.
+CREATE OR REPLACE FUNCTION notify_appointment_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes REFCURSOR;
+    change RECORD;
+    changed_rows INTEGER;
+    payload JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT count(*) INTO changed_rows FROM old_rows;
+    ELSE
+        SELECT count(*) INTO changed_rows FROM new_rows;
+    END IF;
+
+    IF changed_rows > 100 THEN
+        IF TG_OP = 'INSERT' THEN
+            OPEN changes FOR SELECT DISTINCT shop_id FROM new_rows;
+        ELSIF TG_OP = 'UPDATE' THEN
+            OPEN changes FOR SELECT shop_id FROM new_rows UNION SELECT shop_id FROM old_rows;
+        ELSE
+            OPEN changes FOR SELECT DISTINCT shop_id FROM old_rows;
+        END IF;
+        LOOP
+            FETCH changes INTO change;
+            EXIT WHEN NOT FOUND;
+            PERFORM pg_notify('appointment_changes', jsonb_build_object(
+                'seq', nextval('appointment_event_seq'), 'op', 'reset', 'shop_id', change.shop_id
+            )::text);
+        END LOOP;
+        CLOSE changes;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        OPEN changes FOR
+            SELECT n.shop_id, n.barber_id, NULL::uuid AS previous_shop_id, NULL::uuid AS previous_barber_id,
+                   to_jsonb(n) AS appointment
+            FROM new_rows n;
+    ELSIF TG_OP = 'UPDATE' THEN
+        OPEN changes FOR
+            SELECT n.shop_id, n.barber_id, NULLIF(o.shop_id, n.shop_id) AS previous_shop_id,
+                   NULLIF(o.barber_id, n.barber_id) AS previous_barber_id, to_jsonb(n) AS appointment
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id;
+    ELSE
+        OPEN changes FOR
+            SELECT o.shop_id, o.barber_id, NULL::uuid AS previous_shop_id, NULL::uuid AS previous_barber_id,
+                   to_jsonb(o) AS appointment
+            FROM old_rows o;
+    END IF;
+    LOOP
+        FETCH changes INTO change;
+        EXIT WHEN NOT FOUND;
+        payload := jsonb_build_object(
+            'seq', nextval('appointment_event_seq'),
+            'op', lower(TG_OP),
+            'shop_id', change.shop_id,
+            'barber_id', change.barber_id,
+            'previous_shop_id', change.previous_shop_id,
+            'previous_barber_id', change.previous_barber_id,
+            'id', change.appointment->'id'
+        );
+        IF octet_length(change.appointment::text) < 7000 THEN
+            payload := payload || jsonb_build_object('appointment', change.appointment);
+        END IF;
+        PERFORM pg_notify('appointment_changes', payload::text);
+    END LOOP;
+    CLOSE changes;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_appointment_changes_insert AFTER INSERT ON appointments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_appointment_changes();
+CREATE TRIGGER notify_appointment_changes_update AFTER UPDATE ON appointments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_appointment_changes();
+CREATE TRIGGER notify_appointment_changes_delete AFTER DELETE ON appointments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_appointment_changes();
 
 -- Sample data insertion
 INSERT INTO shops (name, address, phone, email) VALUES 
@@ -149,8 +484,9 @@ INSERT INTO customers (name, email, phone) VALUES
     ('Bob Wilson', 'bob@email.com', '+1-555-9002');
 
 -- Sample appointment
-INSERT INTO appointments (barber_id, customer_id, service_id, appointment_date, duration_minutes, price, discount, booking_fee, surcharge) VALUES 
+INSERT INTO appointments (shop_id, barber_id, customer_id, service_id, appointment_date, duration_minutes, price, discount, booking_fee, surcharge) VALUES 
     (
+        (SELECT id FROM shops WHERE name = 'Downtown Cuts'),
         (SELECT id FROM barbers WHERE name = 'John Smith'),
         (SELECT id FROM customers WHERE name = 'Alice Cooper'),
         (SELECT id FROM services WHERE name = 'Basic Haircut'),
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from datetime import date
+from typing import List, Optional
+
+from ..database import get_db
+from ..schemas.appointment_series import (
+    AppointmentSeriesCreate,
+    AppointmentSeriesCreateResponse,
+    AppointmentSeriesResponse,
+    SeriesOccurrence,
+)
+from ..services.recurrence_service import recurrence_service
+
+router = APIRouter(prefix="/appointment-series", tags=["appointment-series"])
+
+@router.post("/", response_model=AppointmentSeriesCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_series(series_in: AppointmentSeriesCreate, response: Response, db: AsyncSession = Depends(get_db)):
+    result = await recurrence_service.create_series(db, series_in)
+    if not result.committed:
+        response.status_code = status.HTTP_409_CONFLICT
+    return result
+
+@router.get("/{series_id}", response_model=AppointmentSeriesResponse)
+async def get_series(series_id: UUID, db: AsyncSession = Depends(get_db)):
+    return await recurrence_service.get_series(db, series_id)
+
+# On the primary: reading past the booking horizon books the next occurrences first
+@router.get("/{series_id}/occurrences", response_model=List[SeriesOccurrence])
+async def list_occurrences(
+    series_id: UUID,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    return await recurrence_service.occurrences(db, series_id, date_from, date_to)
+
+@router.delete("/{series_id}", response_model=AppointmentSeriesResponse)
+async def end_series(series_id: UUID, db: AsyncSession = Depends(get_db)):
+    return await recurrence_service.end_series(db, series_id)
@@ -1,51 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete
 from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
 from uuid import UUID
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.appointment import Appointment
-from ..schemas.appointment import AppointmentCreate, AppointmentUpdate, AppointmentResponse
+from ..models.archived_appointment import ArchivedAppointment
+from ..schemas.appointment import (
+    AppointmentBatchRequest,
+    AppointmentBatchResponse,
+    AppointmentCreate,
+    AppointmentResponse,
+    AppointmentUpdate,
+)
+from ..schemas.expanded import ExpandedAppointmentResponse
+from ..services.booking_service import booking_service
+from ..services.export_service import EXPORT_MEDIA_TYPES, export_appointments
+from ..services.schedule_index import schedule_index
+from ..utils.expand import Expansions
+from ..utils.pagination import PageParams, paginate
+from ..utils.partitions import shop_of
+from ..utils.rows import fetch_row_json, json_response
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
+APPOINTMENT_EXPANSIONS = Expansions(
+    joinedload, barber=Appointment.barber, service=Appointment.service, customer=Appointment.customer
+)
+ARCHIVED_EXPANSIONS = Expansions(
+    joinedload,
+    barber=ArchivedAppointment.barber,
+    service=ArchivedAppointment.service,
+    customer=ArchivedAppointment.customer,
+)
+
 @router.post("/", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
 async def create_appointment(appointment_in: AppointmentCreate, db: AsyncSession = Depends(get_db)):
-    appointment = Appointment(**appointment_in.model_dump())
-    db.add(appointment)
-    await db.commit()
-    await db.refresh(appointment)
-    return appointment
+    return await booking_service.create_appointment(db, appointment_in)
 
-@router.get("/", response_model=List[AppointmentResponse])
-async def list_appointments(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Appointment))
-    appointments = result.scalars().all()
-    return appointments
+@router.post("/batch", response_model=AppointmentBatchResponse)
+async def batch_appointments(batch: AppointmentBatchRequest, response: Response, db: AsyncSession = Depends(get_db)):
+    result = await booking_service.apply_batch(db, batch)
+    if not result.committed:
+        response.status_code = status.HTTP_409_CONFLICT
+    return result
 
-@router.get("/{appointment_id}", response_model=AppointmentResponse)
-async def get_appointment(appointment_id: UUID, db: AsyncSession = Depends(get_db)):
-    appointment = await db.get(Appointment, appointment_id)
+@router.get("/", response_model=List[ExpandedAppointmentResponse], response_model_exclude_unset=True)
+async def list_appointments(
+    response: Response,
+    shop_id: Optional[UUID] = None,
+    barber_id: Optional[UUID] = None,
+    customer_id: Optional[UUID] = None,
+    service_id: Optional[UUID] = None,
+    status_in: Optional[List[str]] = Query(None, alias="status"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    expand: Optional[str] = Query(None, description=APPOINTMENT_EXPANSIONS.description),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    options = APPOINTMENT_EXPANSIONS.options(expand, page)
+    query = select(Appointment).options(*options)
+    # Filtering on shop_id lets Postgres read only that shop's partition
+    if shop_id is not None:
+        query = query.where(Appointment.shop_id == shop_id)
+    elif barber_id is not None:
+        query = query.where(Appointment.shop_id == shop_of(barber_id))
+    if barber_id is not None:
+        query = query.where(Appointment.barber_id == barber_id)
+    if customer_id is not None:
+        query = query.where(Appointment.customer_id == customer_id)
+    if service_id is not None:
+        query = query.where(Appointment.service_id == service_id)
+    if status_in:
+        query = query.where(Appointment.status.in_(status_in))
+    if date_from is not None:
+        query = query.where(Appointment.appointment_date >= date_from)
+    if date_to is not None:
+        query = query.where(Appointment.appointment_date < date_to)
+    return await paginate(
+        db,
+        query,
+        page,
+        response,
+        [Appointment.appointment_date, Appointment.id],
+        AppointmentResponse,
+        entities=bool(options),
+    )
+
+@router.get("/export")
+async def export_appointments_stream(
+    shop_id: Optional[UUID] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    filename = f"appointments.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        export_appointments(format, shop_id=shop_id, date_from=date_from, date_to=date_to),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/{appointment_id}", response_model=ExpandedAppointmentResponse, response_model_exclude_unset=True)
+async def get_appointment(
+    appointment_id: UUID,
+    expand: Optional[str] = Query(None, description=APPOINTMENT_EXPANSIONS.description),
+    db: AsyncSession = Depends(get_read_db),
+):
+    options = APPOINTMENT_EXPANSIONS.options(expand)
+    # Appointments that finished long ago are only in the archive
+    if not options:
+        body = await fetch_row_json(db, Appointment, AppointmentResponse, appointment_id)
+        if body is None:
+            body = await fetch_row_json(db, ArchivedAppointment, AppointmentResponse, appointment_id)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Appointment not found")
+        return json_response(body)
+    appointment = await db.get(Appointment, appointment_id, options=options)
+    if not appointment:
+        appointment = await db.get(ArchivedAppointment, appointment_id, options=ARCHIVED_EXPANSIONS.options(expand))
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return appointment
 
 @router.patch("/{appointment_id}", response_model=AppointmentResponse)
 async def update_appointment(appointment_id: UUID, appointment_in: AppointmentUpdate, db: AsyncSession = Depends(get_db)):
-    appointment = await db.get(Appointment, appointment_id)
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
-    for field, value in appointment_in.model_dump(exclude_unset=True).items():
-        setattr(appointment, field, value)
-    await db.commit()
-    await db.refresh(appointment)
-    return appointment
+    return await booking_service.update_appointment(db, appointment_id, appointment_in)
 
 @router.delete("/{appointment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_appointment(appointment_id: UUID, db: AsyncSession = Depends(get_db)):
-    appointment = await db.get(Appointment, appointment_id)
-    if not appointment:
+    barber_id = await db.scalar(
+        delete(Appointment).where(Appointment.id == appointment_id).returning(Appointment.barber_id)
+    )
+    if barber_id is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
-    await db.delete(appointment)
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    schedule_index.appointment_removed(barber_id, appointment_id) 
\ No newline at end of file
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from datetime import date
+from typing import Optional
+
+from ..database import get_db
+from ..schemas.availability import AvailabilityResponse
+from ..services.availability_service import MAX_WINDOW_DAYS, availability_service
+
+router = APIRouter(prefix="/shops/{shop_id}/availability", tags=["availability"])
+
+@router.get("/", response_model=AvailabilityResponse)
+async def get_shop_availability(
+    shop_id: UUID,
+    service_id: UUID,
+    start_date: Optional[date] = None,
+    days: int = Query(14, ge=1, le=MAX_WINDOW_DAYS),
+    barber_id: Optional[UUID] = None,
+    slot_minutes: int = Query(15, ge=1, le=240),
+    db: AsyncSession = Depends(get_db),
+):
+    return await availability_service.find_free_slots(
+        db,
+        shop_id=shop_id,
+        service_id=service_id,
+        start_date=start_date,
+        days=days,
+        barber_id=barber_id,
+        slot_minutes=slot_minutes,
+    )
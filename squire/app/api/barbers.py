@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.barber import Barber
 from ..schemas.barber import BarberCreate, BarberUpdate, BarberResponse
+from ..services.schedule_index import schedule_index
+from ..utils.cache import catalog_cache, entity_loader, etag_response
+from ..utils.crud import delete_by_id, update_by_id
+from ..utils.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/barbers", tags=["barbers"])
 
@@ -15,37 +19,46 @@ async def create_barber(barber_in: BarberCreate, db: AsyncSession = Depends(get_
     barber = Barber(**barber_in.model_dump())
     db.add(barber)
     await db.commit()
-    await db.refresh(barber)
+    schedule_index.barber_saved(barber)
     return barber
 
 @router.get("/", response_model=List[BarberResponse])
-async def list_barbers(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Barber))
-    barbers = result.scalars().all()
-    return barbers
+async def list_barbers(
+    response: Response,
+    shop_id: Optional[UUID] = None,
+    is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(Barber)
+    if shop_id is not None:
+        query = query.where(Barber.shop_id == shop_id)
+    if is_active is not None:
+        query = query.where(Barber.is_active == is_active)
+    return await paginate(db, query, page, response, [Barber.created_at, Barber.id], BarberResponse)
 
 @router.get("/{barber_id}", response_model=BarberResponse)
-async def get_barber(barber_id: UUID, db: AsyncSession = Depends(get_db)):
-    barber = await db.get(Barber, barber_id)
-    if not barber:
+async def get_barber(barber_id: UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    body = await catalog_cache.get_or_load(f"barber:{barber_id}", entity_loader(db, Barber, BarberResponse, barber_id))
+    if body is None:
         raise HTTPException(status_code=404, detail="Barber not found")
-    return barber
+    return etag_response(request, body)
 
 @router.patch("/{barber_id}", response_model=BarberResponse)
 async def update_barber(barber_id: UUID, barber_in: BarberUpdate, db: AsyncSession = Depends(get_db)):
-    barber = await db.get(Barber, barber_id)
+    barber = await update_by_id(db, Barber, barber_id, barber_in.model_dump(exclude_unset=True))
     if not barber:
         raise HTTPException(status_code=404, detail="Barber not found")
-    for field, value in barber_in.model_dump(exclude_unset=True).items():
-        setattr(barber, field, value)
     await db.commit()
-    await db.refresh(barber)
+    await catalog_cache.invalidate(f"barber:{barber_id}")
+    schedule_index.barber_saved(barber)
     return barber
 
 @router.delete("/{barber_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_barber(barber_id: UUID, db: AsyncSession = Depends(get_db)):
-    barber = await db.get(Barber, barber_id)
-    if not barber:
+    if not await delete_by_id(db, Barber, barber_id):
         raise HTTPException(status_code=404, detail="Barber not found")
-    await db.delete(barber)
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    await catalog_cache.invalidate(f"barber:{barber_id}")
+    await catalog_cache.invalidate_prefix(f"surcharge:{barber_id}:")
+    schedule_index.barber_removed(barber_id) 
\ No newline at end of file
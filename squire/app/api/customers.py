@@ -1,51 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.customer import Customer
 from ..schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse
+from ..schemas.expanded import ExpandedCustomerResponse
+from ..services.customer_search_service import customer_search_service
+from ..services.schedule_index import schedule_index
+from ..utils.crud import delete_by_id, update_by_id
+from ..utils.expand import Expansions
+from ..utils.pagination import PageParams, paginate
+from ..utils.rows import fetch_row_json, json_response, projected_columns, rows_json
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
+CUSTOMER_EXPANSIONS = Expansions(selectinload, appointments=Customer.appointments)
+
 @router.post("/", response_model=CustomerResponse, status_code=status.HTTP_201_CREATED)
 async def create_customer(customer_in: CustomerCreate, db: AsyncSession = Depends(get_db)):
     customer = Customer(**customer_in.model_dump())
     db.add(customer)
     await db.commit()
-    await db.refresh(customer)
     return customer
 
-@router.get("/", response_model=List[CustomerResponse])
-async def list_customers(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Customer))
-    customers = result.scalars().all()
-    return customers
+@router.get("/", response_model=List[ExpandedCustomerResponse], response_model_exclude_unset=True)
+async def list_customers(
+    response: Response,
+    expand: Optional[str] = Query(None, description=CUSTOMER_EXPANSIONS.description),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    options = CUSTOMER_EXPANSIONS.options(expand, page)
+    query = select(Customer).options(*options)
+    return await paginate(
+        db, query, page, response, [Customer.created_at, Customer.id], CustomerResponse, entities=bool(options)
+    )
+
+@router.get("/search", response_model=List[CustomerResponse])
+async def search_customers(
+    q: str = Query(..., min_length=2, max_length=100, description="Phone number (any part), email prefix or name"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    columns = projected_columns(Customer, CustomerResponse)
+    rows = await customer_search_service.search(db, q, limit, columns)
+    return json_response(rows_json(rows, columns))
 
-@router.get("/{customer_id}", response_model=CustomerResponse)
-async def get_customer(customer_id: UUID, db: AsyncSession = Depends(get_db)):
-    customer = await db.get(Customer, customer_id)
+@router.get("/{customer_id}", response_model=ExpandedCustomerResponse, response_model_exclude_unset=True)
+async def get_customer(
+    customer_id: UUID,
+    expand: Optional[str] = Query(None, description=CUSTOMER_EXPANSIONS.description),
+    db: AsyncSession = Depends(get_read_db),
+):
+    options = CUSTOMER_EXPANSIONS.options(expand)
+    if not options:
+        body = await fetch_row_json(db, Customer, CustomerResponse, customer_id)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return json_response(body)
+    customer = await db.get(Customer, customer_id, options=options)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
 @router.patch("/{customer_id}", response_model=CustomerResponse)
 async def update_customer(customer_id: UUID, customer_in: CustomerUpdate, db: AsyncSession = Depends(get_db)):
-    customer = await db.get(Customer, customer_id)
+    customer = await update_by_id(db, Customer, customer_id, customer_in.model_dump(exclude_unset=True))
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    for field, value in customer_in.model_dump(exclude_unset=True).items():
-        setattr(customer, field, value)
     await db.commit()
-    await db.refresh(customer)
     return customer
 
 @router.delete("/{customer_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_customer(customer_id: UUID, db: AsyncSession = Depends(get_db)):
-    customer = await db.get(Customer, customer_id)
-    if not customer:
+    if not await delete_by_id(db, Customer, customer_id):
         raise HTTPException(status_code=404, detail="Customer not found")
-    await db.delete(customer)
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    # The customer's appointments are removed by ON DELETE CASCADE
+    schedule_index.clear() 
\ No newline at end of file
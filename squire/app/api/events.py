@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from uuid import UUID
+from typing import Optional
+
+from ..services.schedule_events import schedule_events
+
+router = APIRouter(prefix="/shops/{shop_id}/events", tags=["events"])
+
+# Server-sent events for every change to a shop's appointments: "appointment"
+# events carry the operation and the row as the REST API returns it, "reset"
+# events mean the calendar may be stale and should be reloaded. Streams hold
+# no database connection.
+
+@router.get("/", response_class=StreamingResponse)
+async def stream_schedule_events(
+    shop_id: UUID,
+    request: Request,
+    barber_id: Optional[UUID] = None,
+    last_event_id: Optional[int] = Query(None, description="Resume after this event (or send Last-Event-ID)"),
+):
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        last_event_id = int(header) if header.isdigit() else 0
+    subscription = schedule_events.subscribe(shop_id, barber_id, last_event_id)
+    return StreamingResponse(
+        schedule_events.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
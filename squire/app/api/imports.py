@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, File, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from ..database import get_db
+from ..schemas.imports import ImportReport
+from ..services.import_service import import_service
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+@router.post("/", response_model=ImportReport)
+async def import_csv_files(
+    shops: Optional[UploadFile] = File(None),
+    barbers: Optional[UploadFile] = File(None),
+    services: Optional[UploadFile] = File(None),
+    customers: Optional[UploadFile] = File(None),
+    surcharge_settings: Optional[UploadFile] = File(None),
+    appointments: Optional[UploadFile] = File(None),
+    db: AsyncSession = Depends(get_db),
+):
+    uploads = {
+        "shops": shops,
+        "barbers": barbers,
+        "services": services,
+        "customers": customers,
+        "surcharge_settings": surcharge_settings,
+        "appointments": appointments,
+    }
+    sources = {name: upload.file for name, upload in uploads.items() if upload is not None}
+    return await import_service.import_files(db, sources)
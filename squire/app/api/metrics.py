@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..database import engine, replicas
+from ..utils.metrics import CONTENT_TYPE, request_metrics
+
+router = APIRouter(tags=["system"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    pools = [("primary", engine.pool.stats()), *((replica.name, replica.engine.pool.stats()) for replica in replicas.replicas)]
+    return PlainTextResponse(request_metrics.render(pools), media_type=CONTENT_TYPE)
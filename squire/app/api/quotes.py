@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..schemas.quote import QuoteBatchRequest, QuoteBatchResponse
+from ..services.pricing_service import pricing_service
+
+router = APIRouter(prefix="/quotes", tags=["quotes"])
+
+@router.post("/batch", response_model=QuoteBatchResponse)
+async def quote_batch(batch: QuoteBatchRequest, db: AsyncSession = Depends(get_db)):
+    return await pricing_service.quote_batch(db, batch.candidates)
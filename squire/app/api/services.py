@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.service import Service
 from ..schemas.service import ServiceCreate, ServiceUpdate, ServiceResponse
+from ..utils.cache import catalog_cache, entity_loader, etag_response
+from ..utils.crud import delete_by_id, update_by_id
+from ..utils.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/services", tags=["services"])
 
@@ -15,37 +18,42 @@ async def create_service(service_in: ServiceCreate, db: AsyncSession = Depends(g
     service = Service(**service_in.model_dump())
     db.add(service)
     await db.commit()
-    await db.refresh(service)
     return service
 
 @router.get("/", response_model=List[ServiceResponse])
-async def list_services(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Service))
-    services = result.scalars().all()
-    return services
+async def list_services(
+    response: Response,
+    shop_id: Optional[UUID] = None,
+    is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(Service)
+    if shop_id is not None:
+        query = query.where(Service.shop_id == shop_id)
+    if is_active is not None:
+        query = query.where(Service.is_active == is_active)
+    return await paginate(db, query, page, response, [Service.created_at, Service.id], ServiceResponse)
 
 @router.get("/{service_id}", response_model=ServiceResponse)
-async def get_service(service_id: UUID, db: AsyncSession = Depends(get_db)):
-    service = await db.get(Service, service_id)
-    if not service:
+async def get_service(service_id: UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    body = await catalog_cache.get_or_load(f"service:{service_id}", entity_loader(db, Service, ServiceResponse, service_id))
+    if body is None:
         raise HTTPException(status_code=404, detail="Service not found")
-    return service
+    return etag_response(request, body)
 
 @router.patch("/{service_id}", response_model=ServiceResponse)
 async def update_service(service_id: UUID, service_in: ServiceUpdate, db: AsyncSession = Depends(get_db)):
-    service = await db.get(Service, service_id)
+    service = await update_by_id(db, Service, service_id, service_in.model_dump(exclude_unset=True))
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
-    for field, value in service_in.model_dump(exclude_unset=True).items():
-        setattr(service, field, value)
     await db.commit()
-    await db.refresh(service)
+    await catalog_cache.invalidate(f"service:{service_id}")
     return service
 
 @router.delete("/{service_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_service(service_id: UUID, db: AsyncSession = Depends(get_db)):
-    service = await db.get(Service, service_id)
-    if not service:
+    if not await delete_by_id(db, Service, service_id):
         raise HTTPException(status_code=404, detail="Service not found")
-    await db.delete(service)
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    await catalog_cache.invalidate(f"service:{service_id}") 
\ No newline at end of file
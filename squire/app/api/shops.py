@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
 from typing import List
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.shop import Shop
 from ..schemas.shop import ShopCreate, ShopUpdate, ShopResponse
+from ..services.schedule_index import schedule_index
+from ..services.stats_service import stats_service
+from ..utils.cache import catalog_cache, entity_loader, etag_response
+from ..utils.crud import delete_by_id, update_by_id
+from ..utils.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/shops", tags=["shops"])
 
@@ -15,37 +20,43 @@ async def create_shop(shop_in: ShopCreate, db: AsyncSession = Depends(get_db)):
     shop = Shop(**shop_in.model_dump())
     db.add(shop)
     await db.commit()
-    await db.refresh(shop)
     return shop
 
 @router.get("/", response_model=List[ShopResponse])
-async def list_shops(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Shop))
-    shops = result.scalars().all()
-    return shops
+async def list_shops(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(Shop)
+    return await paginate(db, query, page, response, [Shop.created_at, Shop.id], ShopResponse)
 
 @router.get("/{shop_id}", response_model=ShopResponse)
-async def get_shop(shop_id: UUID, db: AsyncSession = Depends(get_db)):
-    shop = await db.get(Shop, shop_id)
-    if not shop:
+async def get_shop(shop_id: UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    body = await catalog_cache.get_or_load(f"shop:{shop_id}", entity_loader(db, Shop, ShopResponse, shop_id))
+    if body is None:
         raise HTTPException(status_code=404, detail="Shop not found")
-    return shop
+    return etag_response(request, body)
 
 @router.patch("/{shop_id}", response_model=ShopResponse)
 async def update_shop(shop_id: UUID, shop_in: ShopUpdate, db: AsyncSession = Depends(get_db)):
-    shop = await db.get(Shop, shop_id)
+    changes = shop_in.model_dump(exclude_unset=True)
+    shop = await update_by_id(db, Shop, shop_id, changes)
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
-    for field, value in shop_in.model_dump(exclude_unset=True).items():
-        setattr(shop, field, value)
+    if "timezone" in changes:
+        # Daily stats are bucketed by shop-local day
+        await stats_service.reconcile_shop(db, shop_id, shop.timezone or "UTC")
     await db.commit()
-    await db.refresh(shop)
+    await catalog_cache.invalidate(f"shop:{shop_id}")
+    schedule_index.shop_saved(shop)
     return shop
 
 @router.delete("/{shop_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_shop(shop_id: UUID, db: AsyncSession = Depends(get_db)):
-    shop = await db.get(Shop, shop_id)
-    if not shop:
+    if not await delete_by_id(db, Shop, shop_id):
         raise HTTPException(status_code=404, detail="Shop not found")
-    await db.delete(shop)
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    # Barbers, services and surcharge settings go with the shop (ON DELETE CASCADE)
+    await catalog_cache.invalidate_prefix("")
+    schedule_index.clear() 
\ No newline at end of file
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from datetime import date
+from typing import Optional
+
+from ..database import get_read_db
+from ..schemas.stats import ShopStatsResponse
+from ..services.stats_service import MAX_STATS_DAYS, stats_service
+
+router = APIRouter(prefix="/shops/{shop_id}/stats", tags=["stats"])
+
+@router.get("/", response_model=ShopStatsResponse)
+async def get_shop_stats(
+    shop_id: UUID,
+    start_date: Optional[date] = Query(None, description="First day, shop time (default: days before today)"),
+    days: int = Query(30, ge=1, le=MAX_STATS_DAYS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await stats_service.shop_stats(db, shop_id=shop_id, start_date=start_date, days=days)
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
 from typing import List
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.surcharge_setting import SurchargeSetting
 from ..schemas.surcharge_setting import SurchargeSettingCreate, SurchargeSettingUpdate, SurchargeSettingResponse
+from ..utils.cache import catalog_cache, entity_loader, etag_response
+from ..utils.crud import delete_by_id, update_by_id
+from ..utils.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/barbers/{barber_id}/surcharges", tags=["surcharge_settings"])
 
@@ -15,37 +18,39 @@ async def create_surcharge_setting(barber_id: UUID, surcharge_in: SurchargeSetti
     surcharge = SurchargeSetting(**surcharge_in.model_dump(), barber_id=barber_id)
     db.add(surcharge)
     await db.commit()
-    await db.refresh(surcharge)
     return surcharge
 
 @router.get("/", response_model=List[SurchargeSettingResponse])
-async def list_surcharge_settings(barber_id: UUID, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(SurchargeSetting).where(SurchargeSetting.barber_id == barber_id))
-    surcharges = result.scalars().all()
-    return surcharges
+async def list_surcharge_settings(
+    barber_id: UUID,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(SurchargeSetting).where(SurchargeSetting.barber_id == barber_id)
+    return await paginate(
+        db, query, page, response, [SurchargeSetting.created_at, SurchargeSetting.id], SurchargeSettingResponse
+    )
 
 @router.get("/{surcharge_id}", response_model=SurchargeSettingResponse)
-async def get_surcharge_setting(barber_id: UUID, surcharge_id: UUID, db: AsyncSession = Depends(get_db)):
-    surcharge = await db.get(SurchargeSetting, surcharge_id)
-    if not surcharge or surcharge.barber_id != barber_id:
+async def get_surcharge_setting(barber_id: UUID, surcharge_id: UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    body = await catalog_cache.get_or_load(f"surcharge:{barber_id}:{surcharge_id}", entity_loader(db, SurchargeSetting, SurchargeSettingResponse, surcharge_id, SurchargeSetting.barber_id == barber_id))
+    if body is None:
         raise HTTPException(status_code=404, detail="Surcharge setting not found")
-    return surcharge
+    return etag_response(request, body)
 
 @router.patch("/{surcharge_id}", response_model=SurchargeSettingResponse)
 async def update_surcharge_setting(barber_id: UUID, surcharge_id: UUID, surcharge_in: SurchargeSettingUpdate, db: AsyncSession = Depends(get_db)):
-    surcharge = await db.get(SurchargeSetting, surcharge_id)
-    if not surcharge or surcharge.barber_id != barber_id:
+    surcharge = await update_by_id(db, SurchargeSetting, surcharge_id, surcharge_in.model_dump(exclude_unset=True), SurchargeSetting.barber_id == barber_id)
+    if not surcharge:
         raise HTTPException(status_code=404, detail="Surcharge setting not found")
-    for field, value in surcharge_in.model_dump(exclude_unset=True).items():
-        setattr(surcharge, field, value)
     await db.commit()
-    await db.refresh(surcharge)
+    await catalog_cache.invalidate(f"surcharge:{barber_id}:{surcharge_id}")
     return surcharge
 
 @router.delete("/{surcharge_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_surcharge_setting(barber_id: UUID, surcharge_id: UUID, db: AsyncSession = Depends(get_db)):
-    surcharge = await db.get(SurchargeSetting, surcharge_id)
-    if not surcharge or surcharge.barber_id != barber_id:
+    if not await delete_by_id(db, SurchargeSetting, surcharge_id, SurchargeSetting.barber_id == barber_id):
         raise HTTPException(status_code=404, detail="Surcharge setting not found")
-    await db.delete(surcharge)
-    await db.commit() 
\ No newline at end of file
+    await db.commit()
+    await catalog_cache.invalidate(f"surcharge:{barber_id}:{surcharge_id}") 
\ No newline at end of file
@@ -0,0 +1,70 @@
+from typing import List
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..database import engine, replicas
+from ..schemas.system import (
+    CacheStats,
+    CoalescingStats,
+    EventStats,
+    IdempotencyStats,
+    InvalidationStats,
+    PoolStats,
+    ProfileCapture,
+    ReplicaStats,
+    StartupStats,
+)
+from ..services.exceptions import NotFoundError
+from ..services.schedule_events import schedule_events
+from ..utils.cache import catalog_cache
+from ..utils.coalesce import read_flights
+from ..utils.idempotency import idempotency_store
+from ..utils.invalidation import invalidations
+from ..utils.profiling import profile_captures
+from ..utils.startup import startup_clock
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+@router.get("/cache", response_model=CacheStats)
+async def cache_stats():
+    return catalog_cache.stats()
+
+@router.get("/pool", response_model=PoolStats)
+async def pool_stats():
+    return engine.pool.stats()
+
+@router.get("/replicas", response_model=List[ReplicaStats])
+async def replica_stats():
+    return replicas.stats()
+
+@router.get("/events", response_model=EventStats)
+async def event_stats():
+    return schedule_events.stats()
+
+@router.get("/invalidations", response_model=InvalidationStats)
+async def invalidation_stats():
+    return invalidations.stats()
+
+@router.get("/idempotency", response_model=IdempotencyStats)
+async def idempotency_stats():
+    return idempotency_store.stats()
+
+@router.get("/coalescing", response_model=CoalescingStats)
+async def coalescing_stats():
+    return read_flights.stats()
+
+@router.get("/startup", response_model=StartupStats)
+async def startup_stats():
+    return startup_clock.stats()
+
+@router.get("/profiles", response_model=List[ProfileCapture])
+async def list_profiles():
+    return profile_captures.list()
+
+@router.get("/profiles/{capture_id}", response_class=PlainTextResponse)
+async def get_profile(capture_id: str):
+    capture = profile_captures.get(capture_id)
+    if capture is None:
+        raise NotFoundError("Profile not found")
+    return capture["output"]
@@ -0,0 +1,169 @@
+"""Command line entry points for batch jobs.
+
+Run from the squire/ directory, e.g.:
+
+    poetry run python -m app.cli export-appointments --shop-id <uuid> --format csv -o out.csv
+    poetry run python -m app.cli import-csv ../booking
+    poetry run python -m app.cli partition-appointments --partitions 16
+    poetry run python -m app.cli reconcile-stats --since 2024-01-01
+    poetry run python -m app.cli extend-series
+    poetry run python -m app.cli archive-appointments --older-than-days 365
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from datetime import date, datetime
+
+from .database import AsyncSessionLocal
+from .services.archive_service import archive_service
+from .services.exceptions import ServiceError
+from .services.export_service import EXPORT_MEDIA_TYPES, export_appointments
+from .services.import_service import TABLES_BY_NAME, import_service
+from .services.partition_service import DEFAULT_PARTITIONS, partition_service
+from .services.recurrence_service import recurrence_service
+from .services.stats_service import stats_service
+
+
+async def run_export_appointments(args: argparse.Namespace) -> None:
+    output = open(args.output, "w", newline="") if args.output != "-" else sys.stdout
+    try:
+        async for chunk in export_appointments(
+            args.format, shop_id=args.shop_id, date_from=args.date_from, date_to=args.date_to
+        ):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+async def run_import_csv(args: argparse.Namespace) -> None:
+    sources = {
+        name: os.path.join(args.directory, f"{name}.csv")
+        for name in TABLES_BY_NAME
+        if os.path.exists(os.path.join(args.directory, f"{name}.csv"))
+    }
+    async with AsyncSessionLocal() as session:
+        report = await import_service.import_files(session, sources)
+    for result in report.tables:
+        print(f"{result.table}: {result.imported}/{result.rows} imported, {result.failed} failed")
+        for error in result.errors:
+            print(f"  row {error.row}: {error.message}")
+
+
+async def run_partition_appointments(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as session:
+        report = await partition_service.migrate(
+            session, args.partitions, keep_legacy=args.keep_old, cancel_overlaps=args.cancel_overlaps
+        )
+    if report.overlaps_cancelled:
+        print(f"appointments: {report.overlaps_cancelled} overlapping bookings cancelled (the earliest made was kept)")
+    print(f"appointments: {report.rows_moved} rows moved into {report.partitions} hash partitions by shop")
+    if report.legacy_table_kept:
+        print("the old table was kept as appointments_unpartitioned")
+
+
+async def run_reconcile_stats(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as session:
+        report = await stats_service.reconcile(session, shop_id=args.shop_id, since=args.since, repair=not args.dry_run)
+    for mismatch in report.mismatches[: args.show]:
+        print(
+            f"  shop {mismatch.shop_id} {mismatch.day} barber {mismatch.barber_id} {mismatch.status}: "
+            f"expected {mismatch.expected}, found {mismatch.actual}"
+        )
+    action = "repaired" if report.repaired else "found"
+    print(
+        f"appointment_daily_stats: {report.groups} groups in {report.shops} shops checked, "
+        f"{len(report.mismatches)} mismatches {action}"
+    )
+    if report.mismatches and not report.repaired:
+        sys.exit(1)
+
+
+async def run_extend_series(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as session:
+        checked, booked = await recurrence_service.extend_all(session)
+    print(f"appointment_series: {checked} series checked, {booked} appointments booked")
+
+
+async def run_archive_appointments(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as session:
+        report = await archive_service.archive(
+            session, older_than_days=args.older_than_days, batch_size=args.batch_size, max_batches=args.max_batches
+        )
+    for table, moved in report.partitions.items():
+        if moved:
+            print(f"  {table}: {moved}")
+    print(
+        f"appointments_archive: {report.moved} appointments finished before {report.cutoff:%Y-%m-%d} "
+        f"moved in {report.batches} batches"
+    )
+    if report.incomplete:
+        print("stopped at --max-batches; run again to continue")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="app.cli", description="Barber Booking batch jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export-appointments", help="Stream appointments as NDJSON or CSV")
+    export.add_argument("--shop-id", type=uuid.UUID)
+    export.add_argument("--date-from", type=datetime.fromisoformat)
+    export.add_argument("--date-to", type=datetime.fromisoformat)
+    export.add_argument("--format", choices=sorted(EXPORT_MEDIA_TYPES), default="ndjson")
+    export.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    export.set_defaults(handler=run_export_appointments)
+
+    importer = commands.add_parser("import-csv", help="Bulk load <table>.csv files from a directory")
+    importer.add_argument("directory", help="Directory holding files in the booking/*.csv format")
+    importer.set_defaults(handler=run_import_csv)
+
+    partition = commands.add_parser(
+        "partition-appointments", help="Move appointments into a table hash-partitioned by shop"
+    )
+    partition.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+    partition.add_argument("--keep-old", action="store_true", help="Keep the old table as appointments_unpartitioned")
+    partition.add_argument(
+        "--cancel-overlaps",
+        action="store_true",
+        help="Cancel bookings overlapping an earlier-made one for the same barber, instead of stopping",
+    )
+    partition.set_defaults(handler=run_partition_appointments)
+
+    reconcile = commands.add_parser(
+        "reconcile-stats", help="Check the daily stats rollups against appointments and fix any drift"
+    )
+    reconcile.add_argument("--shop-id", type=uuid.UUID)
+    reconcile.add_argument("--since", type=date.fromisoformat, help="Only days from this date on (shop time)")
+    reconcile.add_argument("--dry-run", action="store_true", help="Report mismatches without fixing them")
+    reconcile.add_argument("--show", type=int, default=20, help="Mismatches to print")
+    reconcile.set_defaults(handler=run_reconcile_stats)
+
+    extend = commands.add_parser(
+        "extend-series", help="Book recurring appointments up to the horizon (run daily, e.g. from cron)"
+    )
+    extend.set_defaults(handler=run_extend_series)
+
+    archive = commands.add_parser(
+        "archive-appointments", help="Move old completed, cancelled and no-show appointments to the archive"
+    )
+    archive.add_argument("--older-than-days", type=int, help="Default: ARCHIVE_AFTER_DAYS")
+    archive.add_argument("--batch-size", type=int, help="Rows per transaction (default: ARCHIVE_BATCH_SIZE)")
+    archive.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    archive.set_defaults(handler=run_archive_appointments)
+    return parser
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+    try:
+        asyncio.run(args.handler(args))
+    except ServiceError as error:
+        # e.g. archive-appointments on an unpartitioned table: a reason, not a traceback, for cron
+        parser.exit(1, f"{parser.prog} {args.command}: error: {error}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,137 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import Request
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
+from .utils.replicas import ReplicaSet, primary_pinned
+from .utils.sql_logging import install_sql_logging
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_total": round(self.wait_seconds * 1000, 3),
+            "wait_ms_avg": round(self.wait_seconds * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            "wait_ms_max": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+def connect_args() -> dict:
+    args = {
+        "server_settings": {
+            "application_name": "squire",
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+            # Cut-off for the `<%` operator used by customer name search
+            "pg_trgm.word_similarity_threshold": str(settings.CUSTOMER_SEARCH_SIMILARITY),
+        },
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+    }
+    if settings.DB_PREPARED_STATEMENTS:
+        args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    else:
+        # pgbouncer in transaction mode can't keep prepared statements per
+        # connection; unnamed statements are also needed so names don't clash
+        args["statement_cache_size"] = 0
+        args["prepared_statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    return args
+
+
+def build_engine(url: str) -> AsyncEngine:
+    """An engine with the configured pool and driver settings, for the primary or a replica."""
+    built = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=connect_args(),
+    )
+    install_sql_logging(built.sync_engine, settings.SQL_LOG_SAMPLE_RATE, settings.SQL_SLOW_MS)
+    return built
+
+
+engine = build_engine(DATABASE_URL)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+replicas = ReplicaSet(
+    [build_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    settings.DB_REPLICA_STRATEGY,
+    settings.DB_REPLICA_CHECK_SECONDS,
+    settings.DB_REPLICA_CHECK_TIMEOUT,
+)
+
+
+@asynccontextmanager
+async def read_session(pinned: bool = False) -> AsyncIterator[AsyncSession]:
+    """A session on a healthy replica, falling back to the primary.
+
+    The replica connection is opened up front so a dead replica is taken out
+    of rotation and the next one (or the primary) is tried before the
+    handler runs, rather than failing the request.
+    """
+    while not pinned and (replica := replicas.choose()) is not None:
+        session = AsyncSession(replica.engine, expire_on_commit=False)
+        try:
+            await session.connection()
+        except (OSError, asyncio.TimeoutError, exc.DBAPIError) as error:
+            await session.close()
+            replicas.mark_down(replica, error)
+            continue
+        async with session:
+            yield session
+        return
+    async with AsyncSessionLocal() as session:
+        yield session
+
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session 
\ No newline at end of file
+        yield session
+
+
+async def get_read_db(request: Request):
+    """Session for read-only handlers; clients that just wrote stay on the primary."""
+    async with read_session(pinned=primary_pinned(request)) as session:
+        yield session
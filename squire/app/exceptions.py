@@ -0,0 +1,14 @@
+class ServiceError(Exception):
+    """Base class for domain errors, mapped to HTTP errors in main.py."""
+
+
+class NotFoundError(ServiceError):
+    pass
+
+
+class ConflictError(ServiceError):
+    pass
+
+
+class InvalidRequestError(ServiceError):
+    pass
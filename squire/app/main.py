@@ -1,18 +1,98 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from .api.shops import router as shops_router
 from .api.barbers import router as barbers_router
 from .api.services import router as services_router
 from .api.appointments import router as appointments_router
+from .api.appointment_series import router as appointment_series_router
 from .api.customers import router as customers_router
 from .api.surcharge_settings import router as surcharge_settings_router
+from .api.availability import router as availability_router
+from .api.imports import router as imports_router
+from .api.quotes import router as quotes_router
+from .api.stats import router as stats_router
+from .api.events import router as events_router
+from .api.system import router as system_router
+from .api.metrics import router as metrics_router
+from .config import settings
+from .database import engine, replicas
+from .services.exceptions import ConflictError, InvalidRequestError, NotFoundError
+from .services.schedule_events import schedule_events
+from .utils.coalesce import CoalescingMiddleware, read_flights
+from .utils.idempotency import IdempotencyMiddleware, idempotency_store
+from .utils.invalidation import invalidations
+from .utils.profiling import install_profiling
+from .utils.replicas import PrimaryPinMiddleware
+from .utils.startup import startup_clock
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    replicas.start()
+    schedule_events.start()
+    invalidations.start()
+    idempotency_store.start()
+    startup_clock.mark("lifespan")
+    yield
+    await idempotency_store.stop()
+    await invalidations.stop()
+    await schedule_events.stop()
+    await replicas.stop()
+
 
-app = FastAPI(title="Barber Booking SaaS API")
+# Writes that honor Idempotency-Key, so clients can retry them safely
+IDEMPOTENT_ROUTES = (
+    ("POST", "/appointments/"),
+    ("POST", "/appointments/batch"),
+    ("PATCH", "/appointments/{appointment_id}"),
+    ("POST", "/appointment-series/"),
+)
+# Reads that many clients poll at once; identical concurrent ones share a response
+COALESCED_ROUTES = (
+    ("GET", "/appointments/"),
+    ("GET", "/appointments/{appointment_id}"),
+    ("GET", "/appointment-series/{series_id}/occurrences"),
+    ("GET", "/shops/{shop_id}/availability/"),
+    ("GET", "/shops/{shop_id}/stats/"),
+)
+
+app = FastAPI(title="Barber Booking SaaS API", lifespan=lifespan)
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store, routes=IDEMPOTENT_ROUTES)
+if settings.COALESCE_READS:
+    app.add_middleware(CoalescingMiddleware, flights=read_flights, routes=COALESCED_ROUTES)
+if replicas:
+    app.add_middleware(PrimaryPinMiddleware, seconds=settings.READ_YOUR_WRITES_SECONDS)
 
 app.include_router(shops_router)
 app.include_router(barbers_router)
 app.include_router(services_router)
 app.include_router(appointments_router)
+app.include_router(appointment_series_router)
 app.include_router(customers_router)
 app.include_router(surcharge_settings_router)
+app.include_router(availability_router)
+app.include_router(imports_router)
+app.include_router(quotes_router)
+app.include_router(stats_router)
+app.include_router(events_router)
+app.include_router(system_router)
+
+# Domain errors raised by the service layer map to HTTP status codes here
+@app.exception_handler(NotFoundError)
+async def not_found_handler(request: Request, exc: NotFoundError):
+    return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": str(exc)})
+
+@app.exception_handler(ConflictError)
+async def conflict_handler(request: Request, exc: ConflictError):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidRequestError)
+async def invalid_request_handler(request: Request, exc: InvalidRequestError):
+    return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content={"detail": str(exc)})
 
-# Routers will be included here 
+# Last, so every route above is instrumented
+if settings.PROFILING_ENABLED:
+    app.include_router(metrics_router)
+    install_profiling(app, [engine.sync_engine, *(replica.engine.sync_engine for replica in replicas.replicas)])
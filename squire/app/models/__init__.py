@@ -2,4 +2,6 @@
 from sqlalchemy.orm import DeclarativeBase
 
 class Base(DeclarativeBase):
-    pass 
\ No newline at end of file
+    # Fetch server-generated columns (created_at, updated_at, total_price) with
+    # RETURNING as part of the INSERT/UPDATE instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True} 
\ No newline at end of file
@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, Integer, TIMESTAMP, ForeignKey
+from sqlalchemy import String, Text, Integer, TIMESTAMP, ForeignKey, Computed, FetchedValue, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from . import Base
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    # Hash-partitioned by shop (see init/init.sql). The table's primary key is
+    # (id, shop_id); ids are still unique, so the mapper identifies rows by id
+    # alone and db.get(Appointment, id) keeps working.
+    __table_args__ = {"postgresql_partition_by": "HASH (shop_id)"}
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False)
     barber_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("barbers.id"))
     customer_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("customers.id"))
     service_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("services.id"))
@@ -18,10 +23,13 @@ class Appointment(Base):
     discount: Mapped[int] = mapped_column(Integer, default=0)
     booking_fee: Mapped[int] = mapped_column(Integer, default=0)
     surcharge: Mapped[int] = mapped_column(Integer, default=0)
+    total_price: Mapped[int] = mapped_column(Integer, Computed("price - discount + booking_fee + surcharge", persisted=True))
     status: Mapped[str] = mapped_column(String(20), default="scheduled")
     notes: Mapped[str] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    # Set on occurrences of a recurring appointment
+    series_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("appointment_series.id"))
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     barber = relationship("Barber")
     service = relationship("Service") 
@@ -0,0 +1,18 @@
+import uuid
+from datetime import date
+from sqlalchemy import String, Integer, BigInteger, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+from . import Base
+
+class AppointmentDailyStat(Base):
+    __tablename__ = "appointment_daily_stats"
+    # Appointment counts and total_price sums per shop, shop-local day, barber
+    # and status, kept current by triggers on appointments (see init/init.sql)
+
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    barber_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("barbers.id"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    appointments: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_price_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
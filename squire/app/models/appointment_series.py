@@ -0,0 +1,41 @@
+import uuid
+from datetime import date, datetime, time
+from sqlalchemy import String, Text, Integer, Boolean, Date, Time, TIMESTAMP, ForeignKey, FetchedValue, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from . import Base
+from typing import List, Optional
+
+class AppointmentSeries(Base):
+    __tablename__ = "appointment_series"
+    # A recurring appointment: an RRULE-style pattern in shop-local time. Its
+    # occurrences up to materialized_until are appointments rows with
+    # series_id set; later ones are computed on read (see init/init.sql)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False)
+    barber_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("barbers.id"), nullable=False)
+    customer_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=False)
+    service_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("services.id"), nullable=False)
+    frequency: Mapped[str] = mapped_column(String(10), nullable=False)
+    every: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    weekdays: Mapped[List[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
+    start_date: Mapped[date] = mapped_column(Date, nullable=False)
+    start_time: Mapped[time] = mapped_column(Time, nullable=False)
+    until: Mapped[Optional[date]] = mapped_column(Date)
+    max_occurrences: Mapped[Optional[int]] = mapped_column(Integer)
+    duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False)
+    price: Mapped[int] = mapped_column(Integer, nullable=False)
+    discount: Mapped[int] = mapped_column(Integer, default=0)
+    booking_fee: Mapped[int] = mapped_column(Integer, default=0)
+    surcharge: Mapped[int] = mapped_column(Integer, default=0)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
+    materialized_until: Mapped[date] = mapped_column(Date, nullable=False)
+    skipped_dates: Mapped[List[date]] = mapped_column(ARRAY(Date), nullable=False, default=list)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
+
+    barber = relationship("Barber")
+    service = relationship("Service")
+    customer = relationship("Customer")
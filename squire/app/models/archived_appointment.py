@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import String, Text, Integer, TIMESTAMP, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import UUID
+from . import Base
+
+class ArchivedAppointment(Base):
+    __tablename__ = "appointments_archive"
+    # Finished appointments moved out of appointments by the archiver (see
+    # init/init.sql); read-only, with the same columns as Appointment
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False)
+    barber_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("barbers.id"), nullable=False)
+    customer_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=False)
+    service_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("services.id"), nullable=False)
+    appointment_date: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False)
+    price: Mapped[int] = mapped_column(Integer, nullable=False)
+    discount: Mapped[int] = mapped_column(Integer, default=0)
+    booking_fee: Mapped[int] = mapped_column(Integer, default=0)
+    surcharge: Mapped[int] = mapped_column(Integer, default=0)
+    total_price: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    notes: Mapped[str] = mapped_column(Text)
+    series_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("appointment_series.id"))
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    archived_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    barber = relationship("Barber")
+    service = relationship("Service")
+    customer = relationship("Customer")
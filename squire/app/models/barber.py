@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, Boolean, TIMESTAMP, JSON, ForeignKey
+from sqlalchemy import String, Text, Boolean, TIMESTAMP, JSON, ForeignKey, FetchedValue, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from . import Base
@@ -17,8 +17,8 @@ class Barber(Base):
     days_on: Mapped[List[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
     working_hours: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     shop = relationship("Shop", back_populates="barbers")
     surcharge_settings = relationship("SurchargeSetting", back_populates="barber", cascade="all, delete-orphan")
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, TIMESTAMP
+from sqlalchemy import String, Text, TIMESTAMP, Computed, FetchedValue, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from . import Base
@@ -13,7 +13,12 @@ class Customer(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     email: Mapped[str] = mapped_column(String(255))
     phone: Mapped[str] = mapped_column(String(20), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    # Normalized phone for search; see init.sql
+    phone_e164: Mapped[str] = mapped_column(
+        String(24),
+        Computed(r"'+' || regexp_replace(regexp_replace(phone, '^\s*00', ''), '\D', '', 'g')", persisted=True),
+    )
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     appointments: Mapped[List["Appointment"]] = relationship("Appointment", back_populates="customer", cascade="all, delete-orphan") 
\ No newline at end of file
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import String, Text, TIMESTAMP, ForeignKey, FetchedValue, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from . import Base
@@ -16,8 +16,8 @@ class Shop(Base):
     phone: Mapped[str] = mapped_column(String(20))
     email: Mapped[str] = mapped_column(String(255))
     timezone: Mapped[str] = mapped_column(String(50), default="UTC")
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
 
     barbers: Mapped[List["Barber"]] = relationship("Barber", back_populates="shop", cascade="all, delete-orphan")
     services: Mapped[List["Service"]] = relationship("Service", back_populates="shop", cascade="all, delete-orphan") 
\ No newline at end of file
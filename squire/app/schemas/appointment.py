@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, List, Literal, Optional, Union
 from uuid import UUID
 from datetime import datetime
 
@@ -17,11 +17,16 @@ class AppointmentBase(BaseModel):
     notes: Optional[str] = None
 
 class AppointmentCreate(AppointmentBase):
-    pass
+    # Up to MAX_APPOINTMENT_MINUTES (services.schedule_index), as far back as overlap checks look
+    duration_minutes: int = Field(gt=0, le=24 * 60)
+    # Not nullable: a NULL one would make the generated total_price NULL
+    discount: int = 0
+    booking_fee: int = 0
+    surcharge: int = 0
 
 class AppointmentUpdate(BaseModel):
     appointment_date: Optional[datetime] = None
-    duration_minutes: Optional[int] = None
+    duration_minutes: Optional[int] = Field(None, gt=0, le=24 * 60)
     price: Optional[int] = None
     discount: Optional[int] = None
     booking_fee: Optional[int] = None
@@ -29,11 +34,58 @@ class AppointmentUpdate(BaseModel):
     status: Optional[str] = None
     notes: Optional[str] = None
 
+    @field_validator("discount", "booking_fee", "surcharge")
+    @classmethod
+    def not_null(cls, value: Optional[int]) -> int:
+        # Only an explicit null gets here; leaving the field out keeps the current value
+        if value is None:
+            raise ValueError("must be an integer (use 0 for none)")
+        return value
+
 class AppointmentResponse(AppointmentBase):
     id: UUID
+    shop_id: UUID
     total_price: Optional[int] = None
+    series_id: Optional[UUID] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class AppointmentBatchCreate(BaseModel):
+    action: Literal["create"]
+    data: AppointmentCreate
+
+class AppointmentBatchUpdate(BaseModel):
+    action: Literal["update"]
+    id: UUID
+    data: AppointmentUpdate
+
+class AppointmentBatchCancel(BaseModel):
+    action: Literal["cancel"]
+    id: UUID
+
+AppointmentBatchOperation = Annotated[
+    Union[AppointmentBatchCreate, AppointmentBatchUpdate, AppointmentBatchCancel],
+    Field(discriminator="action"),
+]
+
+class AppointmentBatchRequest(BaseModel):
+    # atomic: apply every operation or none; best_effort: apply the ones that pass
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    operations: List[AppointmentBatchOperation] = Field(min_length=1, max_length=500)
+
+class AppointmentBatchResult(BaseModel):
+    index: int
+    action: str
+    ok: bool
+    appointment: Optional[AppointmentResponse] = None
+    error: Optional[str] = None
+
+class AppointmentBatchResponse(BaseModel):
+    mode: str
+    committed: bool
+    succeeded: int
+    failed: int
+    results: List[AppointmentBatchResult]
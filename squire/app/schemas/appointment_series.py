@@ -0,0 +1,71 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from uuid import UUID
+from datetime import date, datetime, time
+
+from .appointment import AppointmentResponse
+
+class AppointmentSeriesBase(BaseModel):
+    barber_id: UUID
+    customer_id: UUID
+    service_id: UUID
+    # RRULE FREQ and INTERVAL: "weekly" every 2 is a fortnightly appointment
+    frequency: Literal["daily", "weekly", "monthly"]
+    every: int = Field(1, ge=1, le=52)
+    # Weekly only (RRULE BYDAY); empty means the weekday of start_date
+    weekdays: List[str] = []
+    start_date: date
+    # Shop-local wall-clock time, kept across DST changes
+    start_time: time
+    until: Optional[date] = None
+    max_occurrences: Optional[int] = Field(None, ge=1)
+    # Default to the service's
+    duration_minutes: Optional[int] = Field(None, ge=1, le=24 * 60)
+    price: Optional[int] = None
+    discount: Optional[int] = 0
+    booking_fee: Optional[int] = 0
+    surcharge: Optional[int] = 0
+    notes: Optional[str] = None
+
+class AppointmentSeriesCreate(AppointmentSeriesBase):
+    # Not nullable: a NULL one would make each occurrence's total_price NULL
+    discount: int = 0
+    booking_fee: int = 0
+    surcharge: int = 0
+    # fail: book nothing if any occurrence is taken; skip: book the free ones
+    on_conflict: Literal["fail", "skip"] = "fail"
+
+class AppointmentSeriesResponse(AppointmentSeriesBase):
+    id: UUID
+    shop_id: UUID
+    duration_minutes: int
+    price: int
+    materialized_until: date
+    skipped_dates: List[date]
+    is_active: Optional[bool] = True
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SkippedOccurrence(BaseModel):
+    date: date
+    start: datetime
+    # "outside_working_hours", "conflict" or "past"
+    reason: str
+    conflicting_appointment_id: Optional[UUID] = None
+
+class AppointmentSeriesCreateResponse(BaseModel):
+    committed: bool
+    series: Optional[AppointmentSeriesResponse] = None
+    created: List[AppointmentResponse]
+    skipped: List[SkippedOccurrence]
+
+class SeriesOccurrence(BaseModel):
+    date: date
+    start: datetime
+    # booked: an appointment exists; skipped: it wasn't free when booked;
+    # projected: beyond the booking horizon, computed from the pattern
+    state: Literal["booked", "skipped", "projected"]
+    appointment: Optional[AppointmentResponse] = None
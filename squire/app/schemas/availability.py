@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List
+from uuid import UUID
+from datetime import date
+
+class BarberSlots(BaseModel):
+    barber_id: UUID
+    slots: List[str]
+
+class DayAvailability(BaseModel):
+    date: date
+    barbers: List[BarberSlots]
+
+class AvailabilityResponse(BaseModel):
+    shop_id: UUID
+    service_id: UUID
+    duration_minutes: int
+    slot_minutes: int
+    days: List[DayAvailability]
@@ -0,0 +1,35 @@
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, model_validator
+from sqlalchemy import inspect
+from sqlalchemy.orm import InstanceState
+
+from .appointment import AppointmentResponse
+from .barber import BarberResponse
+from .customer import CustomerResponse
+from .service import ServiceResponse
+
+class LoadedRelationships(BaseModel):
+    """Reads ORM relationships only if they were eagerly loaded.
+
+    Relationships that weren't asked for with ?expand= are left unset
+    instead of being lazy-loaded (which an AsyncSession can't do), so
+    endpoints using response_model_exclude_unset omit them entirely.
+    """
+
+    @model_validator(mode="before")
+    @classmethod
+    def _loaded_only(cls, data: Any) -> Any:
+        state = inspect(data, raiseerr=False)
+        if not isinstance(state, InstanceState):
+            return data
+        skipped = state.unloaded.intersection(state.mapper.relationships.keys())
+        return {name: getattr(data, name) for name in cls.model_fields if name not in skipped and hasattr(data, name)}
+
+class ExpandedAppointmentResponse(LoadedRelationships, AppointmentResponse):
+    barber: Optional[BarberResponse] = None
+    service: Optional[ServiceResponse] = None
+    customer: Optional[CustomerResponse] = None
+
+class ExpandedCustomerResponse(LoadedRelationships, CustomerResponse):
+    appointments: Optional[List[AppointmentResponse]] = None
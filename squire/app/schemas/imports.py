@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportRowError(BaseModel):
+    row: int
+    message: str
+
+class TableImportResult(BaseModel):
+    table: str
+    rows: int
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
+class ImportReport(BaseModel):
+    tables: List[TableImportResult]
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
+
+class QuoteCandidate(BaseModel):
+    barber_id: UUID
+    service_id: UUID
+    start: datetime
+
+class QuoteBatchRequest(BaseModel):
+    candidates: List[QuoteCandidate] = Field(min_length=1, max_length=2000)
+
+class Quote(BaseModel):
+    index: int
+    barber_id: UUID
+    service_id: UUID
+    start: datetime
+    ok: bool
+    # Whether the barber works and is free for the whole service at `start`
+    available: Optional[bool] = None
+    price: Optional[int] = None
+    discount: Optional[int] = None
+    booking_fee: Optional[int] = None
+    surcharge: Optional[int] = None
+    total_price: Optional[int] = None
+    error: Optional[str] = None
+
+class QuoteBatchResponse(BaseModel):
+    quotes: List[Quote]
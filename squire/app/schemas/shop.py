@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional
 from uuid import UUID
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class ShopBase(BaseModel):
     name: str
@@ -10,6 +11,16 @@ class ShopBase(BaseModel):
     email: Optional[EmailStr] = None
     timezone: Optional[str] = "UTC"
 
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timezone {value!r}")
+        return value
+
 class ShopCreate(ShopBase):
     pass
 
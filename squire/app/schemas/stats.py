@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from uuid import UUID
+from datetime import date
+
+class StatsSummary(BaseModel):
+    # Every appointment except cancelled ones
+    bookings: int
+    completed: int
+    cancelled: int
+    no_shows: int
+    # total_price of completed appointments, in cents
+    revenue: int
+    # Mean total_price of completed appointments, in cents
+    average_price: Optional[float] = None
+    # no_shows / (completed + no_shows)
+    no_show_rate: Optional[float] = None
+
+class DailyStats(StatsSummary):
+    date: date
+
+class BarberStats(StatsSummary):
+    barber_id: UUID
+
+class ShopStatsResponse(BaseModel):
+    shop_id: UUID
+    timezone: str
+    start_date: date
+    end_date: date
+    totals: StatsSummary
+    days: List[DailyStats]
+    barbers: List[BarberStats]
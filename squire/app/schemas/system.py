@@ -0,0 +1,74 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, Optional
+
+class CacheStats(BaseModel):
+    backend: str
+    hits: Dict[str, int]
+    misses: Dict[str, int]
+    errors: int
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    timeouts: int
+    wait_ms_total: float
+    wait_ms_avg: float
+    wait_ms_max: float
+
+class ReplicaStats(BaseModel):
+    name: str
+    healthy: bool
+    failures: int
+    last_error: Optional[str] = None
+    checked_out: int
+
+class EventStats(BaseModel):
+    connected: bool
+    subscribers: int
+    shops: int
+    buffered: int
+    received: int
+    reconnects: int
+
+class InvalidationStats(BaseModel):
+    connected: bool
+    pending: int
+    sent: int
+    received: int
+    reconnects: int
+
+class IdempotencyStats(BaseModel):
+    ttl_seconds: int
+    stored: int
+    replayed: int
+    released: int
+    in_progress: int
+    mismatched: int
+    swept: int
+
+class CoalescingStats(BaseModel):
+    in_flight: int
+    leaders: int
+    followers: int
+
+class StartupStats(BaseModel):
+    pid: int
+    # None when not started by the app.serve supervisor
+    worker: Optional[int] = None
+    # ms since start: imported, warmed, forked (supervisor), lifespan, ready (worker)
+    phases: Dict[str, float]
+
+class ProfileCapture(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: str
+    status: int
+    duration_ms: float
+    profiler: str
+    created_at: datetime
@@ -0,0 +1,252 @@
+"""Production server: a supervisor that warms up once, then forks the workers.
+
+Run from the squire/ directory:
+
+    poetry run python -m app.serve --workers 4 --port 8000
+
+The supervisor imports the app with every router, configures the mappers,
+builds the OpenAPI schema and primes the catalog cache and schedule index.
+It then closes its database connections and forks the workers. Workers
+inherit all of that copy-on-write and open their own connection pools on
+first use. They accept from one shared listening socket, and each keeps
+its caches current through the invalidation bus (Postgres NOTIFY).
+
+A worker that dies is replaced. SIGTERM or SIGINT stops the workers
+gracefully. Startup milestones (ms since the supervisor started) are
+logged, and each worker serves its own at /system/startup.
+"""
+import time
+
+# Before the imports below, which are most of a cold start
+STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+from typing import Dict, Optional
+
+import uvicorn
+
+from .config import settings
+from .database import AsyncSessionLocal, engine, replicas
+from .main import app
+from .services.schedule_index import schedule_index
+from .utils.cache import catalog_cache
+from .utils.sql_logging import stop_sql_logging
+from .utils.startup import startup_clock
+from .warmup import prime_caches, warm_imports
+
+logger = logging.getLogger("uvicorn.error")
+
+# A worker that exits sooner than this after starting is restarted only after a pause
+MIN_WORKER_SECONDS = 5.0
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn server that tells the supervisor when it's accepting connections."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: Optional[int]) -> None:
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if not self.started:
+            return
+        ready = startup_clock.mark("ready")
+        if self.ready_fd is not None:
+            os.write(self.ready_fd, f"{ready}\n".encode())
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+
+async def warm_up() -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            report = await prime_caches(
+                session,
+                settings.WARMUP_TIMEOUT_SECONDS,
+                settings.CACHE_MAX_ENTRIES,
+                settings.WARMUP_MAX_SHOPS,
+                settings.SCHEDULE_INDEX_MAX_BARBERS,
+            )
+    except Exception as error:
+        # Workers still start, with caches that fill on demand
+        logger.warning("Cache warm-up skipped: %r", error)
+    else:
+        logger.info(
+            "Primed %d catalog entries, %d shop rosters and %d barber timelines%s",
+            report.catalog_entries,
+            report.rosters,
+            report.timelines,
+            " (stopped at the warm-up timeout)" if report.timed_out else "",
+        )
+    finally:
+        # No connection may be shared with the workers
+        await engine.dispose()
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Forks the workers, replaces any that die and stops them all on SIGTERM/SIGINT."""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int) -> None:
+        self.config = config
+        self.sock = sock
+        self.count = workers
+        self.workers: Dict[int, int] = {}
+        self.spawned_at: Dict[int, float] = {}
+        self.stopping = False
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        ready_fds = [self.spawn(index, respawned=False) for index in range(self.count)]
+        startup_clock.mark("forked")
+        ready = [self.wait_ready(fd) for fd in ready_fds]
+        if not any(value is not None for value in ready):
+            logger.error("No worker started")
+            self.stop()
+            self.reap()
+            return 1
+        phases = startup_clock.phases
+        logger.info(
+            "%d/%d workers ready %.0f ms after start (imports %.0f ms, warm-up %.0f ms, slowest worker %.0f ms)",
+            sum(value is not None for value in ready),
+            self.count,
+            max(value for value in ready if value is not None),
+            phases["imported"],
+            phases["warmed"] - phases["imported"],
+            max(value for value in ready if value is not None) - phases["forked"],
+        )
+        self.reap()
+        return 0
+
+    def spawn(self, index: int, respawned: bool) -> Optional[int]:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 0
+            try:
+                run_worker(self.config, self.sock, index, write_fd, respawned)
+            except BaseException:
+                logger.exception("Worker %d failed", index)
+                code = 1
+            finally:
+                # os._exit skips atexit, which would flush the SQL log queue
+                stop_sql_logging()
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = index
+        self.spawned_at[pid] = time.monotonic()
+        if respawned:
+            os.close(read_fd)
+            return None
+        return read_fd
+
+    def wait_ready(self, fd: int) -> Optional[float]:
+        """ms from supervisor start until the worker accepted connections; None if it died first."""
+        with os.fdopen(fd, "rb") as pipe:
+            line = pipe.readline()
+        return float(line) if line else None
+
+    def reap(self) -> None:
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                return
+            index = self.workers.pop(pid, None)
+            if index is None:
+                continue
+            ran_for = time.monotonic() - self.spawned_at.pop(pid)
+            if self.stopping:
+                continue
+            logger.warning(
+                "Worker %d (pid %d) exited with code %s after %.1fs, restarting",
+                index,
+                pid,
+                os.waitstatus_to_exitcode(status),
+                ran_for,
+            )
+            if ran_for < MIN_WORKER_SECONDS:
+                time.sleep(RESPAWN_DELAY_SECONDS)
+            if not self.stopping:
+                self.spawn(index, respawned=True)
+
+    def stop(self, signum=None, frame=None) -> None:
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket, index: int, ready_fd: int, respawned: bool) -> None:
+    # The supervisor's handlers came along with the fork; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    startup_clock.worker = index
+    random.seed()
+    # Connection pools start empty in each worker
+    engine.sync_engine.dispose(close=False)
+    for replica in replicas.replicas:
+        replica.engine.sync_engine.dispose(close=False)
+    if respawned:
+        # The caches were primed before the first workers forked, and the
+        # supervisor has seen none of the invalidations since
+        schedule_index.clear()
+        if not catalog_cache.backend.shared:
+            catalog_cache.clear()
+    server = WorkerServer(config, ready_fd if not respawned else None)
+    config.setup_event_loop()
+    asyncio.run(server.serve(sockets=[sock]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="app.serve", description="Serve the API from pre-forked workers")
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS, help="0 means one per CPU")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    args = parser.parse_args()
+
+    startup_clock.restart(STARTED)
+    startup_clock.mark("imported")
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        log_level=args.log_level,
+        access_log=args.access_log,
+        proxy_headers=True,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_SHUTDOWN_SECONDS,
+    )
+    config.load()
+    warm_imports(app)
+    asyncio.run(warm_up())
+    startup_clock.mark("warmed")
+
+    sock = bind(args.host, args.port, args.backlog)
+    workers = args.workers or os.cpu_count() or 1
+    logger.info("Listening on %s:%d with %d workers", args.host, sock.getsockname()[1], workers)
+    sys.exit(Supervisor(config, sock, workers).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from .exceptions import ConflictError, InvalidRequestError
+from .partition_service import partition_service
+from .schedule_index import FINISHED_STATUSES
+
+# Every column of appointments_archive that comes from appointments, in order
+ARCHIVE_COLUMNS = (
+    "id",
+    "shop_id",
+    "barber_id",
+    "customer_id",
+    "service_id",
+    "appointment_date",
+    "duration_minutes",
+    "price",
+    "discount",
+    "booking_fee",
+    "surcharge",
+    "total_price",
+    "status",
+    "notes",
+    "series_id",
+    "created_at",
+    "updated_at",
+)
+
+
+def move_batch_sql(table: str) -> str:
+    """Move up to :limit of the oldest finished rows before :cutoff from one partition, in one statement."""
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    finished = ", ".join(f"'{status}'" for status in FINISHED_STATUSES)
+    return (
+        f"WITH batch AS ("
+        f"SELECT id FROM {table} "
+        f"WHERE status IN ({finished}) AND appointment_date < :cutoff "
+        f"ORDER BY appointment_date LIMIT :limit FOR UPDATE SKIP LOCKED"
+        f"), moved AS ("
+        f"DELETE FROM {table} USING batch WHERE {table}.id = batch.id RETURNING {table}.*"
+        f") "
+        f"INSERT INTO appointments_archive ({columns}) SELECT {columns} FROM moved"
+    )
+
+
+@dataclass
+class ArchiveReport:
+    cutoff: datetime
+    batches: int = 0
+    moved: int = 0
+    # Rows moved per appointments partition
+    partitions: Dict[str, int] = field(default_factory=dict)
+    # Stopped at max_batches, possibly with rows left to move
+    incomplete: bool = False
+
+
+class ArchiveService:
+    """Moves finished appointments older than ARCHIVE_AFTER_DAYS to appointments_archive.
+
+    Works through the appointments partitions one at a time, in batches of
+    ARCHIVE_BATCH_SIZE rows, each a single DELETE ... RETURNING feeding an
+    INSERT and committed on its own. Batches lock only the rows they move,
+    skip rows another transaction holds (the next run gets them) and pause
+    between each other, so bookings never wait behind the archiver.
+
+    Statements address the partitions directly, which leaves out the
+    statement triggers on appointments: moved rows keep their place in the
+    daily stats (reconcile counts both tables), and live calendars hear
+    nothing of rows that only changed tables. Nothing moved is recent enough
+    for the schedule index to hold. Autovacuum reclaims the emptied pages,
+    so the hot table and its indexes stay the size of the retention window.
+    """
+
+    async def archive(
+        self,
+        db: AsyncSession,
+        older_than_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> ArchiveReport:
+        older_than_days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        if older_than_days < 1:
+            raise InvalidRequestError("older_than_days must be at least 1")
+        if batch_size < 1:
+            raise InvalidRequestError("batch_size must be at least 1")
+        if not await partition_service.is_partitioned(db):
+            raise ConflictError("appointments is not partitioned; run partition-appointments first")
+        partitions = await self.partitions(db)
+        await db.commit()
+
+        report = ArchiveReport(cutoff=(now or datetime.now(timezone.utc)) - timedelta(days=older_than_days))
+        for table in partitions:
+            statement = text(move_batch_sql(table))
+            report.partitions[table] = 0
+            while True:
+                if max_batches is not None and report.batches >= max_batches:
+                    report.incomplete = True
+                    return report
+                moved = (await db.execute(statement, {"cutoff": report.cutoff, "limit": batch_size})).rowcount
+                await db.commit()
+                report.batches += 1
+                report.moved += moved
+                report.partitions[table] += moved
+                if moved < batch_size:
+                    break
+                await asyncio.sleep(settings.ARCHIVE_BATCH_PAUSE_SECONDS)
+        return report
+
+    async def partitions(self, db: AsyncSession) -> List[str]:
+        return (
+            await db.scalars(
+                text(
+                    "SELECT inhrelid::regclass::text FROM pg_inherits "
+                    "WHERE inhparent = CAST('appointments' AS regclass) ORDER BY 1"
+                )
+            )
+        ).all()
+
+
+archive_service = ArchiveService()
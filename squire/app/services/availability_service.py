@@ -0,0 +1,250 @@
+import uuid
+from dataclasses import dataclass
+from bisect import bisect_right
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.service import Service
+from ..schemas.availability import AvailabilityResponse, BarberSlots, DayAvailability
+from .exceptions import InvalidRequestError, NotFoundError
+from ..utils.timezones import LocalDay, local_date, local_days
+from .schedule_index import NON_BLOCKING_STATUSES, epoch_minute, minute_datetime, schedule_index
+
+# A day is represented as an int bitmap: bit N set means minute N after the
+# shop's local midnight is free. Days on which the shop's clocks change are
+# 23 or 25 hours long, so their bitmaps are too. Python ints give us arbitrary-width AND/shift in C, so a whole day
+# of a barber's schedule is combined in a handful of operations.
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MAX_WINDOW_DAYS = 62
+
+_MINUTE_LABELS = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(MINUTES_PER_DAY))
+
+
+def parse_hhmm(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def interval_mask(start_minute: int, end_minute: int, limit: int = MINUTES_PER_DAY) -> int:
+    start_minute = max(start_minute, 0)
+    end_minute = min(end_minute, limit)
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+def normalize_working_hours(working_hours: Iterable[dict]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((interval["start"], interval["end"]) for interval in working_hours or ())
+
+
+@lru_cache(maxsize=1024)
+def working_mask(intervals: Tuple[Tuple[str, str], ...]) -> int:
+    mask = 0
+    for start, end in intervals:
+        mask |= interval_mask(parse_hhmm(start), parse_hhmm(end))
+    return mask
+
+
+@lru_cache(maxsize=64)
+def aligned_mask(slot_minutes: int) -> int:
+    mask = 0
+    for minute in range(0, MINUTES_PER_DAY, slot_minutes):
+        mask |= 1 << minute
+    return mask
+
+
+@lru_cache(maxsize=256)
+def shifted_working_mask(intervals: Tuple[Tuple[str, str], ...], day: LocalDay) -> int:
+    """working_mask() for a day on which the clocks change, in elapsed minutes."""
+    mask = 0
+    for start, end in intervals:
+        mask |= interval_mask(day.elapsed(parse_hhmm(start)), day.elapsed(parse_hhmm(end)), day.length)
+    return mask
+
+
+@lru_cache(maxsize=256)
+def shifted_aligned_mask(slot_minutes: int, day: LocalDay) -> int:
+    """aligned_mask() for a day on which the clocks change: slots stay on wall-clock boundaries."""
+    mask = 0
+    for minute in range(day.length):
+        if day.wall(minute) % slot_minutes == 0:
+            mask |= 1 << minute
+    return mask
+
+
+def fit_mask(free: int, length: int) -> int:
+    """Return the minutes at which a run of `length` free minutes starts.
+
+    Bit N of the result is set iff bits N..N+length-1 are all set in `free`.
+    The run is grown by doubling, so this costs O(log length) big-int ops.
+    """
+    if length <= 0:
+        return free
+    result = free
+    span = 1
+    while span < length:
+        step = min(span, length - span)
+        result &= result >> step
+        span += step
+    return result
+
+
+# Maps the characters of bin() output to 0/1 bytes for itertools.compress
+_BIT_CHARS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def slot_labels(starts: int, slot_minutes: int) -> List[str]:
+    """Return "HH:MM" labels for the aligned bits set in `starts`."""
+    if not starts:
+        return []
+    bits = bin(starts)[:1:-1][::slot_minutes].encode().translate(_BIT_CHARS)
+    return list(compress(_MINUTE_LABELS[::slot_minutes], bits))
+
+
+def shifted_slot_labels(starts: int, day: LocalDay) -> List[str]:
+    """slot_labels() for a day on which the clocks change."""
+    bits = bin(starts)[:1:-1].encode().translate(_BIT_CHARS)
+    return [_MINUTE_LABELS[day.wall(minute) % MINUTES_PER_DAY] for minute in compress(range(len(bits)), bits)]
+
+
+def busy_masks(intervals: Iterable[Tuple[int, int]], days: Sequence[LocalDay]) -> Dict[int, int]:
+    """Fold (start, end) epoch-minute intervals into busy bitmaps keyed by index into `days`."""
+    masks: Dict[int, int] = {}
+    if not days:
+        return masks
+    starts = [day.start for day in days]
+    for start, end in intervals:
+        index = max(bisect_right(starts, start) - 1, 0)
+        day = days[index]
+        if start >= day.start and end <= day.end:
+            masks[index] = masks.get(index, 0) | (((1 << (end - start)) - 1) << (start - day.start))
+            continue
+        # Bookings that cross midnight or start before the window
+        while index < len(days) and days[index].start < end:
+            day = days[index]
+            masks[index] = masks.get(index, 0) | interval_mask(start - day.start, end - day.start, day.length)
+            index += 1
+    return masks
+
+
+@dataclass
+class BarberSchedule:
+    barber_id: uuid.UUID
+    days_on: frozenset
+    intervals: Tuple[Tuple[str, str], ...]
+    working: int
+
+    @classmethod
+    def from_barber(cls, barber_id: uuid.UUID, days_on: Sequence[str], working_hours: list) -> "BarberSchedule":
+        intervals = normalize_working_hours(working_hours)
+        return cls(
+            barber_id=barber_id,
+            days_on=frozenset(WEEKDAYS.index(day) for day in days_on if day in WEEKDAYS),
+            intervals=intervals,
+            working=working_mask(intervals),
+        )
+
+    def day_mask(self, day: LocalDay) -> int:
+        if day.date.weekday() not in self.days_on:
+            return 0
+        return shifted_working_mask(self.intervals, day) if day.delta else self.working
+
+
+class AvailabilityService:
+    async def find_free_slots(
+        self,
+        db: AsyncSession,
+        shop_id: uuid.UUID,
+        service_id: uuid.UUID,
+        start_date: Optional[date] = None,
+        days: int = 14,
+        barber_id: Optional[uuid.UUID] = None,
+        slot_minutes: int = 15,
+        now: Optional[datetime] = None,
+    ) -> AvailabilityResponse:
+        if not 1 <= days <= MAX_WINDOW_DAYS:
+            raise InvalidRequestError(f"days must be between 1 and {MAX_WINDOW_DAYS}")
+        if not 1 <= slot_minutes <= 240:
+            raise InvalidRequestError("slot_minutes must be between 1 and 240")
+
+        service = await db.get(Service, service_id)
+        if not service or service.shop_id != shop_id:
+            raise NotFoundError(f"Service with id {service_id} not found in shop {shop_id}")
+
+        # Rosters and bookings come from the schedule index; only barbers it
+        # hasn't seen recently cost a query, and all of them share one
+        roster = await schedule_index.roster(db, shop_id)
+        now = now or datetime.now(timezone.utc)
+        window = local_days(roster.timezone, start_date or local_date(roster.timezone, now), days)
+        schedules = [
+            BarberSchedule.from_barber(entry.barber_id, entry.days_on, entry.working_hours)
+            for entry in roster.barbers
+            if barber_id is None or entry.barber_id == barber_id
+        ]
+        timelines = await schedule_index.timelines(
+            db, [schedule.barber_id for schedule in schedules], minute_datetime(window[0].start), [shop_id]
+        )
+        booked = {
+            barber_id: timeline.busy(window[0].start, window[-1].end) for barber_id, timeline in timelines.items()
+        }
+
+        return self.compute(
+            shop_id=shop_id,
+            service_id=service_id,
+            duration_minutes=service.duration_minutes,
+            schedules=schedules,
+            booked=booked,
+            days=window,
+            slot_minutes=slot_minutes,
+            now=now,
+        )
+
+    def compute(
+        self,
+        shop_id: uuid.UUID,
+        service_id: uuid.UUID,
+        duration_minutes: int,
+        schedules: Sequence[BarberSchedule],
+        booked: Dict[uuid.UUID, List[Tuple[int, int]]],
+        days: Sequence[LocalDay],
+        slot_minutes: int,
+        now: datetime,
+    ) -> AvailabilityResponse:
+        now_minute = epoch_minute(now)
+        busy = {
+            schedule.barber_id: busy_masks(booked.get(schedule.barber_id, ()), days)
+            for schedule in schedules
+        }
+
+        result_days = []
+        for offset, day in enumerate(days):
+            aligned = shifted_aligned_mask(slot_minutes, day) if day.delta else aligned_mask(slot_minutes)
+            # Slots that already started are not bookable
+            not_past = ((1 << day.length) - 1) & ~interval_mask(0, now_minute - day.start + 1, day.length)
+            barbers = []
+            for schedule in schedules:
+                free = schedule.day_mask(day)
+                if not free:
+                    continue
+                free &= ~busy[schedule.barber_id].get(offset, 0)
+                starts = fit_mask(free, duration_minutes) & aligned & not_past
+                if starts:
+                    labels = shifted_slot_labels(starts, day) if day.delta else slot_labels(starts, slot_minutes)
+                    barbers.append(BarberSlots(barber_id=schedule.barber_id, slots=labels))
+            result_days.append(DayAvailability(date=day.date, barbers=barbers))
+
+        return AvailabilityResponse(
+            shop_id=shop_id,
+            service_id=service_id,
+            duration_minutes=duration_minutes,
+            slot_minutes=slot_minutes,
+            days=result_days,
+        )
+
+
+availability_service = AvailabilityService()
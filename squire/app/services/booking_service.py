@@ -0,0 +1,433 @@
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Interval, func, insert, literal, null, select, text, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.appointment import Appointment
+from ..models.barber import Barber
+from ..models.customer import Customer
+from ..models.service import Service
+from ..schemas.appointment import (
+    AppointmentBatchRequest,
+    AppointmentBatchResponse,
+    AppointmentBatchResult,
+    AppointmentCreate,
+    AppointmentResponse,
+    AppointmentUpdate,
+)
+from ..utils.crud import update_by_id
+from ..utils.locks import KeyedLock
+from ..utils.partitions import in_shops, shop_of
+from .exceptions import ConflictError, NotFoundError
+from .schedule_index import MAX_APPOINTMENT_MINUTES, NON_BLOCKING_STATUSES, epoch_minute, schedule_index
+
+# SQLSTATE raised by the per-partition appointments_pNN_no_overlap exclusion constraints
+EXCLUSION_VIOLATION = "23P01"
+
+appointment_end = Appointment.appointment_date + func.make_interval(
+    0, 0, 0, 0, 0, Appointment.duration_minutes, type_=Interval
+)
+
+
+class BookingConflictError(ConflictError):
+    pass
+
+
+@dataclass
+class Slot:
+    start: datetime
+    end: datetime
+
+    @classmethod
+    def of(cls, start: datetime, duration_minutes: int) -> "Slot":
+        return cls(start, start + timedelta(minutes=duration_minutes))
+
+    def overlaps(self, other: "Slot") -> bool:
+        return self.start < other.end and other.start < self.end
+
+
+def _references(data: AppointmentCreate) -> Tuple[Tuple[str, uuid.UUID], ...]:
+    return (("barber", data.barber_id), ("customer", data.customer_id), ("service", data.service_id))
+
+
+def barber_lock_key(barber_id: uuid.UUID) -> int:
+    """Derive a signed 64-bit pg advisory lock key from a barber id."""
+    return int.from_bytes(barber_id.bytes[:8], "big", signed=True)
+
+
+class BookingService:
+    """Creates and reschedules appointments without double-booking a barber.
+
+    Writes for the same barber are serialized twice: by an in-process asyncio
+    lock, so concurrent requests in one worker queue up without holding a
+    pooled connection, and by a transaction-scoped advisory lock keyed by the
+    barber, which covers other workers. Bookings for different barbers never
+    wait on each other. The exclusion constraint on each appointments
+    partition is the final guard for writers that bypass this service.
+
+    New appointments take shop_id, the table's partition key, from their
+    barber, and every lookup filters on it so only one partition is read.
+    """
+
+    def __init__(self) -> None:
+        self._barber_locks = KeyedLock()
+
+    async def create_appointment(self, db: AsyncSession, appointment_in: AppointmentCreate) -> Appointment:
+        async with self._barber_locks.hold(appointment_in.barber_id):
+            if appointment_in.status not in NON_BLOCKING_STATUSES:
+                await self.lock_barber(db, appointment_in.barber_id)
+                await self.ensure_slot_free(
+                    db, appointment_in.barber_id, appointment_in.appointment_date, appointment_in.duration_minutes
+                )
+            # The barber's shop is looked up inside the INSERT; an unknown
+            # barber leaves shop_id NULL and fails the NOT NULL constraint
+            async with self.translate_conflicts(db):
+                appointment = await db.scalar(
+                    insert(Appointment)
+                    .values(**appointment_in.model_dump(), shop_id=shop_of(appointment_in.barber_id))
+                    .returning(Appointment)
+                )
+                await db.commit()
+            schedule_index.appointment_saved(appointment)
+        return appointment
+
+    async def update_appointment(
+        self, db: AsyncSession, appointment_id: uuid.UUID, appointment_in: AppointmentUpdate
+    ) -> Appointment:
+        changes = appointment_in.model_dump(exclude_unset=True)
+        if not {"appointment_date", "duration_minutes", "status"} & changes.keys():
+            appointment = await update_by_id(db, Appointment, appointment_id, changes)
+            if not appointment:
+                raise NotFoundError("Appointment not found")
+            await self._commit(db)
+            return appointment
+
+        current = (
+            await db.execute(
+                select(
+                    Appointment.shop_id,
+                    Appointment.barber_id,
+                    Appointment.appointment_date,
+                    Appointment.duration_minutes,
+                    Appointment.status,
+                ).where(Appointment.id == appointment_id)
+            )
+        ).first()
+        if not current:
+            raise NotFoundError("Appointment not found")
+        values = {**current._asdict(), **changes}
+
+        async with self._barber_locks.hold(current.barber_id):
+            if values["status"] not in NON_BLOCKING_STATUSES:
+                await self.lock_barber(db, current.barber_id)
+                await self.ensure_slot_free(
+                    db,
+                    current.barber_id,
+                    values["appointment_date"],
+                    values["duration_minutes"],
+                    exclude_id=appointment_id,
+                    shop_id=current.shop_id,
+                )
+            appointment = await update_by_id(
+                db, Appointment, appointment_id, changes, Appointment.shop_id == current.shop_id
+            )
+            if not appointment:
+                await db.rollback()
+                raise NotFoundError("Appointment not found")
+            await self._commit(db)
+            schedule_index.appointment_saved(appointment)
+        return appointment
+
+    @asynccontextmanager
+    async def hold_barber(self, db: AsyncSession, barber_id: uuid.UUID):
+        """Hold both of the barber's locks, for writers outside this service (e.g. recurring series)."""
+        async with self._barber_locks.hold(barber_id):
+            await self.lock_barber(db, barber_id)
+            yield
+
+    async def lock_barber(self, db: AsyncSession, barber_id: uuid.UUID) -> None:
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": barber_lock_key(barber_id)})
+
+    async def lock_barbers(self, db: AsyncSession, barber_ids: Iterable[uuid.UUID]) -> None:
+        """Take the advisory locks for several barbers in one round trip, in key order."""
+        keys = sorted({barber_lock_key(barber_id) for barber_id in barber_ids})
+        if keys:
+            await db.execute(
+                text(
+                    "SELECT pg_advisory_xact_lock(key) "
+                    "FROM (SELECT unnest(CAST(:keys AS bigint[])) AS key ORDER BY 1) k"
+                ),
+                {"keys": keys},
+            )
+
+    async def find_conflict(
+        self,
+        db: AsyncSession,
+        barber_id: uuid.UUID,
+        start: datetime,
+        duration_minutes: int,
+        exclude_id: Optional[uuid.UUID] = None,
+        shop_id: Optional[uuid.UUID] = None,
+    ) -> Optional[uuid.UUID]:
+        end = start + timedelta(minutes=duration_minutes)
+        query = (
+            select(Appointment.id)
+            .where(
+                Appointment.shop_id == (shop_id or shop_of(barber_id)),
+                Appointment.barber_id == barber_id,
+                Appointment.appointment_date < end,
+                Appointment.appointment_date > start - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+                appointment_end > start,
+                Appointment.status.not_in(NON_BLOCKING_STATUSES),
+            )
+            .limit(1)
+        )
+        if exclude_id is not None:
+            query = query.where(Appointment.id != exclude_id)
+        return (await db.execute(query)).scalar()
+
+    async def ensure_slot_free(
+        self,
+        db: AsyncSession,
+        barber_id: uuid.UUID,
+        start: datetime,
+        duration_minutes: int,
+        exclude_id: Optional[uuid.UUID] = None,
+        shop_id: Optional[uuid.UUID] = None,
+    ) -> None:
+        # A free slot in the index is safe to book: the exclusion constraint
+        # still rejects a booking made meanwhile by another worker. A conflict
+        # may be stale, so that answer is confirmed against the database.
+        timeline = await schedule_index.timeline(db, barber_id, start, shop_id)
+        slot_start = epoch_minute(start)
+        if timeline.find_conflict(slot_start, slot_start + duration_minutes, exclude_id) is None:
+            return
+        conflict_id = await self.find_conflict(db, barber_id, start, duration_minutes, exclude_id, shop_id)
+        if conflict_id is not None:
+            await db.rollback()
+            raise BookingConflictError(f"Barber {barber_id} already has appointment {conflict_id} at that time")
+
+    @asynccontextmanager
+    async def translate_conflicts(self, db: AsyncSession):
+        """Roll back on integrity errors, reporting exclusion violations as booking conflicts."""
+        try:
+            yield
+        except IntegrityError as exc:
+            await db.rollback()
+            if getattr(exc.orig, "sqlstate", None) == EXCLUSION_VIOLATION:
+                raise BookingConflictError("Barber already has an appointment at that time") from exc
+            raise
+
+    async def _commit(self, db: AsyncSession) -> None:
+        async with self.translate_conflicts(db):
+            await db.commit()
+
+    async def apply_batch(self, db: AsyncSession, batch: AppointmentBatchRequest) -> AppointmentBatchResponse:
+        """Apply a list of create/update/cancel operations with a constant number of queries.
+
+        Everything the batch refers to is loaded up front with IN queries, the
+        affected barbers are locked once, and every operation is checked in
+        memory, in order, against the barbers' existing bookings and the
+        operations accepted before it. Accepted creates go in as one multi-row
+        INSERT ... RETURNING. In atomic mode a single failure rolls back the
+        whole batch; in best_effort mode only the failing operations are skipped.
+        """
+        operations = batch.operations
+        target_ids = {operation.id for operation in operations if operation.action != "create"}
+        appointments: Dict[uuid.UUID, Appointment] = {}
+        if target_ids:
+            loaded = await db.scalars(select(Appointment).where(Appointment.id.in_(target_ids)))
+            appointments = {appointment.id: appointment for appointment in loaded}
+        creates = [operation.data for operation in operations if operation.action == "create"]
+        missing, barber_shops = await self._check_references(db, creates)
+
+        barber_ids = {data.barber_id for data in creates}
+        barber_ids.update(appointment.barber_id for appointment in appointments.values())
+        shop_ids = set(barber_shops.values())
+        shop_ids.update(appointment.shop_id for appointment in appointments.values())
+        # Current state of every touched appointment, updated as operations are accepted
+        state = {
+            appointment_id: {
+                "barber_id": appointment.barber_id,
+                "appointment_date": appointment.appointment_date,
+                "duration_minutes": appointment.duration_minutes,
+                "status": appointment.status,
+            }
+            for appointment_id, appointment in appointments.items()
+        }
+        errors: Dict[int, str] = {}
+        new_rows: List[Tuple[int, dict]] = []
+        changes: Dict[uuid.UUID, dict] = {}
+        touched: Dict[int, uuid.UUID] = {}
+
+        async with self._barber_locks.hold_many(barber_ids):
+            await self.lock_barbers(db, barber_ids)
+            occupied = await self._occupied_slots(db, barber_ids, shop_ids, operations, state)
+
+            for index, operation in enumerate(operations):
+                if operation.action == "create":
+                    values = operation.data.model_dump()
+                    absent = [kind for kind, key in _references(operation.data) if (kind, key) in missing]
+                    if absent:
+                        errors[index] = f"Unknown {', '.join(absent)}"
+                        continue
+                    values["shop_id"] = barber_shops[operation.data.barber_id]
+                    key = ("new", index)
+                else:
+                    if operation.id not in state:
+                        errors[index] = "Appointment not found"
+                        continue
+                    if operation.action == "update":
+                        update = operation.data.model_dump(exclude_unset=True)
+                    else:
+                        update = {"status": "cancelled"}
+                    values = {**state[operation.id], **update}
+                    key = operation.id
+
+                barber_slots = occupied.setdefault(values["barber_id"], {})
+                slot = Slot.of(values["appointment_date"], values["duration_minutes"])
+                if values["status"] not in NON_BLOCKING_STATUSES:
+                    if any(other != key and taken.overlaps(slot) for other, taken in barber_slots.items()):
+                        errors[index] = "Barber already has an appointment at that time"
+                        continue
+                    barber_slots[key] = slot
+                else:
+                    barber_slots.pop(key, None)
+
+                if operation.action == "create":
+                    new_rows.append((index, values))
+                else:
+                    state[operation.id] = {field: values[field] for field in state[operation.id]}
+                    changes.setdefault(operation.id, {}).update(update)
+                    touched[index] = operation.id
+
+            if errors and batch.mode == "atomic":
+                await db.rollback()
+                return self._batch_response(batch, operations, errors, {}, committed=False)
+
+            saved: Dict[int, Appointment] = {}
+            async with self.translate_conflicts(db):
+                if new_rows:
+                    created = await db.scalars(
+                        insert(Appointment).returning(Appointment, sort_by_parameter_order=True),
+                        [values for _, values in new_rows],
+                    )
+                    saved.update(zip((index for index, _ in new_rows), created.all()))
+                if changes:
+                    for appointment_id, update in changes.items():
+                        for field, value in update.items():
+                            setattr(appointments[appointment_id], field, value)
+                    # eager_defaults brings back updated_at and total_price in the UPDATE itself
+                    await db.flush()
+                    saved.update({index: appointments[appointment_id] for index, appointment_id in touched.items()})
+                await db.commit()
+            for appointment in saved.values():
+                schedule_index.appointment_saved(appointment)
+
+        return self._batch_response(batch, operations, errors, saved, committed=True)
+
+    async def _check_references(
+        self, db: AsyncSession, creates: List[AppointmentCreate]
+    ) -> Tuple[Set[Tuple[str, uuid.UUID]], Dict[uuid.UUID, uuid.UUID]]:
+        """Find the (kind, id) pairs `creates` refers to that don't exist, and each barber's shop, in one query."""
+        wanted = {reference for data in creates for reference in _references(data)}
+        if not wanted:
+            return set(), {}
+        query = union_all(*(
+            select(literal(kind), model.id, shop_id).where(
+                model.id.in_([key for other, key in wanted if other == kind])
+            )
+            for kind, model, shop_id in (
+                ("barber", Barber, Barber.shop_id),
+                ("customer", Customer, null()),
+                ("service", Service, Service.shop_id),
+            )
+        ))
+        rows = (await db.execute(query)).all()
+        barber_shops = {key: shop_id for kind, key, shop_id in rows if kind == "barber"}
+        return wanted - {(kind, key) for kind, key, _ in rows}, barber_shops
+
+    async def _occupied_slots(
+        self,
+        db: AsyncSession,
+        barber_ids: Set[uuid.UUID],
+        shop_ids: Set[uuid.UUID],
+        operations: list,
+        state: Dict[uuid.UUID, dict],
+    ) -> Dict[uuid.UUID, Dict[object, Slot]]:
+        """Load active bookings for the batch's barbers around every time the batch proposes."""
+        starts = []
+        ends = []
+        for operation in operations:
+            if operation.action == "create":
+                values = operation.data.model_dump()
+            elif operation.action == "update" and operation.id in state:
+                values = {**state[operation.id], **operation.data.model_dump(exclude_unset=True)}
+            else:
+                continue
+            slot = Slot.of(values["appointment_date"], values["duration_minutes"])
+            starts.append(slot.start)
+            ends.append(slot.end)
+
+        occupied: Dict[uuid.UUID, Dict[object, Slot]] = {}
+        if not starts or not barber_ids:
+            return occupied
+        rows = await db.execute(
+            select(Appointment.id, Appointment.barber_id, Appointment.appointment_date, Appointment.duration_minutes)
+            .where(
+                in_shops(shop_ids),
+                Appointment.barber_id.in_(barber_ids),
+                Appointment.appointment_date < max(ends),
+                Appointment.appointment_date > min(starts) - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+                Appointment.status.not_in(NON_BLOCKING_STATUSES),
+            )
+        )
+        for row in rows:
+            occupied.setdefault(row.barber_id, {})[row.id] = Slot.of(row.appointment_date, row.duration_minutes)
+        return occupied
+
+    def _batch_response(
+        self,
+        batch: AppointmentBatchRequest,
+        operations: list,
+        errors: Dict[int, str],
+        saved: Dict[int, Appointment],
+        committed: bool,
+    ) -> AppointmentBatchResponse:
+        results = []
+        for index, operation in enumerate(operations):
+            if index in errors:
+                results.append(
+                    AppointmentBatchResult(index=index, action=operation.action, ok=False, error=errors[index])
+                )
+            elif not committed:
+                results.append(
+                    AppointmentBatchResult(
+                        index=index, action=operation.action, ok=False, error="Not applied: another operation failed"
+                    )
+                )
+            else:
+                results.append(
+                    AppointmentBatchResult(
+                        index=index,
+                        action=operation.action,
+                        ok=True,
+                        appointment=AppointmentResponse.model_validate(saved[index]),
+                    )
+                )
+        failed = sum(1 for result in results if not result.ok)
+        return AppointmentBatchResponse(
+            mode=batch.mode,
+            committed=committed,
+            succeeded=len(results) - failed,
+            failed=failed,
+            results=results,
+        )
+
+
+booking_service = BookingService()
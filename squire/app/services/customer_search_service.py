@@ -0,0 +1,94 @@
+import re
+from typing import List, Sequence
+
+from sqlalchemy import Float, bindparam, collate, func, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from ..models.customer import Customer
+
+PHONE_CHARACTERS = re.compile(r"^[\d\s()+.\-/]+$")
+# Partial phone matches need a trigram's worth of digits to use the index
+MIN_PHONE_DIGITS = 3
+
+# Case-folded email in the C collation, matching idx_customers_email_lower
+email_key = collate(func.lower(Customer.email), "C")
+
+
+def normalize_phone(value: str) -> str:
+    """E.164 form of a phone number, computed the same way as customers.phone_e164."""
+    return "+" + re.sub(r"\D", "", re.sub(r"^\s*00", "", value))
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_kind(term: str) -> str:
+    """Which field a search term is aimed at: "email", "phone" or "name"."""
+    if "@" in term:
+        return "email"
+    if PHONE_CHARACTERS.match(term) and len(re.sub(r"\D", "", term)) >= MIN_PHONE_DIGITS:
+        return "phone"
+    return "name"
+
+
+class CustomerSearchService:
+    """Top-k customer lookup for the front desk, answered from the search indexes.
+
+    Phone numbers match on the normalized E.164 column, exactly or by any run
+    of digits; emails match case-insensitively by prefix; names match by
+    trigram word similarity, nearest first, so prefixes ("jo") and typos
+    ("jonh smtih") both find "John Smith".
+    """
+
+    async def search(
+        self, db: AsyncSession, term: str, limit: int, columns: Sequence[InstrumentedAttribute]
+    ) -> List[Row]:
+        term = term.strip()
+        kind = search_kind(term)
+        if kind == "email":
+            query = (
+                select(*columns)
+                .where(email_key.like(escape_like(term.lower()) + "%", escape="\\"))
+                .order_by(email_key, Customer.id)
+            )
+        elif kind == "phone":
+            return await self._search_phone(db, normalize_phone(term), limit, columns)
+        else:
+            # `<%` is true when the term is similar enough to some part of the
+            # name (pg_trgm.word_similarity_threshold); `<<->` is the matching
+            # distance, which the GiST index returns in order
+            pattern = bindparam("term", term)
+            query = (
+                select(*columns)
+                .where(pattern.op("<%", is_comparison=True)(Customer.name))
+                .order_by(pattern.op("<<->", return_type=Float)(Customer.name), Customer.id)
+            )
+        return (await db.execute(query.limit(limit))).all()
+
+    async def _search_phone(
+        self, db: AsyncSession, e164: str, limit: int, columns: Sequence[InstrumentedAttribute]
+    ) -> List[Row]:
+        """Exact matches first, then numbers containing the digits, in number order.
+
+        Two statements rather than one ORDER BY CASE: each can stop after
+        `limit` rows on an index, where ranking the exact match first would
+        sort every partial match, and a short run like "555" can match most
+        of the table.
+        """
+        query = select(*columns).where(Customer.phone_e164 == e164).order_by(Customer.id).limit(limit)
+        rows = (await db.execute(query)).all()
+        if len(rows) < limit:
+            query = (
+                select(*columns)
+                .where(Customer.phone_e164.like(f"%{e164[1:]}%"), Customer.phone_e164 != e164)
+                .order_by(Customer.phone_e164, Customer.id)
+                .limit(limit - len(rows))
+            )
+            rows += (await db.execute(query)).all()
+        return rows
+
+
+customer_search_service = CustomerSearchService()
@@ -0,0 +1,2 @@
+# The domain errors live in app.exceptions, where utils can raise them too
+from ..exceptions import ConflictError, InvalidRequestError, NotFoundError, ServiceError  # noqa: F401
@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import read_session
+from ..models.appointment import Appointment
+from ..models.archived_appointment import ArchivedAppointment
+
+# Same columns, in the same order, as booking/appointments.csv
+APPOINTMENT_EXPORT_COLUMNS = (
+    Appointment.id,
+    Appointment.barber_id,
+    Appointment.customer_id,
+    Appointment.service_id,
+    Appointment.appointment_date,
+    Appointment.duration_minutes,
+    Appointment.price,
+    Appointment.discount,
+    Appointment.booking_fee,
+    Appointment.surcharge,
+    Appointment.total_price,
+    Appointment.status,
+    Appointment.notes,
+    Appointment.created_at,
+    Appointment.updated_at,
+)
+EXPORT_HEADER = [column.key for column in APPOINTMENT_EXPORT_COLUMNS]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+DEFAULT_BATCH_SIZE = 2000
+
+
+def pg_timestamp(value: datetime) -> str:
+    """Format a timestamp the way Postgres prints timestamptz ("...+00")."""
+    text = value.isoformat(sep=" ")
+    if text[-6] in "+-" and text.endswith(":00"):
+        text = text[:-3]
+    return text
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return pg_timestamp(value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+async def iter_appointment_batches(
+    session: AsyncSession,
+    shop_id: Optional[uuid.UUID] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> AsyncIterator[list]:
+    """Yield appointment rows, archived ones included, in batches read through a server-side cursor."""
+    sources = []
+    for model in (Appointment, ArchivedAppointment):
+        source = select(*(getattr(model, name) for name in EXPORT_HEADER))
+        if shop_id is not None:
+            source = source.where(model.shop_id == shop_id)
+        if date_from is not None:
+            source = source.where(model.appointment_date >= date_from)
+        if date_to is not None:
+            source = source.where(model.appointment_date < date_to)
+        sources.append(source)
+    # One statement, so a row the archiver moves meanwhile is exported once
+    rows = union_all(*sources).subquery()
+    query = select(*rows.c).order_by(rows.c.appointment_date, rows.c.id)
+    result = await session.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def export_appointments(
+    export_format: str,
+    shop_id: Optional[uuid.UUID] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """Yield the export as text chunks, one chunk per fetched batch.
+
+    Opens its own session, on a read replica when one is available: a
+    streaming response outlives the request-scoped session from get_db.
+    """
+    async with read_session() as session:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if export_format == "csv":
+            writer.writerow(EXPORT_HEADER)
+        async for rows in iter_appointment_batches(session, shop_id, date_from, date_to, batch_size):
+            if export_format == "csv":
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(EXPORT_HEADER, row)), default=_json_default))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
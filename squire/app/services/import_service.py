@@ -0,0 +1,363 @@
+import csv
+import io
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..schemas.imports import ImportReport, ImportRowError, TableImportResult
+from .availability_service import WEEKDAYS
+from .exceptions import InvalidRequestError
+from .schedule_index import NON_BLOCKING_STATUSES, schedule_index
+
+ImportSource = Union[str, os.PathLike, BinaryIO]
+
+MAX_REPORTED_ERRORS = 1000
+UUID_PATTERN = "^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+INT_PATTERN = "^[+-]?[0-9]{1,9}$"
+BOOL_PATTERN = "^(t|f|true|false|y|n|yes|no|on|off|1|0)$"
+TIMESTAMP_PATTERN = (
+    "^[1-9][0-9]{3}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])"
+    "([ T]([01][0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9](\\.[0-9]{1,6})?)?)?"
+    "\\s*(Z|[+-]([01][0-9]|2[0-3])(:?[0-5][0-9])?)?$"
+)
+DAYS_PATTERN = "^\\{([a-z]+(,[a-z]+)*)?\\}$"
+
+# JSON validity can't be checked with a pattern; the exception block costs a
+# subtransaction per call, so it is only used for barbers.working_hours.
+IS_JSON_FUNCTION = """
+CREATE OR REPLACE FUNCTION pg_temp.import_is_json(value text) RETURNS boolean AS $$
+BEGIN
+    PERFORM value::jsonb;
+    RETURN true;
+EXCEPTION WHEN others THEN
+    RETURN false;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+
+@dataclass(frozen=True)
+class ImportColumn:
+    name: str
+    kind: str  # uuid, int, bool, timestamp, text, days, json
+    required: bool = False
+    default: Optional[str] = None
+    max_length: Optional[int] = None
+    choices: Tuple[str, ...] = ()
+    minimum: Optional[int] = None
+    references: Optional[str] = None
+    writable: bool = True
+
+
+@dataclass(frozen=True)
+class ImportTable:
+    name: str
+    columns: Tuple[ImportColumn, ...]
+    # (column, SQL expression over the checked row) for columns the file doesn't carry
+    derived: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+
+def _id() -> ImportColumn:
+    return ImportColumn("id", "uuid", default="gen_random_uuid()")
+
+
+def _timestamps() -> Tuple[ImportColumn, ...]:
+    return (
+        ImportColumn("created_at", "timestamp", default="CURRENT_TIMESTAMP"),
+        ImportColumn("updated_at", "timestamp", default="CURRENT_TIMESTAMP"),
+    )
+
+
+# Listed in load order: every table only references tables before it
+IMPORT_TABLES: Tuple[ImportTable, ...] = (
+    ImportTable("shops", (
+        _id(),
+        ImportColumn("name", "text", required=True, max_length=255),
+        ImportColumn("address", "text"),
+        ImportColumn("phone", "text", max_length=20),
+        ImportColumn("email", "text", max_length=255),
+        ImportColumn("timezone", "text", default="'UTC'", max_length=50),
+        *_timestamps(),
+    )),
+    ImportTable("barbers", (
+        _id(),
+        ImportColumn("shop_id", "uuid", required=True, references="shops"),
+        ImportColumn("name", "text", required=True, max_length=255),
+        ImportColumn("email", "text", max_length=255),
+        ImportColumn("phone", "text", max_length=20),
+        ImportColumn("days_on", "days", default="'{}'"),
+        ImportColumn("working_hours", "json", default="'[]'"),
+        ImportColumn("is_active", "bool", default="true"),
+        *_timestamps(),
+    )),
+    ImportTable("services", (
+        _id(),
+        ImportColumn("shop_id", "uuid", required=True, references="shops"),
+        ImportColumn("name", "text", required=True, max_length=255),
+        ImportColumn("description", "text"),
+        ImportColumn("price", "int", required=True, minimum=0),
+        ImportColumn("duration_minutes", "int", default="30", minimum=1),
+        ImportColumn("is_active", "bool", default="true"),
+        *_timestamps(),
+    )),
+    ImportTable("customers", (
+        _id(),
+        ImportColumn("name", "text", required=True, max_length=255),
+        ImportColumn("email", "text", max_length=255),
+        ImportColumn("phone", "text", required=True, max_length=20),
+        *_timestamps(),
+    )),
+    ImportTable("surcharge_settings", (
+        _id(),
+        ImportColumn("barber_id", "uuid", required=True, references="barbers"),
+        ImportColumn("type", "text", required=True, choices=("percentage", "fixed")),
+        ImportColumn("max_value", "int", default="50"),
+        ImportColumn("min_value", "int", default="0"),
+        ImportColumn("is_active", "bool", default="true"),
+        *_timestamps(),
+    )),
+    ImportTable("appointments", (
+        _id(),
+        ImportColumn("barber_id", "uuid", required=True, references="barbers"),
+        ImportColumn("customer_id", "uuid", required=True, references="customers"),
+        ImportColumn("service_id", "uuid", required=True, references="services"),
+        ImportColumn("appointment_date", "timestamp", required=True),
+        ImportColumn("duration_minutes", "int", required=True, minimum=1),
+        ImportColumn("price", "int", required=True),
+        ImportColumn("discount", "int", default="0"),
+        ImportColumn("booking_fee", "int", default="0"),
+        ImportColumn("surcharge", "int", default="0"),
+        # Generated by the database; accepted in the file and ignored
+        ImportColumn("total_price", "int", writable=False),
+        ImportColumn(
+            "status",
+            "text",
+            default="'scheduled'",
+            choices=("scheduled", "confirmed", "in_progress", "completed", "cancelled", "no_show"),
+        ),
+        ImportColumn("notes", "text"),
+        *_timestamps(),
+    ), derived=(
+        # The partition key comes from the barber
+        ("shop_id", "(SELECT b.shop_id FROM barbers b WHERE b.id = barber_id)"),
+    )),
+)
+TABLES_BY_NAME: Dict[str, ImportTable] = {table.name: table for table in IMPORT_TABLES}
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _source_value(column: ImportColumn) -> str:
+    # CSV "" arrives as an empty string; it only means "no value" for typed columns
+    return f"s.{column.name}" if column.kind == "text" else f"nullif(s.{column.name}, '')"
+
+
+def _validity(column: ImportColumn, value: str) -> str:
+    """SQL that is true when the non-null `value` can be cast safely."""
+    if column.kind == "uuid":
+        return f"{value} ~ {_literal(UUID_PATTERN)}"
+    if column.kind == "int":
+        if column.minimum is None:
+            return f"{value} ~ {_literal(INT_PATTERN)}"
+        return f"CASE WHEN {value} ~ {_literal(INT_PATTERN)} THEN {value}::int >= {column.minimum} ELSE false END"
+    if column.kind == "bool":
+        return f"{value} ~* {_literal(BOOL_PATTERN)}"
+    if column.kind == "timestamp":
+        # The pattern can't reject e.g. Feb 30; compare against the month length
+        day_check = (
+            f"substr({value}, 9, 2)::int <= extract(day from make_date(substr({value}, 1, 4)::int, "
+            f"substr({value}, 6, 2)::int, 1) + interval '1 month - 1 day')"
+        )
+        return f"CASE WHEN {value} ~ {_literal(TIMESTAMP_PATTERN)} THEN {day_check} ELSE false END"
+    if column.kind == "days":
+        allowed = ", ".join(_literal(day) for day in WEEKDAYS)
+        return f"CASE WHEN {value} ~ {_literal(DAYS_PATTERN)} THEN {value}::text[] <@ ARRAY[{allowed}] ELSE false END"
+    if column.kind == "json":
+        return (
+            f"CASE WHEN pg_temp.import_is_json({value}) "
+            f"THEN jsonb_typeof({value}::jsonb) = 'array' ELSE false END"
+        )
+    checks = []
+    if column.max_length is not None:
+        checks.append(f"char_length({value}) <= {column.max_length}")
+    if column.choices:
+        checks.append(f"{value} IN ({', '.join(_literal(choice) for choice in column.choices)})")
+    return " AND ".join(checks) or "true"
+
+
+def _cast(column: ImportColumn, value: str) -> str:
+    sql_type = {
+        "uuid": "uuid",
+        "int": "integer",
+        "bool": "boolean",
+        "timestamp": "timestamptz",
+        "days": "text[]",
+        "json": "jsonb",
+    }.get(column.kind)
+    return f"{value}::{sql_type}" if sql_type else value
+
+
+def _checked_table_sql(table: ImportTable) -> str:
+    """Cast the staged text into typed columns, recording the first problem per row.
+
+    The inner query evaluates each column's checks once; the outer query only
+    casts values whose check passed, so a bad row can never abort the batch.
+    """
+    raw_columns = []
+    typed_columns = []
+    error_cases = []
+    for column in table.columns:
+        value = _source_value(column)
+        raw_columns.append(f"{value} AS raw_{column.name}, ({_validity(column, value)}) AS ok_{column.name}")
+        typed_columns.append(f"CASE WHEN ok_{column.name} THEN {_cast(column, f'raw_{column.name}')} END AS {column.name}")
+        if column.required:
+            error_cases.append(f"WHEN raw_{column.name} IS NULL THEN {_literal(f'{column.name} is required')}")
+        error_cases.append(f"WHEN NOT ok_{column.name} THEN {_literal(f'invalid {column.name}')}")
+    return (
+        f"CREATE TEMP TABLE import_{table.name}_checked ON COMMIT DROP AS "
+        f"SELECT line, {', '.join(typed_columns)}, CASE {' '.join(error_cases)} END AS error "
+        f"FROM (SELECT s.line, {', '.join(raw_columns)} FROM import_{table.name} s) v"
+    )
+
+
+def _reference_checks(table: ImportTable) -> List[str]:
+    checked = f"import_{table.name}_checked"
+    statements = [
+        f"UPDATE {checked} c SET error = 'id already exists' "
+        f"WHERE c.error IS NULL AND c.id IS NOT NULL AND EXISTS (SELECT 1 FROM {table.name} t WHERE t.id = c.id)",
+        f"UPDATE {checked} c SET error = 'duplicate id in file' FROM ("
+        f"SELECT line, row_number() OVER (PARTITION BY id ORDER BY line) AS n "
+        f"FROM {checked} WHERE error IS NULL AND id IS NOT NULL"
+        f") d WHERE c.line = d.line AND d.n > 1",
+    ]
+    for column in table.columns:
+        if column.references:
+            statements.append(
+                f"UPDATE {checked} c SET error = {_literal(f'unknown {column.name}')} "
+                f"WHERE c.error IS NULL AND NOT EXISTS "
+                f"(SELECT 1 FROM {column.references} t WHERE t.id = c.{column.name})"
+            )
+    return statements
+
+
+def _appointment_overlap_checks() -> List[str]:
+    """Reject rows that would violate the appointments partitions' no-overlap constraints."""
+    blocking = ", ".join(_literal(status) for status in NON_BLOCKING_STATUSES)
+    return [
+        "UPDATE import_appointments_checked c SET error = 'overlaps an existing appointment' "
+        f"WHERE c.error IS NULL AND coalesce(c.status, 'scheduled') NOT IN ({blocking}) AND EXISTS ("
+        "SELECT 1 FROM appointments a WHERE a.shop_id = (SELECT b.shop_id FROM barbers b WHERE b.id = c.barber_id) "
+        "AND a.barber_id = c.barber_id "
+        f"AND a.status NOT IN ({blocking}) "
+        "AND appointment_period(a.appointment_date, a.duration_minutes) "
+        "&& appointment_period(c.appointment_date, c.duration_minutes))",
+        # A row overlaps an earlier one in the file when it starts before the
+        # latest end time seen so far for the same barber
+        "UPDATE import_appointments_checked c SET error = 'overlaps another appointment in the file' FROM ("
+        "SELECT line, appointment_date < max(appointment_date + make_interval(mins => duration_minutes)) OVER ("
+        "PARTITION BY barber_id ORDER BY appointment_date, line "
+        "ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS overlaps "
+        "FROM import_appointments_checked "
+        f"WHERE error IS NULL AND coalesce(status, 'scheduled') NOT IN ({blocking})"
+        ") o WHERE c.line = o.line AND o.overlaps",
+    ]
+
+
+def _insert_sql(table: ImportTable) -> str:
+    columns = [column for column in table.columns if column.writable]
+    names = [column.name for column in columns] + [name for name, _ in table.derived]
+    values = [
+        f"coalesce({column.name}, {column.default})" if column.default else column.name for column in columns
+    ] + [expression for _, expression in table.derived]
+    return (
+        f"INSERT INTO {table.name} ({', '.join(names)}) "
+        f"SELECT {', '.join(values)} FROM import_{table.name}_checked WHERE error IS NULL ORDER BY line"
+    )
+
+
+def read_header(source: ImportSource) -> List[str]:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as handle:
+            first_line = handle.readline()
+    else:
+        first_line = source.readline()
+        source.seek(0)
+    return next(csv.reader(io.StringIO(first_line.decode("utf-8-sig"))), [])
+
+
+class ImportService:
+    """Loads booking/*.csv style files with COPY and set-based validation.
+
+    Every file is streamed with COPY into a text-typed temp staging table, so
+    Postgres does the CSV parsing. Casting, constraint and foreign key checks
+    then run as a handful of statements per table, rows that fail get an
+    error message instead of aborting the batch, and the remaining rows go in
+    with a single INSERT ... SELECT. Tables load in IMPORT_TABLES order inside
+    one transaction, so foreign keys can point at rows from the same import.
+    """
+
+    async def import_files(self, db: AsyncSession, sources: Dict[str, ImportSource]) -> ImportReport:
+        unknown = sorted(set(sources) - set(TABLES_BY_NAME))
+        if unknown:
+            raise InvalidRequestError(f"Unknown import tables: {', '.join(unknown)}")
+
+        # The first statement opens the transaction the raw COPY calls join
+        await db.execute(text(IS_JSON_FUNCTION))
+        connection = await db.connection()
+        driver = (await connection.get_raw_connection()).driver_connection
+
+        results = []
+        for table in IMPORT_TABLES:
+            if table.name in sources:
+                results.append(await self._import_table(driver, table, sources[table.name]))
+        await db.commit()
+        # New barbers and bookings bypass the schedule index hooks
+        schedule_index.clear()
+        return ImportReport(tables=results)
+
+    async def _import_table(self, driver, table: ImportTable, source: ImportSource) -> TableImportResult:
+        header = read_header(source)
+        unknown = [name for name in header if name not in table.column_names]
+        if unknown or len(set(header)) != len(header):
+            raise InvalidRequestError(f"{table.name}: unexpected or duplicate columns {unknown or header}")
+
+        staging_columns = ", ".join(f"{name} text" for name in table.column_names)
+        await driver.execute(
+            f"CREATE TEMP TABLE import_{table.name} "
+            f"(line bigint GENERATED ALWAYS AS IDENTITY, {staging_columns}) ON COMMIT DROP"
+        )
+        await driver.copy_to_table(f"import_{table.name}", source=source, columns=header, format="csv", header=True)
+        await driver.execute(_checked_table_sql(table))
+
+        checks = _reference_checks(table)
+        if table.name == "appointments":
+            checks += _appointment_overlap_checks()
+        for statement in checks:
+            await driver.execute(statement)
+
+        status = await driver.execute(_insert_sql(table))
+        imported = int(status.split()[-1])
+        checked = f"import_{table.name}_checked"
+        failed = await driver.fetchval(f"SELECT count(*) FROM {checked} WHERE error IS NOT NULL")
+        errors = await driver.fetch(
+            f"SELECT line, error FROM {checked} WHERE error IS NOT NULL ORDER BY line LIMIT {MAX_REPORTED_ERRORS}"
+        )
+        return TableImportResult(
+            table=table.name,
+            rows=imported + failed,
+            imported=imported,
+            failed=failed,
+            errors=[ImportRowError(row=record["line"], message=record["error"]) for record in errors],
+        )
+
+
+import_service = ImportService()
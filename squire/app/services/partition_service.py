@@ -0,0 +1,264 @@
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .exceptions import ConflictError
+from .schedule_index import FINISHED_STATUSES, NON_BLOCKING_STATUSES
+
+DEFAULT_PARTITIONS = 16
+LEGACY_TABLE = "appointments_unpartitioned"
+# Every column of the old table, in order; total_price is generated and shop_id comes from the barber
+APPOINTMENT_COLUMNS = (
+    "id",
+    "barber_id",
+    "customer_id",
+    "service_id",
+    "appointment_date",
+    "duration_minutes",
+    "price",
+    "discount",
+    "booking_fee",
+    "surcharge",
+    "status",
+    "notes",
+    "created_at",
+    "updated_at",
+)
+# Columns of the old table that databases created before them don't have
+OPTIONAL_COLUMNS = ("series_id",)
+APPOINTMENT_INDEXES = (
+    ("idx_appointments_barber_date", "barber_id, appointment_date"),
+    ("idx_appointments_shop_date", "shop_id, appointment_date"),
+    ("idx_appointments_customer_id", "customer_id"),
+    ("idx_appointments_service_id", "service_id"),
+    ("idx_appointments_date", "appointment_date, id"),
+    ("idx_appointments_status", "status"),
+    ("idx_appointments_series", "series_id, appointment_date"),
+)
+
+# Statement triggers on appointments, as (trigger name prefix, function); each
+# has one trigger per event, since a trigger with transition tables can't share
+STATEMENT_TRIGGERS = (
+    ("appointment_daily_stats", "apply_appointment_daily_stats"),
+    ("notify_appointment_changes", "notify_appointment_changes"),
+)
+# (event, transition tables)
+TRIGGER_EVENTS = (
+    ("INSERT", "NEW TABLE AS new_rows"),
+    ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+# Overlaps reported by a refused migration
+MAX_REPORTED_OVERLAPS = 20
+
+
+def overlapping_appointments_sql() -> str:
+    """Ids of the appointments the partitions' no-overlap constraints would refuse.
+
+    Each blocking appointment overlapping an earlier-created one of the same
+    barber's; keeping only the earliest created of every overlap leaves none.
+    """
+    blocking = ", ".join(f"'{status}'" for status in NON_BLOCKING_STATUSES)
+    return (
+        "SELECT a.id FROM appointments a "
+        f"WHERE a.status NOT IN ({blocking}) AND EXISTS ("
+        "SELECT 1 FROM appointments b WHERE b.barber_id = a.barber_id "
+        f"AND b.status NOT IN ({blocking}) "
+        "AND (coalesce(b.created_at, '-infinity'), b.id) < (coalesce(a.created_at, '-infinity'), a.id) "
+        "AND appointment_period(b.appointment_date, b.duration_minutes) "
+        "&& appointment_period(a.appointment_date, a.duration_minutes)"
+        ") ORDER BY a.appointment_date, a.id"
+    )
+
+
+def partition_name(remainder: int) -> str:
+    return f"appointments_p{remainder:02d}"
+
+
+def partitioned_appointments_ddl(
+    partitions: int,
+    statement_triggers: Sequence[Tuple[str, str]] = STATEMENT_TRIGGERS,
+    series_table: bool = True,
+) -> List[str]:
+    """Statements creating the hash-partitioned appointments table, as in init/init.sql.
+
+    Without `series_table`, series_id gets no foreign key to appointment_series.
+    """
+    blocking = ", ".join(f"'{status}'" for status in NON_BLOCKING_STATUSES)
+    series_reference = " REFERENCES appointment_series(id) ON DELETE SET NULL" if series_table else ""
+    statements = [
+        "CREATE TABLE appointments ("
+        "id UUID NOT NULL DEFAULT gen_random_uuid(), "
+        "shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE, "
+        "barber_id UUID NOT NULL, "
+        "customer_id UUID NOT NULL REFERENCES customers(id) ON DELETE CASCADE, "
+        "service_id UUID NOT NULL REFERENCES services(id) ON DELETE RESTRICT, "
+        "appointment_date TIMESTAMP WITH TIME ZONE NOT NULL, "
+        "duration_minutes INTEGER NOT NULL, "
+        "price INTEGER NOT NULL, "
+        "discount INTEGER DEFAULT 0, "
+        "booking_fee INTEGER DEFAULT 0, "
+        "surcharge INTEGER DEFAULT 0, "
+        "total_price INTEGER GENERATED ALWAYS AS (price - discount + booking_fee + surcharge) STORED, "
+        "status VARCHAR(20) DEFAULT 'scheduled' CHECK (status IN "
+        "('scheduled', 'confirmed', 'in_progress', 'completed', 'cancelled', 'no_show')), "
+        "notes TEXT, "
+        f"series_id UUID{series_reference}, "
+        "created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, "
+        "updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, "
+        "PRIMARY KEY (id, shop_id), "
+        "FOREIGN KEY (barber_id, shop_id) REFERENCES barbers(id, shop_id) ON DELETE CASCADE"
+        ") PARTITION BY HASH (shop_id)",
+    ]
+    for remainder in range(partitions):
+        name = partition_name(remainder)
+        statements.append(
+            f"CREATE TABLE {name} PARTITION OF appointments "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+        statements.append(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_no_overlap EXCLUDE USING gist ("
+            "barber_id WITH =, appointment_period(appointment_date, duration_minutes) WITH &&"
+            f") WHERE (status NOT IN ({blocking}))"
+        )
+    statements.extend(f"CREATE INDEX {name} ON appointments({columns})" for name, columns in APPOINTMENT_INDEXES)
+    finished = ", ".join(f"'{status}'" for status in FINISHED_STATUSES)
+    statements.append(
+        f"CREATE INDEX idx_appointments_archivable ON appointments(appointment_date) WHERE (status IN ({finished}))"
+    )
+    statements.append(
+        "CREATE TRIGGER update_appointments_updated_at BEFORE UPDATE ON appointments "
+        "FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()"
+    )
+    statements.extend(
+        f"CREATE TRIGGER {prefix}_{event.lower()} AFTER {event} ON appointments "
+        f"REFERENCING {tables} FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        for prefix, function in statement_triggers
+        for event, tables in TRIGGER_EVENTS
+    )
+    return statements
+
+
+@dataclass
+class PartitionReport:
+    partitions: int
+    rows_moved: int
+    legacy_table_kept: bool
+    overlaps_cancelled: int = 0
+
+
+class PartitionService:
+    """Converts a plain appointments table into the hash-partitioned layout.
+
+    Runs in one transaction holding an ACCESS EXCLUSIVE lock on the old
+    table, so bookings wait (rather than fail or get lost) while rows are
+    copied: the old table is renamed to LEGACY_TABLE, its indexes get an
+    "_old" suffix so the new ones can take their names, the partitioned
+    table is created and filled with INSERT ... SELECT (shop_id taken from
+    each appointment's barber), and the old table is dropped unless asked
+    to keep it.
+
+    The partitions refuse overlapping bookings for a barber, which the old
+    table may hold. They are found before anything changes: the migration
+    stops with a ConflictError naming them or, with `cancel_overlaps`,
+    cancels all but the earliest created of each.
+    """
+
+    async def is_partitioned(self, db: AsyncSession) -> bool:
+        kind = await db.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('appointments')"))
+        return kind == "p"
+
+    async def migrate(
+        self,
+        db: AsyncSession,
+        partitions: int = DEFAULT_PARTITIONS,
+        keep_legacy: bool = False,
+        cancel_overlaps: bool = False,
+    ) -> PartitionReport:
+        if await self.is_partitioned(db):
+            raise ConflictError("appointments is already partitioned")
+        if await db.scalar(text(f"SELECT to_regclass('{LEGACY_TABLE}') IS NOT NULL")):
+            raise ConflictError(f"{LEGACY_TABLE} already exists; drop it or finish the previous migration")
+
+        await db.execute(text("LOCK TABLE appointments IN ACCESS EXCLUSIVE MODE"))
+        overlapping = (await db.scalars(text(overlapping_appointments_sql()))).all()
+        if overlapping and not cancel_overlaps:
+            listed = ", ".join(str(appointment_id) for appointment_id in overlapping[:MAX_REPORTED_OVERLAPS])
+            more = len(overlapping) - MAX_REPORTED_OVERLAPS
+            raise ConflictError(
+                f"{len(overlapping)} appointments overlap an earlier booking of the same barber: {listed}"
+                + (f" and {more} more" if more > 0 else "")
+                + "; cancel them or rerun with cancel_overlaps"
+            )
+        if overlapping:
+            await db.execute(
+                text("UPDATE appointments SET status = 'cancelled', updated_at = now() WHERE id = ANY(:ids)"),
+                {"ids": list(overlapping)},
+            )
+        await db.execute(text(f"ALTER TABLE appointments RENAME TO {LEGACY_TABLE}"))
+        index_names = await db.scalars(
+            text("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:table AS regclass)"),
+            {"table": LEGACY_TABLE},
+        )
+        # Renaming a constraint's index renames the constraint too
+        for name in index_names.all():
+            await db.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:59]}_old"'))
+        await db.execute(text(f"DROP TRIGGER IF EXISTS update_appointments_updated_at ON {LEGACY_TABLE}"))
+        for prefix, _ in STATEMENT_TRIGGERS:
+            for event, _ in TRIGGER_EVENTS:
+                await db.execute(text(f"DROP TRIGGER IF EXISTS {prefix}_{event.lower()} ON {LEGACY_TABLE}"))
+
+        has_key = await db.scalar(
+            text("SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'barbers_id_shop_id_key')")
+        )
+        if not has_key:
+            await db.execute(text("ALTER TABLE barbers ADD CONSTRAINT barbers_id_shop_id_key UNIQUE (id, shop_id)"))
+        # Databases created before a trigger function existed don't get its triggers
+        installed = [
+            (prefix, function)
+            for prefix, function in STATEMENT_TRIGGERS
+            if await db.scalar(text("SELECT to_regproc(:function) IS NOT NULL"), {"function": function})
+        ]
+        # Nor, before recurring appointments, the series table series_id refers to
+        series_table = await db.scalar(text("SELECT to_regclass('appointment_series') IS NOT NULL"))
+        for statement in partitioned_appointments_ddl(partitions, installed, series_table):
+            await db.execute(text(statement))
+        if ("appointment_daily_stats", "apply_appointment_daily_stats") in installed:
+            # The copy below fires the new table's rollup triggers, which rebuild the stats
+            await db.execute(text("DELETE FROM appointment_daily_stats"))
+
+        legacy_columns = set(
+            await db.scalars(
+                text(
+                    "SELECT attname FROM pg_attribute WHERE attrelid = CAST(:table AS regclass) "
+                    "AND attnum > 0 AND NOT attisdropped"
+                ),
+                {"table": LEGACY_TABLE},
+            )
+        )
+        copied = [column for column in APPOINTMENT_COLUMNS + OPTIONAL_COLUMNS if column in legacy_columns]
+        columns = ", ".join(copied)
+        selected = ", ".join(f"a.{column}" for column in copied)
+        moved = await db.execute(
+            text(
+                f"INSERT INTO appointments (shop_id, {columns}) "
+                f"SELECT b.shop_id, {selected} FROM {LEGACY_TABLE} a JOIN barbers b ON b.id = a.barber_id"
+            )
+        )
+        if not keep_legacy:
+            await db.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        await db.execute(text("ANALYZE appointments"))
+        await db.commit()
+        return PartitionReport(
+            partitions=partitions,
+            rows_moved=moved.rowcount,
+            legacy_table_kept=keep_legacy,
+            overlaps_cancelled=len(overlapping),
+        )
+
+
+partition_service = PartitionService()
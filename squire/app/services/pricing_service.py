@@ -0,0 +1,186 @@
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.barber import Barber
+from ..models.service import Service
+from ..models.shop import Shop
+from ..models.surcharge_setting import SurchargeSetting
+from ..schemas.quote import Quote, QuoteBatchResponse, QuoteCandidate
+from ..utils.timezones import MINUTES_PER_DAY, LocalDay, local_day
+from .availability_service import BarberSchedule, busy_masks
+from .schedule_index import BarberTimeline, epoch_minute, minute_datetime, schedule_index
+
+EPOCH = date(1970, 1, 1)
+
+
+@dataclass
+class SurchargeRule:
+    type: str
+    min_value: int
+    max_value: int
+
+
+@dataclass
+class BarberPricing:
+    shop_id: uuid.UUID
+    timezone: str
+    schedule: BarberSchedule
+    rules: List[SurchargeRule]
+
+
+@dataclass
+class ServicePricing:
+    shop_id: uuid.UUID
+    price: int
+    duration_minutes: int
+
+
+def surcharge_for(rules: Sequence[SurchargeRule], price: int, booked: int, working: int) -> int:
+    """Sum the barber's active surcharges, each scaled from min to max by the day's occupancy.
+
+    `booked` and `working` are minutes; percentage rules are points of `price`,
+    fixed rules are cents. Integer arithmetic keeps quotes exact and stable.
+    """
+    total = 0
+    for rule in rules:
+        value = rule.min_value
+        if working:
+            value += (rule.max_value - rule.min_value) * booked // working
+        total += price * value // 100 if rule.type == "percentage" else value
+    return total
+
+
+def day_of(tz_name: str, minute: int) -> LocalDay:
+    """The shop-local day containing a UTC epoch minute, from the (timezone, date) cache."""
+    day = local_day(tz_name, EPOCH + timedelta(days=minute // MINUTES_PER_DAY))
+    if minute < day.start:
+        return local_day(tz_name, day.date - timedelta(days=1))
+    if minute >= day.end:
+        return local_day(tz_name, day.date + timedelta(days=1))
+    return day
+
+
+class PricingService:
+    """Quotes many (barber, service, start) candidates at once.
+
+    Services, barbers, their shops' timezones and active surcharge settings
+    are loaded with one query each, bookings come from the schedule index,
+    and every candidate is then priced in memory. A barber's occupancy on a
+    given local day (booked share of working minutes) is computed once, from
+    the availability bitmaps, and shared by all candidates on that day.
+    """
+
+    async def quote_batch(self, db: AsyncSession, candidates: Sequence[QuoteCandidate]) -> QuoteBatchResponse:
+        service_ids = {candidate.service_id for candidate in candidates}
+        barber_ids = {candidate.barber_id for candidate in candidates}
+
+        services = {
+            row.id: ServicePricing(row.shop_id, row.price, row.duration_minutes)
+            for row in await db.execute(
+                select(Service.id, Service.shop_id, Service.price, Service.duration_minutes).where(
+                    Service.id.in_(service_ids), Service.is_active.is_not(False)
+                )
+            )
+        }
+        barbers = {
+            row.id: BarberPricing(
+                row.shop_id,
+                row.timezone,
+                BarberSchedule.from_barber(row.id, row.days_on, row.working_hours),
+                [],
+            )
+            for row in await db.execute(
+                select(Barber.id, Barber.shop_id, Barber.days_on, Barber.working_hours, Shop.timezone)
+                .join(Shop, Shop.id == Barber.shop_id)
+                .where(Barber.id.in_(barber_ids), Barber.is_active.is_not(False))
+            )
+        }
+        if barbers:
+            rules = await db.execute(
+                select(
+                    SurchargeSetting.barber_id,
+                    SurchargeSetting.type,
+                    SurchargeSetting.min_value,
+                    SurchargeSetting.max_value,
+                ).where(SurchargeSetting.barber_id.in_(barbers), SurchargeSetting.is_active.is_not(False))
+            )
+            for row in rules:
+                barbers[row.barber_id].rules.append(SurchargeRule(row.type, row.min_value, row.max_value))
+
+        # By epoch minute, as naive starts (taken as UTC) and aware ones can't be compared directly
+        since = minute_datetime(min(epoch_minute(candidate.start) for candidate in candidates)) - timedelta(days=1)
+        shop_ids = {barber.shop_id for barber in barbers.values()}
+        timelines = await schedule_index.timelines(db, list(barbers), since, shop_ids) if barbers else {}
+        return QuoteBatchResponse(quotes=self.price(candidates, services, barbers, timelines))
+
+    def price(
+        self,
+        candidates: Sequence[QuoteCandidate],
+        services: Dict[uuid.UUID, ServicePricing],
+        barbers: Dict[uuid.UUID, BarberPricing],
+        timelines: Dict[uuid.UUID, BarberTimeline],
+    ) -> List[Quote]:
+        booking_fee = settings.BOOKING_FEE
+        # (barber, day start) -> (working mask, busy mask, booked minutes, working minutes)
+        days: Dict[Tuple[uuid.UUID, int], Tuple[int, int, int, int]] = {}
+        quotes = []
+        for index, candidate in enumerate(candidates):
+            service = services.get(candidate.service_id)
+            barber = barbers.get(candidate.barber_id)
+            error = None
+            if service is None:
+                error = "Service not found"
+            elif barber is None:
+                error = "Barber not found"
+            elif service.shop_id != barber.shop_id:
+                error = "Service is not offered in the barber's shop"
+            if error:
+                quotes.append(
+                    Quote(
+                        index=index,
+                        barber_id=candidate.barber_id,
+                        service_id=candidate.service_id,
+                        start=candidate.start,
+                        ok=False,
+                        error=error,
+                    )
+                )
+                continue
+
+            start = epoch_minute(candidate.start)
+            day = day_of(barber.timezone, start)
+            key = (candidate.barber_id, day.start)
+            occupancy = days.get(key)
+            if occupancy is None:
+                working = barber.schedule.day_mask(day)
+                busy = busy_masks(timelines[candidate.barber_id].busy(day.start, day.end), [day]).get(0, 0)
+                occupancy = days[key] = (working, busy, (busy & working).bit_count(), working.bit_count())
+            working, busy, booked_minutes, working_minutes = occupancy
+
+            span = ((1 << service.duration_minutes) - 1) << (start - day.start)
+            surcharge = surcharge_for(barber.rules, service.price, booked_minutes, working_minutes)
+            quotes.append(
+                Quote(
+                    index=index,
+                    barber_id=candidate.barber_id,
+                    service_id=candidate.service_id,
+                    start=candidate.start,
+                    ok=True,
+                    available=(working & span) == span and not (busy & span),
+                    price=service.price,
+                    discount=0,
+                    booking_fee=booking_fee,
+                    surcharge=surcharge,
+                    total_price=service.price + booking_fee + surcharge,
+                )
+            )
+        return quotes
+
+
+pricing_service = PricingService()
@@ -0,0 +1,474 @@
+import uuid
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.appointment import Appointment
+from ..models.appointment_series import AppointmentSeries
+from ..models.barber import Barber
+from ..models.customer import Customer
+from ..models.service import Service
+from ..models.shop import Shop
+from ..schemas.appointment import AppointmentResponse
+from ..schemas.appointment_series import (
+    AppointmentSeriesCreate,
+    AppointmentSeriesCreateResponse,
+    AppointmentSeriesResponse,
+    SeriesOccurrence,
+    SkippedOccurrence,
+)
+from ..utils.timezones import local_date, local_day, zone
+from .availability_service import WEEKDAYS, BarberSchedule
+from .booking_service import booking_service
+from .exceptions import InvalidRequestError, NotFoundError
+from .schedule_index import NON_BLOCKING_STATUSES, epoch_minute, minute_datetime, schedule_index
+
+# Occurrences that can still be cancelled when a series ends
+OPEN_STATUSES = ("scheduled", "confirmed")
+
+# Every proposed occurrence against the barber's active bookings in one
+# statement. The overlap test and status filter are those of the partitions'
+# exclusion constraints, so each occurrence is one probe of their GiST index.
+CONFLICTS_SQL = text(
+    "SELECT occurrence.start_at, appointments.id "
+    "FROM unnest(CAST(:starts AS timestamptz[])) AS occurrence(start_at) "
+    "JOIN appointments "
+    "ON appointments.shop_id = :shop_id "
+    "AND appointments.barber_id = :barber_id "
+    f"AND appointments.status NOT IN ({', '.join(repr(status) for status in NON_BLOCKING_STATUSES)}) "
+    "AND appointment_period(appointments.appointment_date, appointments.duration_minutes) "
+    "&& appointment_period(occurrence.start_at, :minutes)"
+)
+
+
+@dataclass(frozen=True)
+class Recurrence:
+    """The date pattern of a series, in the RRULE subset the API accepts.
+
+    FREQ is daily, weekly or monthly with an INTERVAL (`every`); weekly
+    series may list weekdays (BYDAY), and monthly ones repeat on the start
+    date's day of the month, skipping months that don't have it as RFC 5545
+    does. UNTIL and COUNT (`max_occurrences`) both bound the series.
+    """
+
+    frequency: str
+    every: int
+    weekdays: Tuple[int, ...]
+    start_date: date
+    until: Optional[date]
+    max_occurrences: Optional[int]
+
+    @classmethod
+    def of(cls, series) -> "Recurrence":
+        """Build from an AppointmentSeries row or an AppointmentSeriesCreate."""
+        weekdays = tuple(sorted({WEEKDAYS.index(day) for day in series.weekdays}))
+        return cls(
+            frequency=series.frequency,
+            every=series.every,
+            weekdays=weekdays or (series.start_date.weekday(),),
+            start_date=series.start_date,
+            until=series.until,
+            max_occurrences=series.max_occurrences,
+        )
+
+    def dates(self, first: date, last: date) -> Iterator[date]:
+        """Occurrence dates from `first` through `last`, in order."""
+        if self.until is not None:
+            last = min(last, self.until)
+        first = max(first, self.start_date)
+        if first > last:
+            return
+        for ordinal, day in self._candidates(first):
+            if day > last or (self.max_occurrences is not None and ordinal >= self.max_occurrences):
+                return
+            if day >= first:
+                yield day
+
+    def _candidates(self, first: date) -> Iterator[Tuple[int, date]]:
+        """(ordinal, date) of every occurrence, starting at or shortly before `first`.
+
+        Daily and weekly patterns jump straight to `first`, computing the
+        ordinal; monthly ones do when there's no COUNT to keep.
+        """
+        start = self.start_date
+        if self.frequency == "daily":
+            number = max(0, (first - start).days // self.every)
+            while True:
+                yield number, start + timedelta(days=number * self.every)
+                number += 1
+        elif self.frequency == "weekly":
+            monday = start - timedelta(days=start.weekday())
+            # The first week only has the weekdays from start_date on
+            head = [weekday for weekday in self.weekdays if weekday >= start.weekday()]
+            period = 7 * self.every
+            week = max(0, (first - monday).days // period)
+            while True:
+                week_start = monday + timedelta(days=week * period)
+                if week == 0:
+                    for ordinal, weekday in enumerate(head):
+                        yield ordinal, week_start + timedelta(days=weekday)
+                else:
+                    before = len(head) + (week - 1) * len(self.weekdays)
+                    for index, weekday in enumerate(self.weekdays):
+                        yield before + index, week_start + timedelta(days=weekday)
+                week += 1
+        else:
+            number = ordinal = 0
+            if self.max_occurrences is None:
+                months = (first.year - start.year) * 12 + first.month - start.month
+                number = max(0, months // self.every)
+            while True:
+                month = start.month - 1 + number * self.every
+                year, month = start.year + month // 12, month % 12 + 1
+                if start.day <= monthrange(year, month)[1]:
+                    yield ordinal, date(year, month, start.day)
+                    ordinal += 1
+                number += 1
+
+
+def occurrence_start(day: date, at: time, tz_name: str) -> datetime:
+    """UTC start of an occurrence at shop-local wall-clock time `at` (fold=0 across DST changes)."""
+    return datetime.combine(day, at, tzinfo=zone(tz_name)).astimezone(timezone.utc)
+
+
+@dataclass
+class BarberContext:
+    shop_id: uuid.UUID
+    timezone: str
+    is_active: bool
+    schedule: BarberSchedule
+
+    def works(self, start: datetime, duration_minutes: int) -> bool:
+        """Whether the barber's working hours cover the whole appointment."""
+        day = local_day(self.timezone, local_date(self.timezone, start))
+        span = ((1 << duration_minutes) - 1) << (epoch_minute(start) - day.start)
+        return (self.schedule.day_mask(day) & span) == span
+
+
+class RecurrenceService:
+    """Books recurring appointments as a rolling window of real appointments.
+
+    A series stores its pattern; occurrences from its start through a
+    horizon SERIES_HORIZON_DAYS ahead are expanded, checked and inserted at
+    once. The check is set-based: working hours in memory, then a single
+    query matching every proposed start against the barber's bookings.
+    Dates beyond the horizon cost nothing until they're needed: reads of a
+    series' occurrences extend the window first, as does `app.cli
+    extend-series` for every series in bulk, and anything further out is
+    computed from the pattern. An occurrence that isn't free when its turn
+    comes is recorded in skipped_dates instead of being booked.
+
+    Writes hold the barber's locks (see BookingService), so they serialize
+    with single bookings and batches.
+    """
+
+    async def create_series(
+        self, db: AsyncSession, series_in: AppointmentSeriesCreate, now: Optional[datetime] = None
+    ) -> AppointmentSeriesCreateResponse:
+        self._validate(series_in)
+        barber = await self._barber_context(db, series_in.barber_id)
+        if not barber.is_active:
+            raise InvalidRequestError(f"Barber {series_in.barber_id} is not active")
+        service = await db.get(Service, series_in.service_id)
+        if not service or service.shop_id != barber.shop_id:
+            raise NotFoundError(f"Service with id {series_in.service_id} not found in the barber's shop")
+        if await db.scalar(select(Customer.id).where(Customer.id == series_in.customer_id)) is None:
+            raise NotFoundError(f"Customer with id {series_in.customer_id} not found")
+
+        now = now or datetime.now(timezone.utc)
+        today = local_date(barber.timezone, now)
+        if series_in.start_date < today:
+            raise InvalidRequestError("start_date is in the past")
+        horizon = today + timedelta(days=settings.SERIES_HORIZON_DAYS)
+
+        values = series_in.model_dump(exclude={"on_conflict"})
+        values["duration_minutes"] = series_in.duration_minutes or service.duration_minutes
+        if series_in.price is None:
+            values["price"] = service.price
+        series = AppointmentSeries(**values, id=uuid.uuid4(), shop_id=barber.shop_id, materialized_until=horizon)
+
+        async with booking_service.hold_barber(db, series.barber_id):
+            free, skipped = await self._plan(db, series, barber, series.start_date, horizon, now)
+            if skipped and series_in.on_conflict == "fail":
+                await db.rollback()
+                return AppointmentSeriesCreateResponse(committed=False, created=[], skipped=skipped)
+            series.skipped_dates = [occurrence.date for occurrence in skipped]
+            async with booking_service.translate_conflicts(db):
+                db.add(series)
+                await db.flush()
+                created = await self._insert(db, series, free)
+                await db.commit()
+            for appointment in created:
+                schedule_index.appointment_saved(appointment)
+
+        return AppointmentSeriesCreateResponse(
+            committed=True,
+            series=AppointmentSeriesResponse.model_validate(series),
+            created=[AppointmentResponse.model_validate(appointment) for appointment in created],
+            skipped=skipped,
+        )
+
+    async def get_series(self, db: AsyncSession, series_id: uuid.UUID) -> AppointmentSeries:
+        series = await db.get(AppointmentSeries, series_id)
+        if not series:
+            raise NotFoundError("Appointment series not found")
+        return series
+
+    async def extend_series(
+        self,
+        db: AsyncSession,
+        series_id: uuid.UUID,
+        through: Optional[date] = None,
+        now: Optional[datetime] = None,
+    ) -> Tuple[AppointmentSeries, int]:
+        """Book the series' occurrences up to `through` (at most the horizon); return it and the number booked."""
+        series = await self.get_series(db, series_id)
+        barber = await self._barber_context(db, series.barber_id)
+        now = now or datetime.now(timezone.utc)
+        horizon = local_date(barber.timezone, now) + timedelta(days=settings.SERIES_HORIZON_DAYS)
+        through = min(through or horizon, horizon)
+        if not series.is_active or series.materialized_until >= through:
+            return series, 0
+
+        async with booking_service.hold_barber(db, series.barber_id):
+            # Another worker may have extended it while this one waited
+            series = await db.scalar(
+                select(AppointmentSeries)
+                .where(AppointmentSeries.id == series_id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            if not series.is_active or series.materialized_until >= through:
+                await db.rollback()
+                return series, 0
+            first = max(series.materialized_until + timedelta(days=1), series.start_date)
+            free, skipped = await self._plan(db, series, barber, first, through, now)
+            async with booking_service.translate_conflicts(db):
+                created = await self._insert(db, series, free)
+                series.materialized_until = through
+                if skipped:
+                    series.skipped_dates = [*series.skipped_dates, *(occurrence.date for occurrence in skipped)]
+                await db.commit()
+            for appointment in created:
+                schedule_index.appointment_saved(appointment)
+        return series, len(created)
+
+    async def extend_all(self, db: AsyncSession, now: Optional[datetime] = None) -> Tuple[int, int]:
+        """Extend every active series that may be behind its horizon.
+
+        Returns (series checked, appointments booked). Each series commits on
+        its own, so a long run holds no barber's lock for more than one series.
+        """
+        now = now or datetime.now(timezone.utc)
+        # A day of slack for shops ahead of UTC; extend_series works out each shop's own horizon
+        behind = now.date() + timedelta(days=settings.SERIES_HORIZON_DAYS + 1)
+        series_ids = (
+            await db.scalars(
+                select(AppointmentSeries.id).where(
+                    AppointmentSeries.is_active.is_(True), AppointmentSeries.materialized_until < behind
+                )
+            )
+        ).all()
+        await db.rollback()
+        checked = booked = 0
+        for series_id in series_ids:
+            _, count = await self.extend_series(db, series_id, now=now)
+            checked += 1
+            booked += count
+        return checked, booked
+
+    async def occurrences(
+        self,
+        db: AsyncSession,
+        series_id: uuid.UUID,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        now: Optional[datetime] = None,
+    ) -> List[SeriesOccurrence]:
+        """Every occurrence from `date_from` through `date_to` (shop-local dates), booked, skipped or projected."""
+        series = await self.get_series(db, series_id)
+        barber = await self._barber_context(db, series.barber_id)
+        now = now or datetime.now(timezone.utc)
+        date_from = date_from or series.start_date
+        date_to = date_to or date_from + timedelta(days=settings.SERIES_HORIZON_DAYS)
+        if not 0 <= (date_to - date_from).days < settings.SERIES_MAX_WINDOW_DAYS:
+            raise InvalidRequestError(
+                f"date_to must be from date_from to {settings.SERIES_MAX_WINDOW_DAYS} days after it"
+            )
+        if series.is_active and series.materialized_until < date_to:
+            series, _ = await self.extend_series(db, series_id, date_to, now)
+
+        rows = await db.scalars(
+            select(Appointment)
+            .where(
+                Appointment.shop_id == series.shop_id,
+                Appointment.series_id == series.id,
+                Appointment.appointment_date >= minute_datetime(local_day(barber.timezone, date_from).start),
+                Appointment.appointment_date < minute_datetime(local_day(barber.timezone, date_to).end),
+            )
+            .order_by(Appointment.appointment_date)
+        )
+        occurrences = [
+            SeriesOccurrence(
+                date=local_date(barber.timezone, appointment.appointment_date),
+                start=appointment.appointment_date,
+                state="booked",
+                appointment=AppointmentResponse.model_validate(appointment),
+            )
+            for appointment in rows
+        ]
+        occurrences.extend(
+            SeriesOccurrence(
+                date=day, start=occurrence_start(day, series.start_time, barber.timezone), state="skipped"
+            )
+            for day in series.skipped_dates
+            if date_from <= day <= date_to
+        )
+        if series.is_active:
+            recurrence = Recurrence.of(series)
+            occurrences.extend(
+                SeriesOccurrence(
+                    date=day, start=occurrence_start(day, series.start_time, barber.timezone), state="projected"
+                )
+                for day in recurrence.dates(max(date_from, series.materialized_until + timedelta(days=1)), date_to)
+            )
+        occurrences.sort(key=lambda occurrence: occurrence.start)
+        return occurrences
+
+    async def end_series(
+        self, db: AsyncSession, series_id: uuid.UUID, now: Optional[datetime] = None
+    ) -> AppointmentSeries:
+        """Stop the series and cancel its occurrences that haven't started yet."""
+        series = await self.get_series(db, series_id)
+        now = now or datetime.now(timezone.utc)
+        async with booking_service.hold_barber(db, series.barber_id):
+            cancelled = (
+                await db.scalars(
+                    update(Appointment)
+                    .where(
+                        Appointment.shop_id == series.shop_id,
+                        Appointment.series_id == series.id,
+                        Appointment.appointment_date > now,
+                        Appointment.status.in_(OPEN_STATUSES),
+                    )
+                    .values(status="cancelled")
+                    .returning(Appointment)
+                    .execution_options(synchronize_session=False, populate_existing=True)
+                )
+            ).all()
+            series.is_active = False
+            await db.commit()
+            for appointment in cancelled:
+                schedule_index.appointment_saved(appointment)
+        return series
+
+    def _validate(self, series_in: AppointmentSeriesCreate) -> None:
+        unknown = [day for day in series_in.weekdays if day not in WEEKDAYS]
+        if unknown:
+            raise InvalidRequestError(f"Unknown weekdays: {', '.join(unknown)}")
+        if series_in.weekdays and series_in.frequency != "weekly":
+            raise InvalidRequestError("weekdays only apply to weekly series")
+        if series_in.until is not None and series_in.until < series_in.start_date:
+            raise InvalidRequestError("until is before start_date")
+
+    async def _barber_context(self, db: AsyncSession, barber_id: uuid.UUID) -> BarberContext:
+        row = (
+            await db.execute(
+                select(Barber.shop_id, Barber.is_active, Barber.days_on, Barber.working_hours, Shop.timezone)
+                .join(Shop, Shop.id == Barber.shop_id)
+                .where(Barber.id == barber_id)
+            )
+        ).first()
+        if not row:
+            raise NotFoundError(f"Barber with id {barber_id} not found")
+        return BarberContext(
+            shop_id=row.shop_id,
+            timezone=row.timezone,
+            is_active=row.is_active is not False,
+            schedule=BarberSchedule.from_barber(barber_id, row.days_on, row.working_hours),
+        )
+
+    async def _plan(
+        self,
+        db: AsyncSession,
+        series,
+        barber: BarberContext,
+        first: date,
+        last: date,
+        now: datetime,
+    ) -> Tuple[List[datetime], List[SkippedOccurrence]]:
+        """Expand first..last and split it into free starts and skipped occurrences, with one query."""
+        candidates: Dict[datetime, date] = {}
+        skipped: List[SkippedOccurrence] = []
+        for day in Recurrence.of(series).dates(first, last):
+            start = occurrence_start(day, series.start_time, barber.timezone)
+            if start <= now:
+                skipped.append(SkippedOccurrence(date=day, start=start, reason="past"))
+            elif not barber.is_active or not barber.works(start, series.duration_minutes):
+                skipped.append(SkippedOccurrence(date=day, start=start, reason="outside_working_hours"))
+            else:
+                candidates[start] = day
+
+        conflicts = await self._conflicts(db, series, list(candidates))
+        free = []
+        for start, day in candidates.items():
+            if start in conflicts:
+                skipped.append(
+                    SkippedOccurrence(
+                        date=day, start=start, reason="conflict", conflicting_appointment_id=conflicts[start]
+                    )
+                )
+            else:
+                free.append(start)
+        skipped.sort(key=lambda occurrence: occurrence.start)
+        return free, skipped
+
+    async def _conflicts(self, db: AsyncSession, series, starts: Sequence[datetime]) -> Dict[datetime, uuid.UUID]:
+        if not starts:
+            return {}
+        rows = await db.execute(
+            CONFLICTS_SQL,
+            {
+                "starts": list(starts),
+                "shop_id": series.shop_id,
+                "barber_id": series.barber_id,
+                "minutes": series.duration_minutes,
+            },
+        )
+        conflicts: Dict[datetime, uuid.UUID] = {}
+        for start, appointment_id in rows:
+            conflicts.setdefault(start, appointment_id)
+        return conflicts
+
+    async def _insert(self, db: AsyncSession, series: AppointmentSeries, starts: List[datetime]) -> List[Appointment]:
+        """Book every start in one multi-row INSERT ... RETURNING."""
+        if not starts:
+            return []
+        rows = [
+            {
+                "shop_id": series.shop_id,
+                "barber_id": series.barber_id,
+                "customer_id": series.customer_id,
+                "service_id": series.service_id,
+                "series_id": series.id,
+                "appointment_date": start,
+                "duration_minutes": series.duration_minutes,
+                "price": series.price,
+                "discount": series.discount,
+                "booking_fee": series.booking_fee,
+                "surcharge": series.surcharge,
+                "notes": series.notes,
+                "status": "scheduled",
+            }
+            for start in starts
+        ]
+        created = await db.scalars(insert(Appointment).returning(Appointment, sort_by_parameter_order=True), rows)
+        return created.all()
+
+
+recurrence_service = RecurrenceService()
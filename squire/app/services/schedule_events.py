@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from datetime import timezone
+from typing import AsyncIterator, Deque, Dict, FrozenSet, Optional, Set, Tuple
+
+import asyncpg
+from pydantic import ValidationError
+from pydantic_core import to_json
+from sqlalchemy.engine import make_url
+
+from ..config import settings
+from ..schemas.appointment import AppointmentResponse
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel written by the notify_appointment_changes triggers (init/init.sql)
+CHANNEL = "appointment_changes"
+RECONNECT_DELAYS = (1, 2, 5, 10, 30)
+# Sent first on every stream: how long browsers wait before reconnecting, in ms
+RETRY_FRAME = b"retry: 3000\n\n"
+KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+
+def sse_frame(event: str, data: bytes, event_id: Optional[int] = None) -> bytes:
+    head = f"id: {event_id}\nevent: {event}\n" if event_id is not None else f"event: {event}\n"
+    return head.encode() + b"data: " + data + b"\n\n"
+
+
+def reset_frame(shop_id: uuid.UUID, reason: str, event_id: Optional[int] = None) -> bytes:
+    """Tells a client its calendar may be stale and it should reload it."""
+    return sse_frame("reset", to_json({"shop_id": shop_id, "reason": reason}), event_id)
+
+
+class ScheduleEvent:
+    """One notification, with its SSE frame encoded once for every subscriber."""
+
+    __slots__ = ("seq", "shop_ids", "barber_ids", "frame")
+
+    def __init__(self, seq: int, shop_ids: FrozenSet[uuid.UUID], barber_ids: FrozenSet[uuid.UUID], frame: bytes):
+        self.seq = seq
+        self.shop_ids = shop_ids
+        # Empty for shop-wide events (resets), which every subscriber of the shop gets
+        self.barber_ids = barber_ids
+        self.frame = frame
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ScheduleEvent":
+        data = json.loads(payload)
+        seq = data["seq"]
+        shop_ids = frozenset(uuid.UUID(value) for value in (data["shop_id"], data.get("previous_shop_id")) if value)
+        if data["op"] == "reset":
+            return cls(seq, shop_ids, frozenset(), reset_frame(uuid.UUID(data["shop_id"]), "bulk_change", seq))
+
+        barber_ids = frozenset(
+            uuid.UUID(value) for value in (data["barber_id"], data.get("previous_barber_id")) if value
+        )
+        appointment = None
+        if data.get("appointment") is not None:
+            appointment = AppointmentResponse.model_validate(data["appointment"])
+            # The row was encoded in the writer's session timezone; the API speaks UTC
+            appointment = appointment.model_copy(
+                update={
+                    name: getattr(appointment, name).astimezone(timezone.utc)
+                    for name in ("appointment_date", "created_at", "updated_at")
+                }
+            )
+        body = {
+            "op": data["op"],
+            "id": data["id"],
+            "shop_id": data["shop_id"],
+            "barber_id": data["barber_id"],
+            "previous_barber_id": data.get("previous_barber_id"),
+            # None when the row was too large for a notification; fetch it instead
+            "appointment": appointment,
+        }
+        return cls(seq, shop_ids, barber_ids, sse_frame("appointment", to_json(body), seq))
+
+
+class Subscription:
+    """One connected client's filter and its queue of frames not yet sent."""
+
+    __slots__ = ("shop_id", "barber_id", "backlog", "pending", "wakeup", "closed")
+
+    def __init__(self, shop_id: uuid.UUID, barber_id: Optional[uuid.UUID], backlog: int) -> None:
+        self.shop_id = shop_id
+        self.barber_id = barber_id
+        self.backlog = backlog
+        self.pending: Deque[bytes] = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+    def matches(self, event: ScheduleEvent) -> bool:
+        if self.shop_id not in event.shop_ids:
+            return False
+        return self.barber_id is None or not event.barber_ids or self.barber_id in event.barber_ids
+
+    def push(self, frame: bytes) -> None:
+        if len(self.pending) >= self.backlog:
+            # A client this far behind is better off reloading than catching up
+            self.pending.clear()
+            frame = reset_frame(self.shop_id, "backlog")
+        self.pending.append(frame)
+        self.wakeup.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
+
+    async def frames(self, keepalive: float) -> AsyncIterator[bytes]:
+        yield RETRY_FRAME
+        while True:
+            while self.pending:
+                yield self.pending.popleft()
+            if self.closed:
+                return
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), keepalive)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream
+                yield KEEPALIVE_FRAME
+
+
+class ScheduleEventHub:
+    """Fans appointment changes out to live calendars, from one LISTEN connection per worker.
+
+    The connection is a plain asyncpg one outside the engine's pool, so
+    streams never hold pooled connections. The last `buffer_size` events
+    are kept in arrival order for resumes: a client reconnecting with
+    Last-Event-ID gets every matching event after that one. When the id is
+    no longer buffered, or the listener reconnected and may have missed
+    events, the client gets a "reset" event and reloads instead.
+    """
+
+    def __init__(self, url: str, buffer_size: int, backlog: int, keepalive: float) -> None:
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.backlog = backlog
+        self.keepalive = keepalive
+        self._buffer: Deque[Tuple[int, ScheduleEvent]] = deque(maxlen=buffer_size)
+        # seq -> arrival position, for the events in the buffer
+        self._positions: Dict[int, int] = {}
+        self._position = 0
+        self._subscribers: Dict[uuid.UUID, Set[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.close()
+
+    async def _listen(self) -> None:
+        attempt = 0
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn, server_settings={"application_name": "squire-events"})
+                await connection.add_listener(CHANNEL, self._on_notification)
+                if connected_before:
+                    self.reconnects += 1
+                    self._missed_events()
+                connected_before = self.connected = True
+                attempt = 0
+                while True:
+                    await asyncio.sleep(self.keepalive)
+                    # A dead connection only shows up when it's used
+                    await connection.execute("SELECT 1")
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+                logger.warning("Schedule event listener disconnected, retrying in %ss: %r", delay, error)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = ScheduleEvent.from_payload(payload)
+        except (ValueError, KeyError, ValidationError) as error:
+            logger.warning("Ignoring malformed schedule event %r: %r", payload[:200], error)
+            return
+        self.publish(event)
+
+    def publish(self, event: ScheduleEvent) -> None:
+        self.received += 1
+        self._position += 1
+        if len(self._buffer) == self._buffer.maxlen:
+            _, evicted = self._buffer[0]
+            self._positions.pop(evicted.seq, None)
+        self._buffer.append((self._position, event))
+        self._positions[event.seq] = self._position
+        for shop_id in event.shop_ids:
+            for subscription in self._subscribers.get(shop_id, ()):
+                if subscription.matches(event):
+                    subscription.push(event.frame)
+
+    def _missed_events(self) -> None:
+        """After a reconnect, nothing buffered can be resumed from and every client must reload."""
+        self._buffer.clear()
+        self._positions.clear()
+        for shop_id, subscriptions in self._subscribers.items():
+            for subscription in subscriptions:
+                subscription.push(reset_frame(shop_id, "reconnected"))
+
+    def subscribe(
+        self, shop_id: uuid.UUID, barber_id: Optional[uuid.UUID] = None, last_event_id: Optional[int] = None
+    ) -> Subscription:
+        subscription = Subscription(shop_id, barber_id, self.backlog)
+        self._subscribers.setdefault(shop_id, set()).add(subscription)
+        if last_event_id is not None:
+            # No await between registering and replaying, so no event falls in between
+            position = self._positions.get(last_event_id)
+            if position is None:
+                subscription.push(reset_frame(shop_id, "cursor_expired"))
+            else:
+                for event_position, event in self._buffer:
+                    if event_position > position and subscription.matches(event):
+                        subscription.push(event.frame)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.shop_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.shop_id]
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        try:
+            async for frame in subscription.frames(self.keepalive):
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "subscribers": sum(len(subscriptions) for subscriptions in self._subscribers.values()),
+            "shops": len(self._subscribers),
+            "buffered": len(self._buffer),
+            "received": self.received,
+            "reconnects": self.reconnects,
+        }
+
+
+schedule_events = ScheduleEventHub(
+    settings.DATABASE_URL,
+    settings.SCHEDULE_EVENTS_BUFFER,
+    settings.SCHEDULE_EVENTS_CLIENT_BACKLOG,
+    settings.SCHEDULE_EVENTS_KEEPALIVE_SECONDS,
+)
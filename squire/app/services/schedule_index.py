@@ -0,0 +1,415 @@
+import time
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Collection, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.appointment import Appointment
+from ..models.barber import Barber
+from ..models.shop import Shop
+from ..utils.invalidation import invalidations
+from ..utils.partitions import in_shops, shop_of
+
+# Appointments in these states no longer block the barber's time
+NON_BLOCKING_STATUSES = ("cancelled", "no_show")
+# Final states; old appointments in them are moved to the archive
+FINISHED_STATUSES = ("completed", "cancelled", "no_show")
+# Upper bound on a booking's length, so overlap lookups only scan back this far
+MAX_APPOINTMENT_MINUTES = 24 * 60
+# Timelines always reach at least this far into the past
+HISTORY = timedelta(days=1)
+# Changes other workers may send (see ScheduleIndex.apply_invalidation)
+REMOTE_OPS = frozenset(
+    ("appointment_saved", "appointment_removed", "shop_saved", "barber_changed", "barber_removed", "clear")
+)
+UUID_FIELDS = frozenset(("barber_id", "appointment_id", "shop_id"))
+
+
+def epoch_minute(moment: datetime) -> int:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()) // 60
+
+
+def minute_datetime(minute: int) -> datetime:
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+
+
+class BarberTimeline:
+    """A barber's blocking appointments as parallel arrays sorted by start.
+
+    Times are minutes since the epoch. The timeline holds every blocking
+    appointment that ends after `covered_from`, so questions about times from
+    `covered_from` on are answered with a bisect plus a scan of the bookings
+    that start within MAX_APPOINTMENT_MINUTES before the time in question.
+    """
+
+    __slots__ = ("barber_id", "covered_from", "loaded_at", "starts", "ends", "ids", "_start_of")
+
+    def __init__(
+        self,
+        barber_id: uuid.UUID,
+        covered_from: int,
+        bookings: Iterable[Tuple[int, int, uuid.UUID]],
+        loaded_at: float,
+    ) -> None:
+        rows = sorted(bookings, key=lambda booking: booking[0])
+        self.barber_id = barber_id
+        self.covered_from = covered_from
+        self.loaded_at = loaded_at
+        self.starts = array("q", [start for start, _, _ in rows])
+        self.ends = array("q", [end for _, end, _ in rows])
+        self.ids: List[uuid.UUID] = [appointment_id for _, _, appointment_id in rows]
+        self._start_of: Dict[uuid.UUID, int] = {appointment_id: start for start, _, appointment_id in rows}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, appointment_id: uuid.UUID, start: int, end: int) -> None:
+        self.remove(appointment_id)
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.ids.insert(index, appointment_id)
+        self._start_of[appointment_id] = start
+
+    def remove(self, appointment_id: uuid.UUID) -> bool:
+        start = self._start_of.pop(appointment_id, None)
+        if start is None:
+            return False
+        index = bisect_left(self.starts, start)
+        while self.ids[index] != appointment_id:
+            index += 1
+        del self.starts[index]
+        del self.ends[index]
+        del self.ids[index]
+        return True
+
+    def _overlapping(self, start: int, end: int) -> Iterable[int]:
+        first = bisect_left(self.starts, start - MAX_APPOINTMENT_MINUTES)
+        last = bisect_left(self.starts, end)
+        ends = self.ends
+        return (index for index in range(first, last) if ends[index] > start)
+
+    def find_conflict(self, start: int, end: int, exclude_id: Optional[uuid.UUID] = None) -> Optional[uuid.UUID]:
+        for index in self._overlapping(start, end):
+            if self.ids[index] != exclude_id:
+                return self.ids[index]
+        return None
+
+    def busy(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Return the (start, end) of every booking overlapping [start, end)."""
+        return [(self.starts[index], self.ends[index]) for index in self._overlapping(start, end)]
+
+
+@dataclass(frozen=True, slots=True)
+class RosterEntry:
+    barber_id: uuid.UUID
+    name: str
+    days_on: Tuple[str, ...]
+    working_hours: Tuple[dict, ...]
+
+
+class ShopRoster:
+    """A shop's timezone and its active barbers, ordered by name then id."""
+
+    __slots__ = ("shop_id", "timezone", "barbers", "loaded_at")
+
+    def __init__(
+        self, shop_id: uuid.UUID, timezone: str, barbers: Iterable[RosterEntry], loaded_at: float
+    ) -> None:
+        self.shop_id = shop_id
+        self.timezone = timezone
+        self.barbers: List[RosterEntry] = sorted(barbers, key=_roster_order)
+        self.loaded_at = loaded_at
+
+    def discard(self, barber_id: uuid.UUID) -> None:
+        self.barbers = [entry for entry in self.barbers if entry.barber_id != barber_id]
+
+    def put(self, entry: RosterEntry) -> None:
+        self.discard(entry.barber_id)
+        insort(self.barbers, entry, key=_roster_order)
+
+
+def _roster_order(entry: RosterEntry) -> Tuple[str, str]:
+    return (entry.name, str(entry.barber_id))
+
+
+def _roster_entry(barber) -> RosterEntry:
+    return RosterEntry(
+        barber_id=barber.id,
+        name=barber.name,
+        days_on=tuple(barber.days_on or ()),
+        working_hours=tuple(barber.working_hours or ()),
+    )
+
+
+class ScheduleIndex:
+    """In-process index of shop rosters and barber timelines.
+
+    Entries are loaded lazily, in one query per batch of misses, and then
+    kept current by the write paths calling the `*_saved`/`*_removed` hooks
+    after they commit. The hooks also reach the other workers through the
+    invalidation bus; a change that bus missed is picked up when the entry
+    is reloaded after SCHEDULE_INDEX_TTL_SECONDS, so callers treat a "free"
+    answer as authoritative only where the database constraint backs it up,
+    and confirm a "busy" answer against the database.
+    """
+
+    def __init__(self, ttl: float, max_barbers: int) -> None:
+        self.ttl = ttl
+        self.max_barbers = max_barbers
+        self._timelines: "OrderedDict[uuid.UUID, BarberTimeline]" = OrderedDict()
+        self._rosters: Dict[uuid.UUID, ShopRoster] = {}
+        # Keys with a load in flight, and those written to while it ran; a
+        # load whose key was written to is used once but not kept
+        self._loading: Dict[Hashable, int] = {}
+        self._dirty: Set[Hashable] = set()
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < self.ttl
+
+    def _touch(self, key: Hashable) -> None:
+        if key in self._loading:
+            self._dirty.add(key)
+
+    def _begin_load(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            self._loading[key] = self._loading.get(key, 0) + 1
+
+    def _end_load(self, keys: Iterable[Hashable]) -> Set[Hashable]:
+        """Finish a load and return the keys that were not written to meanwhile."""
+        clean = set()
+        for key in keys:
+            if key not in self._dirty:
+                clean.add(key)
+            self._loading[key] -= 1
+            if not self._loading[key]:
+                del self._loading[key]
+                self._dirty.discard(key)
+        return clean
+
+    async def roster(self, db: AsyncSession, shop_id: uuid.UUID) -> ShopRoster:
+        roster = self._rosters.get(shop_id)
+        if roster is not None and self._fresh(roster.loaded_at):
+            return roster
+
+        key = ("shop", shop_id)
+        self._begin_load([key])
+        try:
+            loaded_at = time.monotonic()
+            rows = (
+                await db.execute(
+                    select(Shop.timezone, Barber.id, Barber.name, Barber.days_on, Barber.working_hours)
+                    .select_from(Shop)
+                    .outerjoin(Barber, and_(Barber.shop_id == Shop.id, Barber.is_active.is_not(False)))
+                    .where(Shop.id == shop_id)
+                )
+            ).all()
+            roster = ShopRoster(
+                shop_id,
+                rows[0].timezone if rows else "UTC",
+                (_roster_entry(row) for row in rows if row.id is not None),
+                loaded_at,
+            )
+        finally:
+            clean = self._end_load([key])
+        if key in clean:
+            self._rosters[shop_id] = roster
+        return roster
+
+    async def prime_rosters(self, db: AsyncSession, max_shops: int) -> List[ShopRoster]:
+        """Load the rosters of up to `max_shops` shops in one query, for the startup warm-up."""
+        loaded_at = time.monotonic()
+        shops = select(Shop.id, Shop.timezone).order_by(Shop.id).limit(max_shops).subquery()
+        rows = await db.execute(
+            select(
+                shops.c.id.label("shop_id"),
+                shops.c.timezone,
+                Barber.id,
+                Barber.name,
+                Barber.days_on,
+                Barber.working_hours,
+            )
+            .select_from(shops)
+            .outerjoin(Barber, and_(Barber.shop_id == shops.c.id, Barber.is_active.is_not(False)))
+        )
+        timezones: Dict[uuid.UUID, str] = {}
+        entries: Dict[uuid.UUID, List[RosterEntry]] = {}
+        for row in rows:
+            timezones[row.shop_id] = row.timezone
+            shop_entries = entries.setdefault(row.shop_id, [])
+            if row.id is not None:
+                shop_entries.append(_roster_entry(row))
+        rosters = [ShopRoster(shop_id, timezones[shop_id], entries[shop_id], loaded_at) for shop_id in timezones]
+        for roster in rosters:
+            self._rosters[roster.shop_id] = roster
+        return rosters
+
+    async def timelines(
+        self,
+        db: AsyncSession,
+        barber_ids: Sequence[uuid.UUID],
+        since: datetime,
+        shop_ids: Optional[Collection[uuid.UUID]] = None,
+    ) -> Dict[uuid.UUID, BarberTimeline]:
+        """Return timelines covering `since` onwards, loading all misses in one query.
+
+        Pass the barbers' `shop_ids` when known, so the load only reads their
+        appointments partitions.
+        """
+        since_minute = epoch_minute(since)
+        found: Dict[uuid.UUID, BarberTimeline] = {}
+        missing = []
+        for barber_id in dict.fromkeys(barber_ids):
+            timeline = self._timelines.get(barber_id)
+            if timeline is not None and timeline.covered_from <= since_minute and self._fresh(timeline.loaded_at):
+                self._timelines.move_to_end(barber_id)
+                found[barber_id] = timeline
+            else:
+                missing.append(barber_id)
+        if not missing:
+            return found
+
+        covered_from = min(since_minute, epoch_minute(datetime.now(timezone.utc) - HISTORY))
+        self._begin_load(missing)
+        try:
+            loaded_at = time.monotonic()
+            query = select(
+                Appointment.barber_id,
+                Appointment.id,
+                Appointment.appointment_date,
+                Appointment.duration_minutes,
+            ).where(
+                Appointment.barber_id.in_(missing),
+                Appointment.appointment_date > minute_datetime(covered_from - MAX_APPOINTMENT_MINUTES),
+                Appointment.status.not_in(NON_BLOCKING_STATUSES),
+            )
+            if shop_ids:
+                query = query.where(in_shops(shop_ids))
+            elif len(missing) == 1:
+                query = query.where(Appointment.shop_id == shop_of(missing[0]))
+            rows = await db.execute(query)
+            bookings: Dict[uuid.UUID, List[Tuple[int, int, uuid.UUID]]] = {barber_id: [] for barber_id in missing}
+            for row in rows:
+                start = epoch_minute(row.appointment_date)
+                bookings[row.barber_id].append((start, start + row.duration_minutes, row.id))
+        finally:
+            clean = self._end_load(missing)
+
+        for barber_id, rows in bookings.items():
+            timeline = BarberTimeline(barber_id, covered_from, rows, loaded_at)
+            found[barber_id] = timeline
+            if barber_id in clean:
+                self._timelines[barber_id] = timeline
+                self._timelines.move_to_end(barber_id)
+        while len(self._timelines) > self.max_barbers:
+            self._timelines.popitem(last=False)
+        return found
+
+    async def timeline(
+        self, db: AsyncSession, barber_id: uuid.UUID, since: datetime, shop_id: Optional[uuid.UUID] = None
+    ) -> BarberTimeline:
+        return (await self.timelines(db, [barber_id], since, [shop_id] if shop_id else None))[barber_id]
+
+    def appointment_saved(self, appointment) -> None:
+        """Apply a committed insert or update of `appointment`."""
+        start = epoch_minute(appointment.appointment_date)
+        self._broadcast(
+            "appointment_saved",
+            barber_id=appointment.barber_id,
+            appointment_id=appointment.id,
+            start=start,
+            end=start + appointment.duration_minutes,
+            blocking=appointment.status not in NON_BLOCKING_STATUSES,
+        )
+
+    def appointment_removed(self, barber_id: uuid.UUID, appointment_id: uuid.UUID) -> None:
+        self._broadcast("appointment_removed", barber_id=barber_id, appointment_id=appointment_id)
+
+    def shop_saved(self, shop) -> None:
+        self._broadcast("shop_saved", shop_id=shop.id, tz_name=shop.timezone)
+
+    def barber_saved(self, barber) -> None:
+        """Apply a committed insert or update of `barber` to the shop rosters."""
+        self._touch(("shop", barber.shop_id))
+        for roster in self._rosters.values():
+            roster.discard(barber.id)
+        roster = self._rosters.get(barber.shop_id)
+        if roster is not None and barber.is_active is not False:
+            roster.put(_roster_entry(barber))
+        # The other workers reload the roster rather than receive the whole barber
+        invalidations.publish("schedule", {"op": "barber_changed", "barber_id": barber.id, "shop_id": barber.shop_id})
+
+    def barber_removed(self, barber_id: uuid.UUID) -> None:
+        self._broadcast("barber_removed", barber_id=barber_id)
+
+    def clear(self) -> None:
+        """Forget everything, for writes that bypass the hooks (cascades, imports)."""
+        self._broadcast("clear")
+
+    def _broadcast(self, op: str, **fields) -> None:
+        """Apply a change here, then send it to the other workers' indexes."""
+        getattr(self, f"_{op}")(**fields)
+        invalidations.publish("schedule", {"op": op, **fields})
+
+    def apply_invalidation(self, message: dict) -> None:
+        """Apply a change published by another worker's index."""
+        op = message.pop("op")
+        if op not in REMOTE_OPS:
+            raise ValueError(f"Unknown schedule index change {op!r}")
+        for name in UUID_FIELDS.intersection(message):
+            message[name] = uuid.UUID(message[name])
+        getattr(self, f"_{op}")(**message)
+
+    def _appointment_saved(
+        self, barber_id: uuid.UUID, appointment_id: uuid.UUID, start: int, end: int, blocking: bool
+    ) -> None:
+        self._touch(barber_id)
+        timeline = self._timelines.get(barber_id)
+        if timeline is None:
+            return
+        if blocking:
+            timeline.add(appointment_id, start, end)
+        else:
+            timeline.remove(appointment_id)
+
+    def _appointment_removed(self, barber_id: uuid.UUID, appointment_id: uuid.UUID) -> None:
+        self._touch(barber_id)
+        timeline = self._timelines.get(barber_id)
+        if timeline is not None:
+            timeline.remove(appointment_id)
+
+    def _shop_saved(self, shop_id: uuid.UUID, tz_name: Optional[str]) -> None:
+        self._touch(("shop", shop_id))
+        roster = self._rosters.get(shop_id)
+        if roster is not None:
+            roster.timezone = tz_name
+
+    def _barber_changed(self, barber_id: uuid.UUID, shop_id: uuid.UUID) -> None:
+        self._touch(("shop", shop_id))
+        for roster in self._rosters.values():
+            roster.discard(barber_id)
+        self._rosters.pop(shop_id, None)
+
+    def _barber_removed(self, barber_id: uuid.UUID) -> None:
+        self._touch(barber_id)
+        for roster in self._rosters.values():
+            roster.discard(barber_id)
+        self._timelines.pop(barber_id, None)
+
+    def _clear(self) -> None:
+        self._dirty.update(self._loading)
+        self._timelines.clear()
+        self._rosters.clear()
+
+
+schedule_index = ScheduleIndex(settings.SCHEDULE_INDEX_TTL_SECONDS, settings.SCHEDULE_INDEX_MAX_BARBERS)
+invalidations.register("schedule", schedule_index.apply_invalidation, schedule_index._clear)
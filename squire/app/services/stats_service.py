@@ -0,0 +1,273 @@
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, func, select, text, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.appointment import Appointment
+from ..models.appointment_daily_stat import AppointmentDailyStat
+from ..models.archived_appointment import ArchivedAppointment
+from ..models.shop import Shop
+from ..schemas.stats import BarberStats, DailyStats, ShopStatsResponse, StatsSummary
+from ..utils.timezones import local_date, zone
+from .exceptions import InvalidRequestError, NotFoundError
+
+MAX_STATS_DAYS = 366
+# Rollup rows rewritten per statement by reconcile, well under the bind parameter limit
+REWRITE_CHUNK_ROWS = 1000
+STATS_KEY_COLUMNS = ("shop_id", "day", "barber_id", "status")
+
+
+class Tally:
+    """Running counts for one StatsSummary."""
+
+    __slots__ = ("counts", "completed_price")
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.completed_price = 0
+
+    def add(self, status: str, appointments: int, total_price_sum: int) -> None:
+        self.counts[status] += appointments
+        if status == "completed":
+            self.completed_price += total_price_sum
+
+    def summary(self) -> dict:
+        completed = self.counts["completed"]
+        no_shows = self.counts["no_show"]
+        cancelled = self.counts["cancelled"]
+        return {
+            "bookings": sum(self.counts.values()) - cancelled,
+            "completed": completed,
+            "cancelled": cancelled,
+            "no_shows": no_shows,
+            "revenue": self.completed_price,
+            "average_price": self.completed_price / completed if completed else None,
+            "no_show_rate": no_shows / (completed + no_shows) if completed + no_shows else None,
+        }
+
+
+@dataclass
+class StatsMismatch:
+    shop_id: uuid.UUID
+    day: date
+    barber_id: uuid.UUID
+    status: str
+    # (appointments, total_price_sum)
+    expected: Tuple[int, int]
+    actual: Tuple[int, int]
+
+
+@dataclass
+class ReconcileReport:
+    shops: int = 0
+    groups: int = 0
+    mismatches: List[StatsMismatch] = field(default_factory=list)
+    repaired: bool = False
+
+
+def local_day_column(tz_name: str, column=Appointment.appointment_date):
+    """appointment_date as a date in `tz_name`, the way the rollup triggers compute `day`."""
+    return cast(func.timezone(tz_name, column), Date)
+
+
+class StatsService:
+    """Shop dashboards from the appointment_daily_stats rollups.
+
+    Reads cost one row per (day, barber, status) in the window, however many
+    appointments it holds. The rollups are maintained by statement triggers
+    on appointments; reconcile() recomputes them from appointments to catch
+    drift (and fixes it), and also re-buckets a shop after its timezone
+    changes.
+    """
+
+    async def shop_stats(
+        self,
+        db: AsyncSession,
+        shop_id: uuid.UUID,
+        start_date: Optional[date] = None,
+        days: int = 30,
+        now: Optional[datetime] = None,
+    ) -> ShopStatsResponse:
+        if not 1 <= days <= MAX_STATS_DAYS:
+            raise InvalidRequestError(f"days must be between 1 and {MAX_STATS_DAYS}")
+        shop = (await db.execute(select(Shop.timezone).where(Shop.id == shop_id))).first()
+        if shop is None:
+            raise NotFoundError(f"Shop with id {shop_id} not found")
+        tz_name = shop.timezone or "UTC"
+        # By default the window ends today, shop time
+        if start_date is None:
+            start_date = local_date(tz_name, now or datetime.now(timezone.utc)) - timedelta(days=days - 1)
+        end_date = start_date + timedelta(days=days - 1)
+
+        rows = await db.execute(
+            select(
+                AppointmentDailyStat.day,
+                AppointmentDailyStat.barber_id,
+                AppointmentDailyStat.status,
+                AppointmentDailyStat.appointments,
+                AppointmentDailyStat.total_price_sum,
+            ).where(
+                AppointmentDailyStat.shop_id == shop_id,
+                AppointmentDailyStat.day.between(start_date, end_date),
+            )
+        )
+        totals = Tally()
+        by_day: Dict[date, Tally] = defaultdict(Tally)
+        by_barber: Dict[uuid.UUID, Tally] = defaultdict(Tally)
+        for day, barber_id, status, appointments, total_price_sum in rows:
+            for tally in (totals, by_day[day], by_barber[barber_id]):
+                tally.add(status, appointments, total_price_sum)
+
+        return ShopStatsResponse(
+            shop_id=shop_id,
+            timezone=tz_name,
+            start_date=start_date,
+            end_date=end_date,
+            totals=StatsSummary(**totals.summary()),
+            days=[
+                DailyStats(date=day, **by_day[day].summary())
+                for day in (start_date + timedelta(days=offset) for offset in range(days))
+            ],
+            barbers=[
+                BarberStats(barber_id=barber_id, **tally.summary())
+                for barber_id, tally in sorted(by_barber.items(), key=lambda item: str(item[0]))
+            ],
+        )
+
+    async def reconcile(
+        self,
+        db: AsyncSession,
+        shop_id: Optional[uuid.UUID] = None,
+        since: Optional[date] = None,
+        repair: bool = True,
+    ) -> ReconcileReport:
+        """Check the rollups of one shop, or of every shop, against appointments.
+
+        Each shop is checked in its own short transaction, committed before
+        the next, so booking waits at most one shop's worth of work.
+        """
+        query = select(Shop.id, Shop.timezone).order_by(Shop.id)
+        if shop_id is not None:
+            query = query.where(Shop.id == shop_id)
+        shops = (await db.execute(query)).all()
+        if shop_id is not None and not shops:
+            raise NotFoundError(f"Shop with id {shop_id} not found")
+        await db.commit()
+
+        report = ReconcileReport(repaired=repair)
+        for current_shop_id, tz_name in shops:
+            groups, mismatches = await self.reconcile_shop(db, current_shop_id, tz_name or "UTC", since, repair)
+            await db.commit()
+            report.shops += 1
+            report.groups += groups
+            report.mismatches.extend(mismatches)
+        return report
+
+    async def reconcile_shop(
+        self,
+        db: AsyncSession,
+        shop_id: uuid.UUID,
+        tz_name: str,
+        since: Optional[date] = None,
+        repair: bool = True,
+    ) -> Tuple[int, List[StatsMismatch]]:
+        """Compare one shop's rollups with appointments, rewriting any that differ; the caller commits.
+
+        EXCLUSIVE mode lets reads through but makes the rollup triggers of
+        concurrent writes wait, so every write has either finished, and is
+        counted in both, or not yet touched either.
+        """
+        await db.execute(text("LOCK TABLE appointment_daily_stats IN EXCLUSIVE MODE"))
+        # Archived appointments keep their stats. Both tables are read in one
+        # statement, so a row the archiver moves meanwhile is counted once
+        since_at = datetime.combine(since, time(), tzinfo=zone(tz_name)) if since is not None else None
+        sources = []
+        for model in (Appointment, ArchivedAppointment):
+            source = select(model.appointment_date, model.barber_id, model.status, model.total_price).where(
+                model.shop_id == shop_id
+            )
+            if since_at is not None:
+                source = source.where(model.appointment_date >= since_at)
+            sources.append(source)
+        rows = union_all(*sources).subquery()
+        day = local_day_column(tz_name, rows.c.appointment_date)
+        expected_query = select(
+            day, rows.c.barber_id, rows.c.status, func.count(), func.sum(rows.c.total_price)
+        ).group_by(day, rows.c.barber_id, rows.c.status)
+        actual_query = select(
+            AppointmentDailyStat.day,
+            AppointmentDailyStat.barber_id,
+            AppointmentDailyStat.status,
+            AppointmentDailyStat.appointments,
+            AppointmentDailyStat.total_price_sum,
+        ).where(AppointmentDailyStat.shop_id == shop_id)
+        if since is not None:
+            actual_query = actual_query.where(AppointmentDailyStat.day >= since)
+
+        expected = {
+            (shop_id, row_day, barber_id, status): (count, int(total or 0))
+            for row_day, barber_id, status, count, total in await db.execute(expected_query)
+        }
+        actual = {
+            (shop_id, row_day, barber_id, status): (count, total)
+            for row_day, barber_id, status, count, total in await db.execute(actual_query)
+        }
+        mismatches = [
+            StatsMismatch(*key, expected=expected.get(key, (0, 0)), actual=actual.get(key, (0, 0)))
+            for key in sorted(expected.keys() | actual.keys(), key=lambda key: (key[1], str(key[2]), key[3]))
+            if expected.get(key, (0, 0)) != actual.get(key, (0, 0))
+        ]
+        if repair and mismatches:
+            await self._rewrite(db, mismatches)
+        if repair:
+            # Groups whose appointments all moved elsewhere are left at zero by the triggers
+            await db.execute(
+                delete(AppointmentDailyStat).where(
+                    AppointmentDailyStat.shop_id == shop_id,
+                    AppointmentDailyStat.appointments == 0,
+                    AppointmentDailyStat.total_price_sum == 0,
+                )
+            )
+        return len(expected), mismatches
+
+    async def _rewrite(self, db: AsyncSession, mismatches: List[StatsMismatch]) -> None:
+        """Set each mismatched group to its expected values, deleting groups that should be empty."""
+        upserts = [
+            {
+                "shop_id": mismatch.shop_id,
+                "day": mismatch.day,
+                "barber_id": mismatch.barber_id,
+                "status": mismatch.status,
+                "appointments": mismatch.expected[0],
+                "total_price_sum": mismatch.expected[1],
+            }
+            for mismatch in mismatches
+            if mismatch.expected != (0, 0)
+        ]
+        removed = [
+            (mismatch.shop_id, mismatch.day, mismatch.barber_id, mismatch.status)
+            for mismatch in mismatches
+            if mismatch.expected == (0, 0)
+        ]
+        for first in range(0, len(upserts), REWRITE_CHUNK_ROWS):
+            statement = insert(AppointmentDailyStat).values(upserts[first : first + REWRITE_CHUNK_ROWS])
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=STATS_KEY_COLUMNS,
+                    set_={
+                        "appointments": statement.excluded.appointments,
+                        "total_price_sum": statement.excluded.total_price_sum,
+                    },
+                )
+            )
+        key = tuple_(*(getattr(AppointmentDailyStat, name) for name in STATS_KEY_COLUMNS))
+        for first in range(0, len(removed), REWRITE_CHUNK_ROWS):
+            await db.execute(delete(AppointmentDailyStat).where(key.in_(removed[first : first + REWRITE_CHUNK_ROWS])))
+
+
+stats_service = StatsService()
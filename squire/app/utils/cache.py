@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from .invalidation import invalidations
+from .rows import fetch_row_json
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        self.discard(*keys)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        self.discard_prefix(prefix)
+
+    def discard(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def discard_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache shared by every worker through a Redis-compatible server."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, ttl: int, namespace: str = "squire:catalog:") -> None:
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self.ttl = ttl
+        self.namespace = namespace
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self.namespace + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._client.set(self.namespace + key, value, ex=self.ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*(self.namespace + key for key in keys))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        keys = [key async for key in self._client.scan_iter(match=f"{self.namespace}{prefix}*", count=500)]
+        if keys:
+            await self._client.delete(*keys)
+
+
+class CatalogCache:
+    """Read-through cache of serialized catalog entities (shops, barbers, ...).
+
+    Values are the JSON response bodies, keyed "<kind>:<id>", so a hit is
+    returned without touching the database or re-serializing. Write handlers
+    invalidate after they commit; entries also expire after the backend TTL,
+    which bounds staleness from a read racing a write. Backend failures are
+    logged and treated as misses so the cache can never take reads down.
+    With a per-worker backend, invalidations are also sent to the other
+    workers through the invalidation bus.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.errors = 0
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        kind = key.split(":", 1)[0]
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            logger.exception("catalog cache read failed for %s", key)
+            self.errors += 1
+            value = None
+        if value is not None:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return value
+
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        value = await load()
+        if value is not None:
+            try:
+                await self.backend.set(key, value)
+            except Exception:
+                logger.exception("catalog cache write failed for %s", key)
+                self.errors += 1
+        return value
+
+    async def put(self, key: str, value: bytes) -> None:
+        """Store an entry loaded ahead of time, e.g. by the startup warm-up."""
+        await self.backend.set(key, value)
+
+    async def invalidate(self, *keys: str) -> None:
+        try:
+            await self.backend.delete(*keys)
+        except Exception:
+            logger.exception("catalog cache invalidation failed for %s", keys)
+            self.errors += 1
+        if not self.backend.shared:
+            invalidations.publish("catalog", {"keys": keys})
+
+    async def invalidate_prefix(self, prefix: str) -> None:
+        try:
+            await self.backend.delete_prefix(prefix)
+        except Exception:
+            logger.exception("catalog cache invalidation failed for %s*", prefix)
+            self.errors += 1
+        if not self.backend.shared:
+            invalidations.publish("catalog", {"prefix": prefix})
+
+    def apply_invalidation(self, message: dict) -> None:
+        """Apply an invalidation published by another worker."""
+        if "prefix" in message:
+            self.backend.discard_prefix(message["prefix"])
+        else:
+            self.backend.discard(*message["keys"])
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "errors": self.errors,
+        }
+
+
+def build_backend():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.REDIS_URL, settings.CACHE_TTL_SECONDS)
+    if settings.CACHE_BACKEND != "memory":
+        raise RuntimeError(f"Unknown CACHE_BACKEND {settings.CACHE_BACKEND!r}")
+    return MemoryBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+
+catalog_cache = CatalogCache(build_backend())
+if not catalog_cache.backend.shared:
+    invalidations.register("catalog", catalog_cache.apply_invalidation, catalog_cache.clear)
+
+
+def entity_loader(
+    db: AsyncSession, model: type, schema: Type[BaseModel], object_id: Any, *criteria
+) -> Callable[[], Awaitable[Optional[bytes]]]:
+    """Return a loader that fetches one row and serializes it with `schema`."""
+
+    async def load() -> Optional[bytes]:
+        return await fetch_row_json(db, model, schema, object_id, *criteria)
+
+    return load
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_response(request: Request, body: bytes) -> Response:
+    """Return `body` as JSON with an ETag, or 304 if the client already has it."""
+    etag = etag_for(body)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
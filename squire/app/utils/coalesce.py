@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Tuple, TypeVar
+
+from fastapi import Request
+
+from .profiling import PROFILE_HEADER
+from .replicas import primary_pinned
+from .routes import RouteMatcher
+
+T = TypeVar("T")
+
+# Request headers that change the response, so requests differing in them aren't shared
+VARY_HEADERS = (b"accept", b"accept-encoding")
+
+
+class Singleflight:
+    """At most one call in flight per key; callers arriving meanwhile await the same result.
+
+    The call runs as its own task, shielded from its callers, so a caller
+    that goes away (a client disconnecting) cancels neither the call nor
+    anyone else waiting on it. Exceptions reach every caller.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._calls[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Seen here, so an exception nobody stayed to await isn't reported as lost
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
+
+
+class CoalescingMiddleware:
+    """Serves identical concurrent GETs to `routes` from one run of the endpoint.
+
+    Requests match on path, query string and the VARY_HEADERS; the first
+    runs, its response is buffered, and every match that arrived while it
+    ran gets a copy, so a burst of clients loading the same barber's day
+    costs one set of queries. Nothing is kept once the response is out.
+    Clients pinned to the primary after a write, requests sending
+    Cache-Control: no-cache and profiled requests always run on their own.
+    Only routes with small, complete JSON bodies belong in `routes`, never
+    streams.
+    """
+
+    def __init__(self, app, flights: Singleflight, routes: Iterable[Tuple[str, str]]) -> None:
+        self.app = app
+        self.flights = flights
+        self.routes = RouteMatcher(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.routes.matches(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if (
+            PROFILE_HEADER.encode() in headers
+            or b"no-cache" in headers.get(b"cache-control", b"")
+            or primary_pinned(Request(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], scope["query_string"], *(headers.get(name) for name in VARY_HEADERS))
+        for message in await self.flights.do(key, lambda: self._run(scope)):
+            await send(message)
+
+    async def _run(self, scope) -> List[Dict[str, Any]]:
+        """Run the endpoint detached from any one client and return its response messages."""
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # A GET has nothing more to read; the shared run never sees a disconnect
+            await asyncio.Future()
+
+        messages: List[Dict[str, Any]] = []
+
+        async def keep(message):
+            messages.append(message)
+
+        await self.app(scope, receive, keep)
+        return messages
+
+
+read_flights = Singleflight()
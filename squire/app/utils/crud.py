@@ -0,0 +1,32 @@
+from typing import Any, Dict, Optional, Type, TypeVar
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ModelT = TypeVar("ModelT")
+
+
+async def update_by_id(
+    db: AsyncSession, model: Type[ModelT], object_id: Any, changes: Dict[str, Any], *criteria
+) -> Optional[ModelT]:
+    """Apply `changes` with one UPDATE ... RETURNING and return the updated row.
+
+    The returned object includes trigger-maintained columns such as
+    updated_at, so no refresh is needed. Returns None when no row matched.
+    """
+    if not changes:
+        return (await db.scalars(select(model).where(model.id == object_id, *criteria))).first()
+    statement = (
+        update(model)
+        .where(model.id == object_id, *criteria)
+        .values(**changes)
+        .returning(model)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    return (await db.scalars(statement)).first()
+
+
+async def delete_by_id(db: AsyncSession, model: type, object_id: Any, *criteria) -> bool:
+    """Delete with one DELETE ... RETURNING; returns whether a row was removed."""
+    statement = delete(model).where(model.id == object_id, *criteria).returning(model.id)
+    return (await db.execute(statement)).scalar() is not None
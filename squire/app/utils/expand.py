@@ -0,0 +1,37 @@
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import InstrumentedAttribute, Load
+
+from ..exceptions import InvalidRequestError
+from .pagination import PageParams
+
+
+class Expansions:
+    """The relationships an endpoint can embed with ?expand=, and how they are loaded.
+
+    `loader` is joinedload for many-to-one relationships and selectinload for
+    collections; either way every requested relationship is loaded for the
+    whole page at once, so a page costs the same number of queries whatever
+    its size.
+    """
+
+    def __init__(self, loader: Callable[[InstrumentedAttribute], Load], **relationships: InstrumentedAttribute) -> None:
+        self.loader = loader
+        self.relationships = relationships
+
+    @property
+    def description(self) -> str:
+        return f"Comma-separated relationships to embed: {', '.join(self.relationships)}"
+
+    def parse(self, expand: Optional[str]) -> List[str]:
+        names = [name.strip() for name in expand.split(",") if name.strip()] if expand else []
+        unknown = [name for name in names if name not in self.relationships]
+        if unknown:
+            raise InvalidRequestError(f"Unknown expansions: {', '.join(unknown)}")
+        return list(dict.fromkeys(names))
+
+    def options(self, expand: Optional[str], page: Optional[PageParams] = None) -> List[Load]:
+        names = self.parse(expand)
+        if names and page is not None and page.fields:
+            raise InvalidRequestError("expand can't be combined with fields")
+        return [self.loader(self.relationships[name]) for name in names]
@@ -0,0 +1,309 @@
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from .routes import RouteMatcher
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+MAX_KEY_LENGTH = 255
+# Expired keys deleted per statement by the sweeper
+SWEEP_BATCH_ROWS = 5000
+
+# Claims a key, or takes over one whose request expired without finishing
+CLAIM_SQL = text(
+    "INSERT INTO idempotency_keys (key, fingerprint, expires_at) "
+    "VALUES (:key, :fingerprint, now() + make_interval(secs => :seconds)) "
+    "ON CONFLICT (key) DO UPDATE SET fingerprint = EXCLUDED.fingerprint, status_code = NULL, "
+    "content_type = NULL, body = NULL, created_at = now(), expires_at = EXCLUDED.expires_at "
+    "WHERE idempotency_keys.expires_at < now() "
+    "RETURNING key"
+)
+LOOKUP_SQL = text("SELECT fingerprint, status_code, content_type, body FROM idempotency_keys WHERE key = :key")
+COMPLETE_SQL = text(
+    "UPDATE idempotency_keys SET status_code = :status_code, content_type = :content_type, body = :body, "
+    "expires_at = now() + make_interval(secs => :seconds) WHERE key = :key AND fingerprint = :fingerprint"
+)
+# Renews a claim whose request is still running
+EXTEND_SQL = text(
+    "UPDATE idempotency_keys SET expires_at = now() + make_interval(secs => :seconds) "
+    "WHERE key = :key AND fingerprint = :fingerprint AND status_code IS NULL"
+)
+RELEASE_SQL = text("DELETE FROM idempotency_keys WHERE key = :key AND fingerprint = :fingerprint")
+SWEEP_SQL = text(
+    "DELETE FROM idempotency_keys WHERE key IN ("
+    "SELECT key FROM idempotency_keys WHERE expires_at < now() LIMIT :limit FOR UPDATE SKIP LOCKED)"
+)
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: bytes
+    # None while the first request with the key is still running
+    status_code: Optional[int]
+    content_type: Optional[str]
+    body: Optional[bytes]
+
+
+def fingerprint(method: str, path: str, query_string: bytes, body: bytes) -> bytes:
+    """sha256 of everything that makes two requests the same request."""
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query_string, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.digest()
+
+
+class IdempotencyStore:
+    """Responses to keyed writes, in the idempotency_keys table, shared by every worker.
+
+    A request claims its key before running, for `pending_seconds`, and
+    renews the claim every third of that while it runs, so a slow write
+    keeps its key however long it takes; its response is then stored for
+    `ttl_seconds` (server errors release the key instead, so a retry runs
+    again). A worker that dies mid-request stops renewing, and its claim
+    lapses within `pending_seconds`. Expired rows are deleted by a
+    background sweep every `sweep_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        sessions: Callable[[], AsyncSession],
+        ttl_seconds: int,
+        pending_seconds: int,
+        sweep_interval: float,
+    ) -> None:
+        self.sessions = sessions
+        self.ttl_seconds = ttl_seconds
+        self.pending_seconds = pending_seconds
+        self.sweep_interval = sweep_interval
+        self.counts = {"stored": 0, "replayed": 0, "released": 0, "in_progress": 0, "mismatched": 0, "swept": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    async def claim(self, key: str, request_fingerprint: bytes) -> Optional[StoredResponse]:
+        """Claim `key` for a new request; returns None if claimed, else what's already stored under it."""
+        async with self.sessions() as session:
+            while True:
+                claimed = await session.scalar(
+                    CLAIM_SQL, {"key": key, "fingerprint": request_fingerprint, "seconds": self.pending_seconds}
+                )
+                if claimed:
+                    break
+                row = (await session.execute(LOOKUP_SQL, {"key": key})).first()
+                # A key released between the two statements is free again: claim it for real
+                if row is not None:
+                    break
+            await session.commit()
+        if claimed:
+            return None
+        return StoredResponse(bytes(row.fingerprint), row.status_code, row.content_type, row.body)
+
+    async def complete(
+        self, key: str, request_fingerprint: bytes, status_code: int, content_type: Optional[str], body: bytes
+    ) -> None:
+        async with self.sessions() as session:
+            result = await session.execute(
+                COMPLETE_SQL,
+                {
+                    "key": key,
+                    "fingerprint": request_fingerprint,
+                    "status_code": status_code,
+                    "content_type": content_type,
+                    "body": body,
+                    "seconds": self.ttl_seconds,
+                },
+            )
+            await session.commit()
+        if result.rowcount:
+            self.counts["stored"] += 1
+
+    async def extend(self, key: str, request_fingerprint: bytes) -> None:
+        async with self.sessions() as session:
+            await session.execute(
+                EXTEND_SQL, {"key": key, "fingerprint": request_fingerprint, "seconds": self.pending_seconds}
+            )
+            await session.commit()
+
+    async def hold(self, key: str, request_fingerprint: bytes) -> None:
+        """Renew the claim on `key` every third of `pending_seconds` until cancelled."""
+        while True:
+            await asyncio.sleep(self.pending_seconds / 3)
+            try:
+                await self.extend(key, request_fingerprint)
+            except Exception as error:
+                logger.warning("Renewing Idempotency-Key claim failed: %r", error)
+
+    async def release(self, key: str, request_fingerprint: bytes) -> None:
+        async with self.sessions() as session:
+            await session.execute(RELEASE_SQL, {"key": key, "fingerprint": request_fingerprint})
+            await session.commit()
+        self.counts["released"] += 1
+
+    async def sweep(self, session: AsyncSession) -> int:
+        swept = 0
+        while True:
+            deleted = (await session.execute(SWEEP_SQL, {"limit": SWEEP_BATCH_ROWS})).rowcount
+            await session.commit()
+            swept += deleted
+            if deleted < SWEEP_BATCH_ROWS:
+                break
+        self.counts["swept"] += swept
+        return swept
+
+    async def _run_sweeps(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                async with self.sessions() as session:
+                    await self.sweep(session)
+            except Exception as error:
+                logger.warning("Idempotency key sweep failed: %r", error)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_sweeps())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"ttl_seconds": self.ttl_seconds, **self.counts}
+
+
+idempotency_store = IdempotencyStore(
+    AsyncSessionLocal,
+    settings.IDEMPOTENCY_TTL_SECONDS,
+    settings.IDEMPOTENCY_PENDING_SECONDS,
+    settings.IDEMPOTENCY_SWEEP_SECONDS,
+)
+
+
+def _json_response(status: int, detail: str, extra_headers: Iterable[Tuple[bytes, bytes]] = ()) -> List[dict]:
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *extra_headers]
+    return [
+        {"type": "http.response.start", "status": status, "headers": headers},
+        {"type": "http.response.body", "body": body},
+    ]
+
+
+class IdempotencyMiddleware:
+    """Idempotency-Key support for the writes in `routes`.
+
+    The first request with a key runs and its response is stored; a repeat
+    with the same method, path and body gets that response again, marked
+    Idempotent-Replayed, without running. A repeat while the first is still
+    running gets 409 with Retry-After, and reusing a key for a different
+    request gets 422. Requests without the header, or to other routes, pass
+    straight through.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, routes: Iterable[Tuple[str, str]]) -> None:
+        self.app = app
+        self.store = store
+        self.routes = RouteMatcher(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.routes.matches(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        key = next((value for name, value in scope["headers"] if name == IDEMPOTENCY_HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._send_all(send, _json_response(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"))
+            return
+
+        body, more = [], True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(body)
+        request_fingerprint = fingerprint(scope["method"], scope["path"], scope["query_string"], body)
+
+        stored = await self.store.claim(key, request_fingerprint)
+        if stored is not None:
+            await self._send_all(send, self._answer(stored, request_fingerprint))
+            return
+
+        replayed_body = False
+
+        async def receive_body():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type = None
+        chunks = []
+
+        async def send_and_keep(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = next(
+                    (value.decode("latin-1") for name, value in message.get("headers", []) if name == b"content-type"),
+                    None,
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        holding = asyncio.create_task(self.store.hold(key, request_fingerprint))
+        try:
+            await self.app(scope, receive_body, send_and_keep)
+        except BaseException:
+            await asyncio.shield(self.store.release(key, request_fingerprint))
+            raise
+        finally:
+            holding.cancel()
+        if status_code >= 500:
+            await self.store.release(key, request_fingerprint)
+        else:
+            await self.store.complete(key, request_fingerprint, status_code, content_type, b"".join(chunks))
+
+    def _answer(self, stored: StoredResponse, request_fingerprint: bytes) -> List[dict]:
+        if stored.fingerprint != request_fingerprint:
+            self.store.counts["mismatched"] += 1
+            return _json_response(422, "Idempotency-Key was already used for a different request")
+        if stored.status_code is None:
+            self.store.counts["in_progress"] += 1
+            return _json_response(
+                409, "A request with this Idempotency-Key is still in progress", [(b"retry-after", b"1")]
+            )
+        self.store.counts["replayed"] += 1
+        body = stored.body or b""
+        headers = [(b"content-length", str(len(body)).encode()), REPLAYED_HEADER]
+        if stored.content_type:
+            headers.append((b"content-type", stored.content_type.encode("latin-1")))
+        return [
+            {"type": "http.response.start", "status": stored.status_code, "headers": headers},
+            {"type": "http.response.body", "body": body},
+        ]
+
+    async def _send_all(self, send, messages: List[dict]) -> None:
+        for message in messages:
+            await send(message)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidations"
+RECONNECT_DELAYS = (1, 2, 5, 10, 30)
+# NOTIFY payloads must stay under 8000 bytes; messages are packed up to this
+MAX_PAYLOAD_BYTES = 7000
+# Messages waiting to be sent; past this the peers are told to drop everything instead
+MAX_PENDING = 10_000
+KEEPALIVE_SECONDS = 15.0
+
+
+class InvalidationBus:
+    """Relays in-process cache invalidations to the other workers over Postgres NOTIFY.
+
+    Caches register a handler per topic and call `publish` after applying a
+    change locally. Publishing never waits: messages are queued and sent in
+    batches from the bus's own connection, which also LISTENs, so neither
+    side holds a pooled connection. Each worker ignores its own messages.
+    When the connection drops, messages from the other workers may have been
+    missed, so every "reset" handler runs once it is back.
+    """
+
+    def __init__(self, url: str, keepalive: float = KEEPALIVE_SECONDS) -> None:
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.keepalive = keepalive
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+        self._resets: List[Callable[[], None]] = []
+        self._pending: Deque[dict] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Set in start(), after any fork, so every worker gets its own
+        self.origin: Optional[str] = None
+        self.connected = False
+        self.sent = 0
+        self.received = 0
+        self.reconnects = 0
+
+    def register(self, topic: str, handler: Callable[[dict], None], reset: Callable[[], None]) -> None:
+        self._handlers[topic] = handler
+        self._resets.append(reset)
+
+    def start(self) -> None:
+        if self._task is None:
+            self.origin = uuid.uuid4().hex
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._pending.clear()
+
+    def publish(self, topic: str, message: dict) -> None:
+        # Outside a started bus (CLI jobs, a single process) there is nobody to tell
+        if self._task is None:
+            return
+        if len(self._pending) >= MAX_PENDING:
+            self._pending.clear()
+            self._pending.append({"topic": "*"})
+        else:
+            self._pending.append({"topic": topic, **message})
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        attempt = 0
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn, server_settings={"application_name": "squire-cache"})
+                await connection.add_listener(CHANNEL, self._on_notification)
+                if connected_before:
+                    self.reconnects += 1
+                    self._reset_all()
+                connected_before = self.connected = True
+                attempt = 0
+                while True:
+                    if not self._pending:
+                        self._wakeup.clear()
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), self.keepalive)
+                        except asyncio.TimeoutError:
+                            # A dead connection only shows up when it's used
+                            await connection.execute("SELECT 1")
+                            continue
+                    await self._send(connection)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+                logger.warning("Cache invalidation bus disconnected, retrying in %ss: %r", delay, error)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, connection) -> None:
+        """Send queued messages, as many per NOTIFY as fit; they stay queued if sending fails."""
+        while self._pending:
+            batch, size = [], 0
+            for message in self._pending:
+                encoded = json.dumps(message, separators=(",", ":"), default=str)
+                if batch and size + len(encoded) + 1 > MAX_PAYLOAD_BYTES - 64:
+                    break
+                batch.append(encoded)
+                size += len(encoded) + 1
+            payload = '{"origin":"%s","messages":[%s]}' % (self.origin, ",".join(batch))
+            await connection.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+            for _ in batch:
+                self._pending.popleft()
+            self.sent += len(batch)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            if data["origin"] == self.origin:
+                return
+            messages = data["messages"]
+        except (ValueError, KeyError, TypeError) as error:
+            logger.warning("Ignoring malformed cache invalidation %r: %r", payload[:200], error)
+            return
+        for message in messages:
+            self.received += 1
+            topic = message.pop("topic", None)
+            if topic == "*":
+                self._reset_all()
+                continue
+            handler = self._handlers.get(topic)
+            if handler is None:
+                continue
+            try:
+                handler(message)
+            except Exception:
+                # A message we can't apply leaves that cache possibly stale, so drop it all
+                logger.exception("Failed to apply %s invalidation %r", topic, message)
+                self._reset_all()
+
+    def _reset_all(self) -> None:
+        for reset in self._resets:
+            reset()
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "pending": len(self._pending),
+            "sent": self.sent,
+            "received": self.received,
+            "reconnects": self.reconnects,
+        }
+
+
+invalidations = InvalidationBus(settings.DATABASE_URL)
@@ -0,0 +1,133 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        index = bisect_left(DURATION_BUCKETS, seconds)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class RequestMetrics:
+    """Per-route request counters and latency histograms, rendered for Prometheus.
+
+    Routes are labelled by their path template ("/appointments/{appointment_id}"),
+    never the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self) -> None:
+        self.requests: Counter = Counter()  # (method, route, status)
+        self.durations: Dict[Tuple[str, str], Histogram] = {}  # (method, route)
+        self.phase_seconds: Counter = Counter()  # (method, route, phase)
+        self.round_trips: Counter = Counter()  # (method, route)
+        self.statements: Counter = Counter()
+        self.rows: Counter = Counter()
+        self.n_plus_one: Counter = Counter()
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        phases: Dict[str, float],
+        round_trips: int,
+        statements: int,
+        rows: int,
+        n_plus_one: int,
+    ) -> None:
+        key = (method, route)
+        self.requests[(method, route, status)] += 1
+        histogram = self.durations.get(key)
+        if histogram is None:
+            histogram = self.durations[key] = Histogram()
+        histogram.observe(seconds)
+        for phase, phase_seconds in phases.items():
+            self.phase_seconds[(method, route, phase)] += phase_seconds
+        self.round_trips[key] += round_trips
+        self.statements[key] += statements
+        self.rows[key] += rows
+        if n_plus_one:
+            self.n_plus_one[key] += 1
+
+    def render(self, pools: Iterable[Tuple[str, dict]] = ()) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("squire_http_requests_total", "counter", "Requests handled, by route and status.")
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"squire_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        family("squire_http_request_duration_seconds", "histogram", "Time to the response headers.")
+        for (method, route), histogram in sorted(self.durations.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, histogram.buckets):
+                cumulative += count
+                labels = _labels(method=method, route=route, le=bound)
+                lines.append(f"squire_http_request_duration_seconds_bucket{labels} {cumulative}")
+            labels = _labels(method=method, route=route, le="+Inf")
+            lines.append(f"squire_http_request_duration_seconds_bucket{labels} {histogram.count}")
+            labels = _labels(method=method, route=route)
+            lines.append(f"squire_http_request_duration_seconds_sum{labels} {histogram.sum:.6f}")
+            lines.append(f"squire_http_request_duration_seconds_count{labels} {histogram.count}")
+
+        family(
+            "squire_http_request_phase_seconds_total",
+            "counter",
+            "Request time by phase: db (SQL), orm (hydration), app (handler code), serialize (response).",
+        )
+        for (method, route, phase), seconds in sorted(self.phase_seconds.items()):
+            labels = _labels(method=method, route=route, phase=phase)
+            lines.append(f"squire_http_request_phase_seconds_total{labels} {seconds:.6f}")
+
+        for name, counter, help_text in (
+            ("squire_db_round_trips_total", self.round_trips, "Database round trips, BEGIN and COMMIT included."),
+            ("squire_db_statements_total", self.statements, "SQL statements executed."),
+            ("squire_db_rows_total", self.rows, "Rows returned or affected by those statements."),
+            ("squire_n_plus_one_total", self.n_plus_one, "Requests that repeated one statement suspiciously often."),
+        ):
+            family(name, "counter", help_text)
+            for (method, route), value in sorted(counter.items()):
+                lines.append(f"{name}{_labels(method=method, route=route)} {value}")
+
+        pools = list(pools)
+        for name, stat, kind, help_text in (
+            ("squire_db_pool_checked_out", "checked_out", "gauge", "Connections in use."),
+            ("squire_db_pool_checked_in", "checked_in", "gauge", "Idle connections."),
+            ("squire_db_pool_overflow", "overflow", "gauge", "Connections opened beyond the pool size."),
+            ("squire_db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out."),
+            ("squire_db_pool_wait_ms_total", "wait_ms_total", "counter", "Milliseconds spent waiting for a connection."),
+        ):
+            family(name, kind, help_text)
+            for engine_name, stats in pools:
+                lines.append(f"{name}{_labels(engine=engine_name)} {stats[stat]}")
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
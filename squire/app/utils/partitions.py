@@ -0,0 +1,30 @@
+"""Query helpers for the appointments table, which is hash-partitioned by shop_id.
+
+Postgres only skips partitions when the query constrains shop_id itself; a
+filter on barber_id alone scans every partition. These helpers add that
+constraint where the caller knows the barber but not the shop.
+"""
+import uuid
+from typing import Collection
+
+from sqlalchemy import ColumnElement, ScalarSelect, select
+
+from ..models.appointment import Appointment
+from ..models.barber import Barber
+
+
+def shop_of(barber_id: uuid.UUID) -> ScalarSelect:
+    """The barber's shop as a scalar subquery.
+
+    Compared with `=`, it runs as an InitPlan and the partitions it rules out
+    are pruned at execution time.
+    """
+    return select(Barber.shop_id).where(Barber.id == barber_id).scalar_subquery()
+
+
+def in_shops(shop_ids: Collection[uuid.UUID]) -> ColumnElement[bool]:
+    """Restrict appointments to known shops, so the other partitions are pruned before any is read."""
+    shop_ids = list(shop_ids)
+    if len(shop_ids) == 1:
+        return Appointment.shop_id == shop_ids[0]
+    return Appointment.shop_id.in_(shop_ids)
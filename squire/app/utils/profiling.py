@@ -0,0 +1,357 @@
+import asyncio
+import cProfile
+import functools
+import importlib.util
+import io
+import logging
+import pstats
+import random
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from .metrics import request_metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("cprofile", "pyinstrument")
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Lines of pstats output kept per cProfile capture
+CPROFILE_LINES = 60
+
+# The profile of the request the current task is serving, when profiling is on
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Where one request's time went, filled in by the engine, session and endpoint hooks."""
+
+    __slots__ = (
+        "started",
+        "db_seconds",
+        "orm_seconds",
+        "handler_seconds",
+        "handler_finished",
+        "round_trips",
+        "statements",
+        "rows",
+        "statement_counts",
+        "orm_depth",
+    )
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.orm_seconds = 0.0
+        self.handler_seconds = 0.0
+        self.handler_finished: Optional[float] = None
+        self.round_trips = 0
+        self.statements = 0
+        self.rows = 0
+        self.statement_counts: Counter = Counter()
+        self.orm_depth = 0
+
+    def phases(self, headers_at: float) -> dict:
+        """Seconds per phase up to the response headers; ORM time excludes the SQL it waited on."""
+        finished = self.handler_finished if self.handler_finished is not None else headers_at
+        return {
+            "db": self.db_seconds,
+            "orm": self.orm_seconds,
+            "app": max(self.handler_seconds - self.db_seconds - self.orm_seconds, 0.0),
+            "serialize": max(headers_at - finished, 0.0),
+        }
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """Statements run at least `threshold` times: the signature of a lazy load per row."""
+        return [(statement, count) for statement, count in self.statement_counts.items() if count >= threshold]
+
+    def server_timing(self, phases: dict, total: float, repeated: int) -> str:
+        entries = [
+            f'db;dur={phases["db"] * 1000:.2f};desc="{self.statements} statements, {self.rows} rows, '
+            f'{self.round_trips} round trips"',
+            f'orm;dur={phases["orm"] * 1000:.2f}',
+            f'app;dur={phases["app"] * 1000:.2f}',
+            f'serialize;dur={phases["serialize"] * 1000:.2f}',
+            f"total;dur={total * 1000:.2f}",
+        ]
+        if repeated:
+            entries.append(f'n-plus-one;desc="{repeated} repeated statements"')
+        return ", ".join(entries)
+
+
+def instrument_engine(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        if profile is None:
+            return
+        profile.db_seconds += time.perf_counter() - context._profile_started
+        profile.statements += 1
+        profile.round_trips += 1
+        profile.rows += max(cursor.rowcount, 0)
+        profile.statement_counts[statement] += 1
+
+    def _round_trip(conn, *args):
+        profile = _current.get()
+        if profile is not None:
+            profile.round_trips += 1
+
+    for name in ("begin", "commit", "rollback"):
+        event.listen(engine, name, _round_trip)
+
+
+def instrument_sessions() -> None:
+    """Time ORM executions; AsyncSession pre-buffers results, so this covers hydrating every row."""
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _execute(state):
+        profile = _current.get()
+        # Eager loads run nested executions; the outermost one already covers them
+        if profile is None or profile.orm_depth:
+            return None
+        db_before = profile.db_seconds
+        started = time.perf_counter()
+        profile.orm_depth += 1
+        try:
+            return state.invoke_statement()
+        finally:
+            profile.orm_depth -= 1
+            profile.orm_seconds += time.perf_counter() - started - (profile.db_seconds - db_before)
+
+
+def _timed(call):
+    """Wrap an endpoint so the time spent inside it is recorded on the request profile."""
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed(*args, **kwargs):
+            profile = _current.get()
+            started = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.handler_finished = time.perf_counter()
+                    profile.handler_seconds += profile.handler_finished - started
+
+    else:
+
+        @functools.wraps(call)
+        def timed(*args, **kwargs):
+            profile = _current.get()
+            started = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.handler_finished = time.perf_counter()
+                    profile.handler_seconds += profile.handler_finished - started
+
+    return timed
+
+
+def instrument_routes(app: FastAPI) -> None:
+    # The request handler looks dependant.call up per request, so swapping it
+    # in place times the endpoint without touching FastAPI's own code
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "__wrapped__", None):
+            route.dependant.call = _timed(route.dependant.call)
+
+
+class Capture:
+    """One cProfile or pyinstrument run around a single request."""
+
+    def __init__(self, profiler: str) -> None:
+        self.profiler = profiler
+        if profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            # async_mode follows the request's task across awaits instead of sampling the whole loop
+            self._profiler = Profiler(async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.profiler == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> str:
+        if self.profiler == "pyinstrument":
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True, show_all=False)
+        self._profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(CPROFILE_LINES)
+        return output.getvalue()
+
+
+class CaptureStore:
+    """The most recent profile captures, newest last."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def add(self, entry: dict) -> None:
+        self._entries[entry["id"]] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, capture_id: str) -> Optional[dict]:
+        return self._entries.get(capture_id)
+
+    def list(self) -> List[dict]:
+        return [{key: value for key, value in entry.items() if key != "output"} for entry in self._entries.values()]
+
+
+class ProfilingMiddleware:
+    """Per-request phase timings, query counts and N+1 detection, with optional captures.
+
+    Every request gets a Server-Timing header (db, orm, app and serialize
+    phases up to the response headers) and is recorded in request_metrics.
+    A request sending X-Profile (equal to `token`, when one is set), and a
+    `sample_rate` share of all requests, is also run under the configured
+    profiler; the result is kept in `captures` under the id returned in
+    X-Profile-Id. Only one capture runs at a time: cProfile sees the whole
+    event loop, so captures overlapping other requests include their work.
+    """
+
+    def __init__(
+        self,
+        app,
+        captures: CaptureStore,
+        sample_rate: float,
+        token: Optional[str],
+        profiler: str,
+        n_plus_one_threshold: int,
+    ) -> None:
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profiler!r}, expected one of {PROFILERS}")
+        if profiler == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+            raise RuntimeError("PROFILER=pyinstrument requires the 'pyinstrument' package")
+        self.app = app
+        self.captures = captures
+        self.sample_rate = sample_rate
+        self.token = token
+        self.profiler = profiler
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._capturing = False
+
+    def _wants_capture(self, scope) -> bool:
+        if self._capturing:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return self.token is None or value.decode("latin-1") == self.token
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        context_token = _current.set(profile)
+        capture = capture_id = None
+        if self._wants_capture(scope):
+            capture = Capture(self.profiler)
+            capture_id = uuid.uuid4().hex
+            self._capturing = True
+            capture.start()
+        status = 500
+        headers_at = None
+
+        async def send_with_timing(message):
+            nonlocal status, headers_at
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers_at = time.perf_counter()
+                phases = profile.phases(headers_at)
+                repeated = len(profile.repeated(self.n_plus_one_threshold))
+                timing = profile.server_timing(phases, headers_at - profile.started, repeated)
+                headers = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+                if capture_id:
+                    headers.append((PROFILE_ID_HEADER, capture_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(context_token)
+            finished = time.perf_counter()
+            headers_at = headers_at or finished
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            if capture is not None:
+                self._capturing = False
+                self.captures.add(
+                    {
+                        "id": capture_id,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route_path,
+                        "status": status,
+                        "duration_ms": round((finished - profile.started) * 1000, 3),
+                        "profiler": self.profiler,
+                        "created_at": datetime.now(timezone.utc),
+                        "output": capture.stop(),
+                    }
+                )
+            repeated = profile.repeated(self.n_plus_one_threshold)
+            for statement, count in repeated:
+                logger.warning(
+                    "Possible N+1 in %s %s: statement ran %d times: %s",
+                    scope["method"],
+                    route_path,
+                    count,
+                    " ".join(statement.split())[:500],
+                )
+            request_metrics.observe(
+                scope["method"],
+                route_path,
+                status,
+                headers_at - profile.started,
+                profile.phases(headers_at),
+                profile.round_trips,
+                profile.statements,
+                profile.rows,
+                len(repeated),
+            )
+
+
+profile_captures = CaptureStore(settings.PROFILING_MAX_CAPTURES)
+
+
+def install_profiling(app: FastAPI, engines: Iterable[Engine]) -> None:
+    """Hook profiling into the engines, the ORM and every route; call once all routers are included."""
+    for engine in engines:
+        instrument_engine(engine)
+    instrument_sessions()
+    instrument_routes(app)
+    app.add_middleware(
+        ProfilingMiddleware,
+        captures=profile_captures,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        token=settings.PROFILING_TOKEN,
+        profiler=settings.PROFILER,
+        n_plus_one_threshold=settings.PROFILING_N_PLUS_ONE_THRESHOLD,
+    )
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from http.cookies import SimpleCookie
+from typing import List, Optional, Sequence
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("round_robin", "least_connections")
+# Set on responses to writes; holds the epoch second until which the client reads from the primary
+PRIMARY_PIN_COOKIE = "squire_primary_until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class Replica:
+    __slots__ = ("engine", "name", "healthy", "failures", "last_error", "checked_at")
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.healthy = True
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "checked_out": self.engine.pool.checkedout(),
+        }
+
+
+class ReplicaSet:
+    """Read replicas with health tracking and round-robin or least-connections selection.
+
+    A replica is taken out of rotation as soon as a connection to it fails,
+    and put back by the periodic health check once it answers again. With no
+    healthy replica, `choose` returns None and reads go to the primary.
+    """
+
+    def __init__(
+        self, engines: Sequence[AsyncEngine], strategy: str, check_interval: float, check_timeout: float
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.replicas: List[Replica] = [Replica(engine) for engine in engines]
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        count = len(self.replicas)
+        if not count:
+            return None
+        # Rotate the starting point so least-connections ties are spread too
+        start = self._next
+        self._next = (start + 1) % count
+        healthy = [
+            replica
+            for replica in (self.replicas[(start + offset) % count] for offset in range(count))
+            if replica.healthy
+        ]
+        if not healthy:
+            return None
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda replica: replica.engine.pool.checkedout())
+        return healthy[0]
+
+    def mark_down(self, replica: Replica, error: BaseException) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s is unavailable, routing reads elsewhere: %r", replica.name, error)
+        replica.healthy = False
+        replica.failures += 1
+        replica.last_error = repr(error)
+
+    async def _probe(self, replica: Replica) -> None:
+        async with replica.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def check(self) -> None:
+        """Probe every replica once, bringing back the ones that answer."""
+        for replica in self.replicas:
+            try:
+                await asyncio.wait_for(self._probe(replica), self.check_timeout)
+            except Exception as error:  # any failure takes the replica out of rotation
+                self.mark_down(replica, error)
+            else:
+                if not replica.healthy:
+                    logger.info("Read replica %s is back in rotation", replica.name)
+                replica.healthy = True
+            replica.checked_at = time.time()
+
+    async def _run_checks(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run_checks())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> List[dict]:
+        return [replica.stats() for replica in self.replicas]
+
+
+def primary_pinned(request: Request) -> bool:
+    """Whether the client wrote recently enough that it must read its own writes from the primary."""
+    value = request.cookies.get(PRIMARY_PIN_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+class PrimaryPinMiddleware:
+    """Pins a client to the primary for `seconds` after each successful write.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so responses (including the
+    streamed exports) pass through untouched apart from the extra cookie.
+    """
+
+    def __init__(self, app, seconds: float) -> None:
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[PRIMARY_PIN_COOKIE] = str(int(time.time() + self.seconds) + 1)
+                cookie[PRIMARY_PIN_COOKIE]["max-age"] = int(self.seconds) + 1
+                cookie[PRIMARY_PIN_COOKIE]["path"] = "/"
+                cookie[PRIMARY_PIN_COOKIE]["httponly"] = True
+                cookie[PRIMARY_PIN_COOKIE]["samesite"] = "lax"
+                header = cookie.output(header="").strip().encode("latin-1")
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", header)]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
@@ -0,0 +1,23 @@
+import re
+from typing import Iterable, Tuple
+
+# What a {placeholder} in a route matches: the API's ids are UUIDs, which
+# keeps /appointments/{id} from also matching /appointments/export
+PLACEHOLDER = r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+
+
+def path_pattern(template: str) -> "re.Pattern[str]":
+    """Regex for a path template, with or without its trailing slash."""
+    escaped = re.escape(template.rstrip("/"))
+    return re.compile("^" + re.sub(r"\\\{[^}]*\\\}", PLACEHOLDER, escaped) + "/?$")
+
+
+class RouteMatcher:
+    """Matches a request's method and path against (method, path template) pairs like ("GET", "/shops/{id}/stats")."""
+
+    def __init__(self, routes: Iterable[Tuple[str, str]]) -> None:
+        self.routes = tuple(routes)
+        self._patterns = [(method.upper(), path_pattern(path)) for method, path in self.routes]
+
+    def matches(self, method: str, path: str) -> bool:
+        return any(method == wanted and pattern.match(path) for wanted, pattern in self._patterns)
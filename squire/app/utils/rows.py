@@ -0,0 +1,48 @@
+from typing import Any, Iterable, List, Optional, Sequence, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from ..exceptions import InvalidRequestError
+
+
+def projected_columns(
+    model: type, schema: Type[BaseModel], fields: Optional[Sequence[str]] = None
+) -> List[InstrumentedAttribute]:
+    """The model columns behind `fields` of `schema`, or behind all of its fields, in schema order."""
+    if fields is None:
+        return [getattr(model, name) for name in schema.model_fields]
+    unknown = [name for name in fields if name not in schema.model_fields or not hasattr(model, name)]
+    if unknown:
+        raise InvalidRequestError(f"Unknown fields: {', '.join(unknown)}")
+    return [getattr(model, name) for name in dict.fromkeys(fields)]
+
+
+def rows_json(rows: Iterable[Sequence[Any]], columns: Sequence[InstrumentedAttribute]) -> bytes:
+    """Encode Core rows as a JSON array of objects keyed by column.
+
+    Rows come straight from the database, so they skip ORM instances and
+    response-model validation, and pydantic-core writes the bytes in one pass
+    with the same UUID and datetime formats as the response models.
+    """
+    keys = [column.key for column in columns]
+    return to_json([dict(zip(keys, row)) for row in rows])
+
+
+def json_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def fetch_row_json(
+    db: AsyncSession, model: type, schema: Type[BaseModel], object_id: Any, *criteria
+) -> Optional[bytes]:
+    """One row by id as `schema`-shaped JSON, read as a plain row; None when it doesn't exist."""
+    columns = projected_columns(model, schema)
+    row = (await db.execute(select(*columns).where(model.id == object_id, *criteria))).first()
+    if row is None:
+        return None
+    return to_json(dict(zip([column.key for column in columns], row)))
@@ -0,0 +1,79 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("squire.sql")
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _start_listener() -> None:
+    """Hand records to a background thread so request handlers never wait on log I/O."""
+    global _listener
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(records, stream)
+    _listener.start()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+
+
+def _restart_in_child() -> None:
+    # The listener thread doesn't survive fork, so a forked worker (app.serve)
+    # starts its own, on a fresh queue: what the parent queued is the parent's
+    if _listener is not None:
+        _start_listener()
+
+
+def stop_sql_logging() -> None:
+    """Write out every queued record and stop the listener thread."""
+    if _listener is not None:
+        _listener.stop()
+
+
+def _configure_logger() -> None:
+    if _listener is not None or logger.handlers:
+        return
+    _start_listener()
+    atexit.register(stop_sql_logging)
+    os.register_at_fork(after_in_child=_restart_in_child)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def install_sql_logging(engine: Engine, sample_rate: float, slow_ms: float) -> None:
+    """Log a sample of statements, and every slow one, as one JSON object per line."""
+    if sample_rate <= 0 and slow_ms <= 0:
+        return
+    _configure_logger()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_started) * 1000
+        slow = 0 < slow_ms <= elapsed_ms
+        if not slow and not (sample_rate > 0 and random.random() < sample_rate):
+            return
+        entry = {
+            "event": "slow_query" if slow else "query",
+            "duration_ms": round(elapsed_ms, 3),
+            "statement": " ".join(statement.split()),
+            "rows": cursor.rowcount,
+            "executemany": executemany,
+        }
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(entry))
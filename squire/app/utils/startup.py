@@ -0,0 +1,32 @@
+import os
+import time
+from typing import Dict, Optional
+
+
+class StartupClock:
+    """Milestones of this process's startup, in ms since the clock started.
+
+    perf_counter is CLOCK_MONOTONIC on Linux, so a clock started in the
+    supervisor keeps counting in the workers it forks and their milestones
+    share its origin.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.worker: Optional[int] = None
+
+    def restart(self, started: float) -> None:
+        self.started = started
+        self.phases.clear()
+
+    def mark(self, phase: str) -> float:
+        elapsed = round((time.perf_counter() - self.started) * 1000, 3)
+        self.phases[phase] = elapsed
+        return elapsed
+
+    def stats(self) -> dict:
+        return {"pid": os.getpid(), "worker": self.worker, "phases": dict(self.phases)}
+
+
+startup_clock = StartupClock()
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..exceptions import InvalidRequestError
+
+MINUTES_PER_DAY = 24 * 60
+
+
+@lru_cache(maxsize=None)
+def zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise InvalidRequestError(f"Unknown timezone {name!r}") from exc
+
+
+def _offset_minutes(tz: ZoneInfo, utc_minute: int) -> int:
+    """UTC offset in effect at a UTC epoch minute."""
+    return int(datetime.fromtimestamp(utc_minute * 60, tz=tz).utcoffset().total_seconds()) // 60
+
+
+def _midnight(tz: ZoneInfo, day: date) -> int:
+    """UTC epoch minute of local midnight (or of the first minute after it, if skipped)."""
+    return int(datetime.combine(day, time(), tzinfo=tz).timestamp()) // 60
+
+
+@dataclass(frozen=True, slots=True)
+class LocalDay:
+    """One calendar date in one timezone, laid out on the UTC timeline.
+
+    `start` is the UTC epoch minute of local midnight and `length` the real
+    number of minutes until the next local midnight (1380 or 1500 on DST
+    change days). Positions inside the day are "elapsed" minutes since local
+    midnight; the wall clock jumps by `delta` minutes at elapsed minute
+    `shift_at` (`shift_at == length` when the offset doesn't change).
+    """
+
+    date: date
+    start: int
+    length: int
+    shift_at: int
+    delta: int
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+    @property
+    def shape(self) -> tuple:
+        """What a day's minute layout depends on, shared by most dates."""
+        return (self.length, self.shift_at, self.delta)
+
+    def elapsed(self, wall_minute: int) -> int:
+        """Map a local wall-clock minute to elapsed minutes since midnight.
+
+        Follows zoneinfo's fold=0 rule: a time skipped by a forward jump is
+        read with the old offset (02:30 becomes 03:30) and a time repeated by a
+        backward jump means its first occurrence.
+        """
+        if wall_minute < self.shift_at + max(self.delta, 0):
+            return wall_minute
+        return wall_minute - self.delta
+
+    def wall(self, elapsed_minute: int) -> int:
+        """Map elapsed minutes since midnight back to a wall-clock minute."""
+        return elapsed_minute if elapsed_minute < self.shift_at else elapsed_minute + self.delta
+
+
+@lru_cache(maxsize=16384)
+def local_day(tz_name: str, day: date) -> LocalDay:
+    """Return the UTC layout of `day` in `tz_name`, cached per (timezone, date)."""
+    tz = zone(tz_name)
+    start = _midnight(tz, day)
+    end = _midnight(tz, day + timedelta(days=1))
+    # The offset just before midnight counts, so a change at 00:00 belongs to this day
+    before = _offset_minutes(tz, start - 1)
+    after = _offset_minutes(tz, end - 1)
+    if after == before:
+        return LocalDay(day, start, end - start, end - start, 0)
+
+    # Binary search for the first UTC minute on the new offset
+    low, high = start, end
+    while low < high:
+        middle = (low + high) // 2
+        if _offset_minutes(tz, middle) == before:
+            low = middle + 1
+        else:
+            high = middle
+    return LocalDay(day, start, end - start, low - start, after - before)
+
+
+def local_days(tz_name: str, first: date, count: int) -> List[LocalDay]:
+    return [local_day(tz_name, first + timedelta(days=offset)) for offset in range(count)]
+
+
+def local_date(tz_name: str, moment: datetime) -> date:
+    return moment.astimezone(zone(tz_name)).date()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import configure_mappers
+
+from .models.barber import Barber
+from .models.service import Service
+from .models.shop import Shop
+from .models.surcharge_setting import SurchargeSetting
+from .schemas.barber import BarberResponse
+from .schemas.service import ServiceResponse
+from .schemas.shop import ShopResponse
+from .schemas.surcharge_setting import SurchargeSettingResponse
+from .services.schedule_index import schedule_index
+from .utils.cache import catalog_cache
+from .utils.rows import projected_columns
+
+logger = logging.getLogger(__name__)
+
+# Catalog entries loaded ahead of the first request, keyed the way the
+# detail handlers key them
+CATALOG: Tuple[Tuple[type, Type[BaseModel], Callable], ...] = (
+    (Shop, ShopResponse, lambda row: f"shop:{row.id}"),
+    (Service, ServiceResponse, lambda row: f"service:{row.id}"),
+    (Barber, BarberResponse, lambda row: f"barber:{row.id}"),
+    (SurchargeSetting, SurchargeSettingResponse, lambda row: f"surcharge:{row.barber_id}:{row.id}"),
+)
+# Barbers whose timelines are loaded per query
+TIMELINE_CHUNK = 1000
+
+
+@dataclass
+class WarmupReport:
+    catalog_entries: int = 0
+    rosters: int = 0
+    timelines: int = 0
+    timed_out: bool = False
+
+
+def warm_imports(app) -> None:
+    """Do the lazy one-off work of the first request: mapper configuration and the OpenAPI schema."""
+    configure_mappers()
+    app.openapi()
+
+
+async def prime_catalog(db: AsyncSession, max_entries: int, report: WarmupReport) -> None:
+    for model, schema, key in CATALOG:
+        if report.catalog_entries >= max_entries:
+            return
+        columns = projected_columns(model, schema)
+        names = [column.key for column in columns]
+        rows = await db.execute(select(*columns).order_by(model.id).limit(max_entries - report.catalog_entries))
+        for row in rows:
+            await catalog_cache.put(key(row), to_json(dict(zip(names, row))))
+            report.catalog_entries += 1
+
+
+async def prime_schedule(db: AsyncSession, max_shops: int, max_barbers: int, report: WarmupReport) -> None:
+    rosters = await schedule_index.prime_rosters(db, max_shops)
+    report.rosters = len(rosters)
+    barbers: List[Tuple] = [(entry.barber_id, roster.shop_id) for roster in rosters for entry in roster.barbers]
+    now = datetime.now(timezone.utc)
+    for first in range(0, min(len(barbers), max_barbers), TIMELINE_CHUNK):
+        chunk = barbers[first : min(first + TIMELINE_CHUNK, max_barbers)]
+        loaded = await schedule_index.timelines(
+            db, [barber_id for barber_id, _ in chunk], now, {shop_id for _, shop_id in chunk}
+        )
+        report.timelines += len(loaded)
+
+
+async def prime_caches(
+    db: AsyncSession, timeout: float, max_entries: int, max_shops: int, max_barbers: int
+) -> WarmupReport:
+    """Fill the per-process catalog cache and schedule index, for at most `timeout` seconds.
+
+    Whatever was loaded when the time runs out is kept; the rest is loaded
+    on demand as usual. A shared (redis) catalog cache is left alone.
+    """
+    report = WarmupReport()
+
+    async def prime() -> None:
+        if not catalog_cache.backend.shared:
+            await prime_catalog(db, max_entries, report)
+        await prime_schedule(db, max_shops, max_barbers, report)
+
+    try:
+        await asyncio.wait_for(prime(), timeout)
+    except asyncio.TimeoutError:
+        report.timed_out = True
+    return report
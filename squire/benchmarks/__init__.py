@@ -0,0 +1,2 @@
+# benchmarks package: run from the squire/ directory, e.g.
+#   poetry run python -m benchmarks.booking_contention
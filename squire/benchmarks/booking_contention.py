@@ -0,0 +1,110 @@
+"""Load benchmark for the conflict-checked booking path.
+
+Fires many concurrent bookings at one hot barber slot while a second group of
+barbers takes bookings on distinct slots, against the app in-process and the
+database configured in DATABASE_URL. Expected result: exactly one hot-slot
+booking succeeds and the unrelated barbers' throughput matches a run without
+the hot-slot storm.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from app.main import app
+
+
+async def create(client: httpx.AsyncClient, path: str, payload: dict) -> dict:
+    response = await client.post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def setup(client: httpx.AsyncClient, barbers: int) -> dict:
+    shop = await create(client, "/shops/", {"name": f"bench-{uuid.uuid4().hex[:8]}"})
+    service = await create(
+        client, "/services/", {"shop_id": shop["id"], "name": "Cut", "price": 2500, "duration_minutes": 30}
+    )
+    customer = await create(client, "/customers/", {"name": "Bench Customer", "phone": "+15550000000"})
+    barber_ids = []
+    for index in range(barbers):
+        barber = await create(
+            client,
+            "/barbers/",
+            {
+                "shop_id": shop["id"],
+                "name": f"Barber {index}",
+                "days_on": ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"],
+                "working_hours": [{"start": "00:00", "end": "23:59"}],
+            },
+        )
+        barber_ids.append(barber["id"])
+    return {"service_id": service["id"], "customer_id": customer["id"], "barber_ids": barber_ids}
+
+
+def booking(fixture: dict, barber_id: str, start: datetime) -> dict:
+    return {
+        "barber_id": barber_id,
+        "customer_id": fixture["customer_id"],
+        "service_id": fixture["service_id"],
+        "appointment_date": start.isoformat(),
+        "duration_minutes": 30,
+        "price": 2500,
+    }
+
+
+async def book_distinct_slots(
+    client: httpx.AsyncClient, fixture: dict, barber_ids: list, per_barber: int, base: datetime
+) -> float:
+    """Book `per_barber` non-overlapping slots on each barber; return bookings/second."""
+    payloads = [
+        booking(fixture, barber_id, base + timedelta(minutes=30 * slot))
+        for barber_id in barber_ids
+        for slot in range(per_barber)
+    ]
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(client.post("/appointments/", json=payload) for payload in payloads))
+    elapsed = time.perf_counter() - started
+    failures = [response.text for response in responses if response.status_code != 201]
+    assert not failures, failures[:3]
+    return len(payloads) / elapsed
+
+
+async def run(hot_requests: int, barbers: int, per_barber: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        fixture = await setup(client, barbers + 1)
+        hot_barber, *cold_barbers = fixture["barber_ids"]
+        base = datetime(2030, 1, 1, tzinfo=timezone.utc) + timedelta(days=uuid.uuid4().int % 3000)
+
+        baseline = await book_distinct_slots(client, fixture, cold_barbers, per_barber, base)
+
+        hot_payload = booking(fixture, hot_barber, base)
+        storm = asyncio.gather(*(client.post("/appointments/", json=hot_payload) for _ in range(hot_requests)))
+        contended = book_distinct_slots(client, fixture, cold_barbers, per_barber, base + timedelta(days=1))
+        hot_responses, contended_rate = await asyncio.gather(storm, contended)
+
+    statuses = {}
+    for response in hot_responses:
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    print(f"hot slot: {hot_requests} requests -> {statuses}")
+    print(f"unrelated barbers alone:        {baseline:8.1f} bookings/s")
+    print(f"unrelated barbers during storm: {contended_rate:8.1f} bookings/s")
+    assert statuses.get(201) == 1, "expected exactly one successful hot-slot booking"
+    assert set(statuses) <= {201, 409}, "hot-slot losers must be rejected with 409"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hot-requests", type=int, default=300)
+    parser.add_argument("--barbers", type=int, default=10)
+    parser.add_argument("--per-barber", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.hot_requests, args.barbers, args.per_barber))
+
+
+if __name__ == "__main__":
+    main()
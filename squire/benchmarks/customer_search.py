@@ -0,0 +1,210 @@
+"""Customer search latency on a generated table of a million customers.
+
+Builds customer_search_bench.customers in DATABASE_URL: the customers
+table's columns (phone_e164 included) and, once loaded, the same indexes as
+public.customers, filled with --customers generated rows. Phone numbers are
+stored in mixed formats ("+1 (415) 555-0134", "+14155550134",
+"001 415 555 0134") and names come from a few thousand surnames, so
+the searches are selective the way real ones are.
+
+Then times CustomerSearchService.search, through the service's own
+statements, for searches sampled from the table:
+
+  name-prefix    the first letters of a surname ("Kov")
+  name-typo      a full name with two letters swapped ("Maria Kovlaenko")
+  phone-partial  the last 7 digits
+  phone-full     the whole number, formatted differently than stored
+  email-prefix   the first 10 characters of an email
+
+and, for comparison, the same statements with index scans turned off.
+Recall is how often the customer a term was made from is in the top
+--limit; a three-letter prefix matches thousands, so its recall is low.
+The table is kept between runs (pass --rebuild to regenerate it) and is
+dropped with --drop.
+"""
+import argparse
+import asyncio
+import random
+import time
+from statistics import quantiles
+from typing import Callable, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine
+from app.models.customer import Customer
+from app.schemas.customer import CustomerResponse
+from app.services.customer_search_service import customer_search_service
+from app.utils.rows import projected_columns
+
+SCHEMA = "customer_search_bench"
+COLUMNS = projected_columns(Customer, CustomerResponse)
+KINDS = ("name-prefix", "name-typo", "phone-partial", "phone-full", "email-prefix")
+FIRST_NAMES = (
+    "James", "Maria", "David", "Aisha", "Tom", "Sofia", "Liam", "Chen", "Noah", "Priya", "Omar", "Emma",
+    "Lucas", "Hana", "Mateo", "Zoe", "Ethan", "Ines", "Ravi", "Grace", "Yusuf", "Elena", "Kofi", "Mia",
+)
+SYLLABLES = (
+    "an", "ber", "cov", "dal", "en", "fer", "gar", "hol", "is", "jen", "kov", "lar", "mor", "nak",
+    "ol", "par", "quin", "ros", "sal", "tor", "ul", "val", "wen", "yam", "zel",
+)
+SURNAME_ENDINGS = ("", "son", "ez", "enko", "ini", "ov", "ley", "berg", "ić", "sen")
+
+LOAD_SQL = f"""
+INSERT INTO {SCHEMA}.customers (id, name, email, phone, created_at, updated_at)
+WITH vocabulary AS (
+    SELECT CAST(:first_names AS text[]) AS first_names, CAST(:surnames AS text[]) AS surnames
+)
+SELECT gen_random_uuid(), person.name, person.email, person.phone, now(), now()
+FROM vocabulary, generate_series(1, :count) AS i
+CROSS JOIN LATERAL (
+    SELECT
+        first_names[1 + (i * 7) % cardinality(first_names)] AS first,
+        surnames[1 + floor(random() * cardinality(surnames))::int] AS last,
+        (2000000000 + (i * 7919::bigint) % 8000000000)::text AS digits
+) AS drawn
+CROSS JOIN LATERAL (
+    SELECT
+        drawn.first || ' ' || drawn.last AS name,
+        CASE WHEN i % 5 = 0 THEN NULL
+             ELSE lower(drawn.first || '.' || drawn.last || i || '@example.com') END AS email,
+        CASE i % 3
+            WHEN 0 THEN '+1 (' || substr(digits, 1, 3) || ') ' || substr(digits, 4, 3) || '-' || substr(digits, 7)
+            WHEN 1 THEN '+1' || digits
+            ELSE '001 ' || substr(digits, 1, 3) || ' ' || substr(digits, 4, 3) || ' ' || substr(digits, 7)
+        END AS phone
+) AS person
+"""
+
+
+def surnames() -> List[str]:
+    names = set()
+    for first in SYLLABLES:
+        for second in SYLLABLES:
+            for ending in SURNAME_ENDINGS:
+                names.add((first + second + ending).capitalize())
+    return sorted(names)
+
+
+async def build(count: int, rebuild: bool) -> None:
+    async with engine.connect() as conn:
+        exists = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{SCHEMA}.customers"})
+        if exists and not rebuild:
+            rows = await conn.scalar(text(f"SELECT count(*) FROM {SCHEMA}.customers"))
+            print(f"reusing {SCHEMA}.customers ({rows} rows)")
+            return
+        started = time.perf_counter()
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(
+            text(f"CREATE TABLE {SCHEMA}.customers (LIKE public.customers INCLUDING DEFAULTS INCLUDING GENERATED)")
+        )
+        await conn.execute(text("SELECT setseed(0.42)"))
+        await conn.execute(
+            text(LOAD_SQL), {"count": count, "first_names": list(FIRST_NAMES), "surnames": surnames()}
+        )
+        # Index after loading, copying every index definition from public.customers
+        definitions = await conn.scalars(
+            text("SELECT indexdef FROM pg_indexes WHERE schemaname = 'public' AND tablename = 'customers'")
+        )
+        for definition in definitions.all():
+            await conn.execute(text(definition.replace(" ON public.customers ", f" ON {SCHEMA}.customers ")))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.customers"))
+        await conn.commit()
+        print(f"loaded {count} customers into {SCHEMA}.customers in {time.perf_counter() - started:.1f}s")
+
+
+def swap_letters(value: str, rng: random.Random) -> str:
+    index = rng.randrange(len(value) - 4, len(value) - 1)
+    return value[:index] + value[index + 1] + value[index] + value[index + 2 :]
+
+
+async def sample_terms(conn, count: int, rng: random.Random) -> Dict[str, List[tuple]]:
+    """(search term, id of the customer it was made from) pairs per kind of search."""
+    rows = (
+        await conn.execute(
+            text(f"SELECT id, name, email, phone_e164 FROM {SCHEMA}.customers ORDER BY random() LIMIT :count"),
+            {"count": count},
+        )
+    ).all()
+    terms: Dict[str, List[tuple]] = {kind: [] for kind in KINDS}
+    for customer_id, name, email, phone in rows:
+        surname = name.split(" ", 1)[1]
+        terms["name-prefix"].append((surname[: rng.randint(3, 5)], customer_id))
+        terms["name-typo"].append((swap_letters(name, rng), customer_id))
+        terms["phone-partial"].append((phone[-7:-4] + "-" + phone[-4:], customer_id))
+        terms["phone-full"].append((f"+{phone[1]} {phone[2:5]}.{phone[5:8]}.{phone[8:]}", customer_id))
+        if email:
+            terms["email-prefix"].append((email[:10], customer_id))
+    return terms
+
+
+async def time_searches(session: AsyncSession, terms: List[tuple], limit: int) -> dict:
+    """Latency percentiles, and how often the customer a term came from is among the results."""
+    latencies, found = [], 0
+    for term, customer_id in terms:
+        started = time.perf_counter()
+        rows = await customer_search_service.search(session, term, limit, COLUMNS)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += any(row.id == customer_id for row in rows)
+    cuts = quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {"p50": cuts[49], "p95": cuts[94], "recall": found / len(terms)}
+
+
+async def run_searches(terms: Dict[str, List[tuple]], limit: int, indexed: bool, sample: Callable) -> dict:
+    results = {}
+    async with engine.connect() as conn:
+        await conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        if not indexed:
+            await conn.execute(text("SET enable_indexscan = off"))
+            await conn.execute(text("SET enable_bitmapscan = off"))
+            await conn.execute(text("SET enable_indexonlyscan = off"))
+        async with AsyncSession(bind=conn) as session:
+            for kind in KINDS:
+                kind_terms = sample(terms[kind])
+                await customer_search_service.search(session, kind_terms[0][0], limit, COLUMNS)  # warm up
+                results[kind] = await time_searches(session, kind_terms, limit)
+        # The SETs above were part of this transaction
+        await conn.rollback()
+    return results
+
+
+async def run(args: argparse.Namespace) -> None:
+    await build(args.customers, args.rebuild)
+    rng = random.Random(args.seed)
+    async with engine.connect() as conn:
+        terms = await sample_terms(conn, args.searches, rng)
+    indexed = await run_searches(terms, args.limit, True, lambda values: values)
+    baseline = {}
+    if args.baseline_searches:
+        baseline = await run_searches(terms, args.limit, False, lambda values: values[: args.baseline_searches])
+
+    print(f"\n{'search':<14} {'p50 ms':>9} {'p95 ms':>9} {'recall':>7} {'seq p50 ms':>11} {'speedup':>8}")
+    for kind in KINDS:
+        stats = indexed[kind]
+        line = f"{kind:<14} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['recall']:>7.0%}"
+        if kind in baseline:
+            line += f" {baseline[kind]['p50']:>11.1f} {baseline[kind]['p50'] / stats['p50']:>7.0f}x"
+        print(line)
+
+    if args.drop:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--searches", type=int, default=200, help="Searches timed per kind")
+    parser.add_argument("--baseline-searches", type=int, default=5, help="Searches per kind without indexes (0 skips)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the table even if it exists")
+    parser.add_argument("--drop", action="store_true", help="Drop the benchmark schema afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
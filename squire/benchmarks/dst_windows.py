@@ -0,0 +1,53 @@
+"""Timing for the cached local-day conversions.
+
+Times the cached conversion of a 14-day window against converting it with
+zoneinfo on every call. Correctness against zoneinfo, across DST changes in
+a matrix of timezones, is checked by tests/test_timezones.py.
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as clock
+from zoneinfo import ZoneInfo
+
+from app.utils.timezones import local_days
+
+def utc_minute(day: date, wall_minute: int, tz: ZoneInfo) -> int:
+    """What zoneinfo itself says a local wall-clock minute is in UTC (fold=0)."""
+    if wall_minute >= 24 * 60:
+        return int(datetime.combine(day + timedelta(days=1), clock(), tzinfo=tz).timestamp()) // 60
+    moment = datetime.combine(day, clock(wall_minute // 60, wall_minute % 60), tzinfo=tz)
+    return int(moment.timestamp()) // 60
+
+
+def uncached_window(zone_name: str, first: date, days: int) -> list:
+    tz = ZoneInfo(zone_name)
+    return [
+        (utc_minute(first + timedelta(days=offset), 0, tz), utc_minute(first + timedelta(days=offset), 24 * 60, tz))
+        for offset in range(days)
+    ]
+
+
+def run(year: int, iterations: int) -> None:
+    first = date(year, 3, 20)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        uncached_window("Europe/London", first, 14)
+    uncached = (time.perf_counter() - started) / iterations
+    started = time.perf_counter()
+    for _ in range(iterations):
+        local_days("Europe/London", first, 14)
+    cached = (time.perf_counter() - started) / iterations
+    print(f"14-day window: zoneinfo {uncached * 1e6:8.1f} us, cached {cached * 1e6:8.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--year", type=int, default=2025, help="window starts on March 20, across the spring change")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.year, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
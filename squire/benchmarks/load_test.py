@@ -0,0 +1,350 @@
+"""In-process load test for the booking, listing, detail and update flows.
+
+Drives app.main:app through httpx.AsyncClient, without a server in between,
+against the data in DATABASE_URL (load some first with benchmarks.seed).
+--concurrency clients each pick a flow by --mix weight, back to back, for
+--warmup and then --duration seconds. For every endpoint the script reports
+latency percentiles, throughput, errors and the SQL statements one request
+issued (counted on the primary and every replica engine).
+
+--output writes the results as JSON. --compare reads the file from an
+earlier run and exits 1 when an endpoint's p95 grew by more than
+--tolerance, or its statements per request went up, so CI can gate on it:
+
+  python -m benchmarks.load_test --duration 30 --output results.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from statistics import mean, quantiles
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import event, func, select
+
+from app.database import AsyncSessionLocal, engine, replicas
+from app.main import app
+from app.models.appointment import Appointment
+from app.models.barber import Barber
+from app.models.customer import Customer
+from app.models.service import Service
+
+# The statement count of the request the current task is making, if any
+_statements: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("statements", default=None)
+
+DEFAULT_MIX = "book=1,list=3,detail=4,update=2"
+FIXTURE_ROWS = 2000
+
+
+def count_statements() -> None:
+    def increment(*args, **kwargs) -> None:
+        counter = _statements.get()
+        if counter is not None:
+            counter[0] += 1
+
+    for sync_engine in [engine.sync_engine, *(replica.engine.sync_engine for replica in replicas.replicas)]:
+        event.listen(sync_engine, "before_cursor_execute", increment)
+
+
+@dataclass
+class Fixture:
+    """Ids the flows draw from, read from whatever data is in the database."""
+
+    shops: List[uuid.UUID]
+    barbers: List[tuple]  # (barber_id, shop_id)
+    services: Dict[uuid.UUID, List[tuple]]  # shop_id -> [(service_id, price, duration_minutes)]
+    customers: List[uuid.UUID]
+    appointments: List[uuid.UUID]
+    # Bookings go after the last seeded appointment, one barber slot after another, so they never conflict
+    next_slot: Dict[uuid.UUID, datetime]
+
+    @classmethod
+    async def load(cls) -> "Fixture":
+        async with AsyncSessionLocal() as db:
+            services: Dict[uuid.UUID, List[tuple]] = {}
+            for row in await db.execute(
+                select(Service.id, Service.shop_id, Service.price, Service.duration_minutes).where(
+                    Service.is_active.is_not(False)
+                )
+            ):
+                services.setdefault(row.shop_id, []).append((row.id, row.price, row.duration_minutes))
+            barbers = [
+                (row.id, row.shop_id)
+                for row in await db.execute(
+                    select(Barber.id, Barber.shop_id).where(
+                        Barber.is_active.is_not(False), Barber.shop_id.in_(services)
+                    )
+                )
+            ]
+            customers = list(await db.scalars(select(Customer.id).limit(FIXTURE_ROWS)))
+            if not barbers or not customers:
+                raise SystemExit("No bookable barbers or customers; load data with python -m benchmarks.seed")
+            now = datetime.now(timezone.utc)
+            # Upcoming appointments, the ones clients look at and edit
+            appointments = list(
+                await db.scalars(
+                    select(Appointment.id)
+                    .where(Appointment.appointment_date >= now)
+                    .order_by(Appointment.appointment_date)
+                    .limit(FIXTURE_ROWS)
+                )
+            )
+            if not appointments:
+                appointments = list(await db.scalars(select(Appointment.id).limit(FIXTURE_ROWS)))
+            if not appointments:
+                raise SystemExit("No appointments to read or update; load data with python -m benchmarks.seed")
+            latest = await db.scalar(select(func.max(Appointment.appointment_date))) or now
+        start = max(latest, now).replace(second=0, microsecond=0) + timedelta(days=1)
+        return cls(
+            shops=list(services),
+            barbers=barbers,
+            services=services,
+            customers=customers,
+            appointments=appointments,
+            next_slot={barber_id: start for barber_id, _ in barbers},
+        )
+
+
+async def book(client: httpx.AsyncClient, fixture: Fixture, rng: random.Random) -> httpx.Response:
+    barber_id, shop_id = rng.choice(fixture.barbers)
+    service_id, price, duration = rng.choice(fixture.services[shop_id])
+    start = fixture.next_slot[barber_id]
+    fixture.next_slot[barber_id] = start + timedelta(minutes=duration)
+    payload = {
+        "barber_id": str(barber_id),
+        "customer_id": str(rng.choice(fixture.customers)),
+        "service_id": str(service_id),
+        "appointment_date": start.isoformat(),
+        "duration_minutes": duration,
+        "price": price,
+    }
+    response = await client.post("/appointments/", json=payload)
+    if response.status_code == 201:
+        fixture.appointments.append(uuid.UUID(response.json()["id"]))
+    return response
+
+
+async def list_week(client: httpx.AsyncClient, fixture: Fixture, rng: random.Random) -> httpx.Response:
+    date_from = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    date_from += timedelta(days=rng.randrange(-60, 30))
+    params = {
+        "shop_id": str(rng.choice(fixture.shops)),
+        "date_from": date_from.isoformat(),
+        "date_to": (date_from + timedelta(days=7)).isoformat(),
+        "limit": 50,
+    }
+    return await client.get("/appointments/", params=params)
+
+
+async def detail(client: httpx.AsyncClient, fixture: Fixture, rng: random.Random) -> httpx.Response:
+    return await client.get(f"/appointments/{rng.choice(fixture.appointments)}")
+
+
+async def update(client: httpx.AsyncClient, fixture: Fixture, rng: random.Random) -> httpx.Response:
+    payload = {"notes": f"Load test {rng.randrange(1_000_000)}"}
+    return await client.patch(f"/appointments/{rng.choice(fixture.appointments)}", json=payload)
+
+
+async def shop_stats(client: httpx.AsyncClient, fixture: Fixture, rng: random.Random) -> httpx.Response:
+    return await client.get(f"/shops/{rng.choice(fixture.shops)}/stats/", params={"days": rng.choice((7, 30, 365))})
+
+
+# flow name -> (endpoint it exercises, flow)
+FLOWS = {
+    "book": ("POST /appointments/", book),
+    "list": ("GET /appointments/", list_week),
+    "detail": ("GET /appointments/{id}", detail),
+    "update": ("PATCH /appointments/{id}", update),
+    "stats": ("GET /shops/{id}/stats/", shop_stats),
+}
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    statements: List[int] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+    def record(self, elapsed: float, statements: int, status: int) -> None:
+        self.latencies.append(elapsed * 1000)
+        self.statements.append(statements)
+        self.statuses[status] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        cuts = quantiles(self.latencies, n=100, method="inclusive") if len(self.latencies) > 1 else self.latencies * 99
+        return {
+            "requests": len(self.latencies),
+            "errors": sum(count for status, count in self.statuses.items() if status >= 400),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "throughput_rps": round(len(self.latencies) / elapsed, 2),
+            "mean_ms": round(mean(self.latencies), 3),
+            "p50_ms": round(cuts[49], 3),
+            "p95_ms": round(cuts[94], 3),
+            "p99_ms": round(cuts[98], 3),
+            "statements_mean": round(mean(self.statements), 2),
+            "statements_max": max(self.statements),
+        }
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    fixture: Fixture,
+    mix: Dict[str, int],
+    stats: Dict[str, EndpointStats],
+    deadline: float,
+    rng: random.Random,
+) -> None:
+    names = list(mix)
+    weights = list(mix.values())
+    while time.perf_counter() < deadline:
+        endpoint, flow = FLOWS[rng.choices(names, weights)[0]]
+        counter = [0]
+        token = _statements.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await flow(client, fixture, rng)
+        finally:
+            elapsed = time.perf_counter() - started
+            _statements.reset(token)
+        stats.setdefault(endpoint, EndpointStats()).record(elapsed, counter[0], response.status_code)
+
+
+async def phase(
+    client: httpx.AsyncClient, fixture: Fixture, mix: Dict[str, int], concurrency: int, seconds: float, seed: int
+) -> tuple:
+    stats: Dict[str, EndpointStats] = {}
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(
+        *(
+            client_loop(client, fixture, mix, stats, deadline, random.Random(seed * 1000 + index))
+            for index in range(concurrency)
+        )
+    )
+    return stats, time.perf_counter() - started
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in FLOWS:
+            raise argparse.ArgumentTypeError(f"unknown flow {name!r}, expected one of {', '.join(FLOWS)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Print the change against `baseline` per endpoint and return the regressions."""
+    regressions = []
+    print(f"\n{'vs baseline':<26} {'p95 ms':>18} {'statements':>14}")
+    for endpoint, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if before is None:
+            continue
+        p95_change = current["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        print(
+            f"{endpoint:<26} {before['p95_ms']:>7.2f} -> {current['p95_ms']:>7.2f} "
+            f"{before['statements_mean']:>5.1f} -> {current['statements_mean']:>5.1f}"
+        )
+        if p95_change > tolerance:
+            regressions.append(f"{endpoint}: p95 {p95_change:+.0%}")
+        # Half a statement of slack absorbs flows whose count depends on the row they hit
+        if current["statements_mean"] > before["statements_mean"] + 0.5:
+            regressions.append(f"{endpoint}: {before['statements_mean']} -> {current['statements_mean']} statements")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    count_statements()
+    fixture = await Fixture.load()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            if args.warmup > 0:
+                await phase(client, fixture, args.mix, args.concurrency, args.warmup, args.seed + 1)
+            stats, elapsed = await phase(client, fixture, args.mix, args.concurrency, args.duration, args.seed)
+    await engine.dispose()
+
+    endpoints = {endpoint: stats[endpoint].summary(elapsed) for endpoint, _ in FLOWS.values() if endpoint in stats}
+    requests = sum(summary["requests"] for summary in endpoints.values())
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration_seconds": round(elapsed, 3),
+            "mix": args.mix,
+            "seed": args.seed,
+            "fixture": {"barbers": len(fixture.barbers), "shops": len(fixture.shops)},
+        },
+        "endpoints": endpoints,
+        "total": {
+            "requests": requests,
+            "errors": sum(summary["errors"] for summary in endpoints.values()),
+            "throughput_rps": round(requests / elapsed, 2),
+        },
+    }
+
+
+def report(results: dict) -> None:
+    print(
+        f"{'endpoint':<26} {'requests':>8} {'errors':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'stmts':>6}"
+    )
+    for endpoint, summary in results["endpoints"].items():
+        print(
+            f"{endpoint:<26} {summary['requests']:>8} {summary['errors']:>6} {summary['throughput_rps']:>8.1f} "
+            f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+            f"{summary['statements_mean']:>6.1f}"
+        )
+    total = results["total"]
+    print(f"{'total':<26} {total['requests']:>8} {total['errors']:>6} {total['throughput_rps']:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Default {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Results JSON from an earlier run to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 growth, as a fraction")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
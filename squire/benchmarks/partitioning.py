@@ -0,0 +1,183 @@
+"""Per-shop schedule queries on a plain vs a shop-partitioned appointments table.
+
+Builds two copies of a synthetic appointments table in a scratch schema of
+the database configured in DATABASE_URL (50M rows by default; --reuse skips
+the load on later runs):
+
+  heap         the old layout: no shop_id, so a shop's schedule joins barbers
+  partitioned  hash-partitioned by shop_id, with (barber_id, appointment_date)
+               and (shop_id, appointment_date) indexes on every partition
+
+and then times "one shop, one day" schedule reads for random shops, which
+is what the availability and list endpoints do, reporting latency
+percentiles plus the partitions and buffers one plan touches.
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from statistics import median, quantiles
+
+from sqlalchemy import text
+
+from app.database import engine
+
+SCHEMA = "partition_bench"
+BASE = datetime(2030, 1, 1, tzinfo=timezone.utc)
+SLOTS_PER_DAY = 16
+CHUNK_ROWS = 1_000_000
+
+HEAP_QUERY = (
+    f"SELECT a.id, a.barber_id, a.appointment_date, a.duration_minutes, a.status "
+    f"FROM {SCHEMA}.appointments_heap a JOIN {SCHEMA}.barbers b ON b.id = a.barber_id "
+    f"WHERE b.shop_id = :shop_id AND a.appointment_date >= :day_start AND a.appointment_date < :day_end "
+    f"ORDER BY a.appointment_date"
+)
+PARTITIONED_QUERY = (
+    f"SELECT id, barber_id, appointment_date, duration_minutes, status "
+    f"FROM {SCHEMA}.appointments_partitioned "
+    f"WHERE shop_id = :shop_id AND appointment_date >= :day_start AND appointment_date < :day_end "
+    f"ORDER BY appointment_date"
+)
+
+
+def shop_uuid(column: str) -> str:
+    return f"md5('shop-' || {column})::uuid"
+
+
+def barber_uuid(column: str) -> str:
+    return f"md5('barber-' || {column})::uuid"
+
+
+async def build(conn, rows: int, shops: int, barbers_per_shop: int, partitions: int) -> None:
+    barbers = shops * barbers_per_shop
+    statements = [
+        f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+        f"CREATE SCHEMA {SCHEMA}",
+        f"CREATE TABLE {SCHEMA}.barbers (id uuid PRIMARY KEY, shop_id uuid NOT NULL)",
+        f"INSERT INTO {SCHEMA}.barbers SELECT {barber_uuid('n')}, {shop_uuid(f'(n / {barbers_per_shop})')} "
+        f"FROM generate_series(0, {barbers - 1}) n",
+        f"CREATE INDEX ON {SCHEMA}.barbers (shop_id)",
+        f"CREATE TABLE {SCHEMA}.appointments_heap ("
+        "id uuid PRIMARY KEY, barber_id uuid NOT NULL, appointment_date timestamptz NOT NULL, "
+        "duration_minutes int NOT NULL, status varchar(20) NOT NULL)",
+        f"CREATE TABLE {SCHEMA}.appointments_partitioned ("
+        "id uuid NOT NULL, shop_id uuid NOT NULL, barber_id uuid NOT NULL, appointment_date timestamptz NOT NULL, "
+        "duration_minutes int NOT NULL, status varchar(20) NOT NULL, PRIMARY KEY (id, shop_id)"
+        ") PARTITION BY HASH (shop_id)",
+        *(
+            f"CREATE TABLE {SCHEMA}.appointments_partitioned_p{remainder:02d} "
+            f"PARTITION OF {SCHEMA}.appointments_partitioned "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            for remainder in range(partitions)
+        ),
+    ]
+    for statement in statements:
+        await conn.execute(text(statement))
+    await conn.commit()
+
+    # Appointment n belongs to barber n % barbers, in that barber's next free slot
+    slot = (
+        f"timestamptz '{BASE.isoformat()}' + ((n / {barbers}) / {SLOTS_PER_DAY}) * interval '1 day' "
+        f"+ interval '8 hours' + ((n / {barbers}) % {SLOTS_PER_DAY}) * interval '30 minutes'"
+    )
+    for first in range(0, rows, CHUNK_ROWS):
+        last = min(first + CHUNK_ROWS, rows) - 1
+        series = f"FROM generate_series({first}, {last}) n"
+        await conn.execute(
+            text(
+                f"INSERT INTO {SCHEMA}.appointments_heap "
+                f"SELECT md5('appointment-' || n)::uuid, {barber_uuid(f'(n % {barbers})')}, {slot}, 30, "
+                f"CASE WHEN n % 10 = 0 THEN 'cancelled' ELSE 'scheduled' END {series}"
+            )
+        )
+        await conn.execute(
+            text(
+                f"INSERT INTO {SCHEMA}.appointments_partitioned "
+                f"SELECT md5('appointment-' || n)::uuid, {shop_uuid(f'((n % {barbers}) / {barbers_per_shop})')}, "
+                f"{barber_uuid(f'(n % {barbers})')}, {slot}, 30, "
+                f"CASE WHEN n % 10 = 0 THEN 'cancelled' ELSE 'scheduled' END {series}"
+            )
+        )
+        await conn.commit()
+        print(f"  loaded {last + 1:,} / {rows:,} rows", flush=True)
+
+    for statement in (
+        f"CREATE INDEX ON {SCHEMA}.appointments_heap (barber_id, appointment_date)",
+        f"CREATE INDEX ON {SCHEMA}.appointments_heap (appointment_date, id)",
+        f"CREATE INDEX ON {SCHEMA}.appointments_partitioned (barber_id, appointment_date)",
+        f"CREATE INDEX ON {SCHEMA}.appointments_partitioned (shop_id, appointment_date)",
+        f"ANALYZE {SCHEMA}.barbers",
+        f"ANALYZE {SCHEMA}.appointments_heap",
+        f"ANALYZE {SCHEMA}.appointments_partitioned",
+    ):
+        await conn.execute(text(statement))
+    await conn.commit()
+
+
+async def shop_ids(conn, count: int) -> list:
+    rows = await conn.execute(
+        text(f"SELECT DISTINCT shop_id FROM {SCHEMA}.barbers ORDER BY shop_id LIMIT :count"), {"count": count}
+    )
+    return [row.shop_id for row in rows]
+
+
+async def plan_summary(conn, query: str, params: dict) -> str:
+    plan = "\n".join(
+        row[0] for row in await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {query}"), params)
+    )
+    scanned = set(re.findall(r"on (appointments_\w+)", plan))
+    # The first Buffers line belongs to the top plan node and covers the whole query
+    buffers = re.search(r"Buffers: (shared [^\n]*)", plan)
+    return f"{len(scanned)} appointments relation(s) scanned, {buffers.group(1) if buffers else 'no buffers'}"
+
+
+async def measure(conn, query: str, shops: list, days: int, samples: int) -> list:
+    random.seed(7)
+    latencies = []
+    for _ in range(samples):
+        day_start = BASE + timedelta(days=random.randrange(days))
+        params = {"shop_id": random.choice(shops), "day_start": day_start, "day_end": day_start + timedelta(days=1)}
+        started = time.perf_counter()
+        (await conn.execute(text(query), params)).all()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with engine.connect() as conn:
+        if not args.reuse:
+            print(f"building {args.rows:,} appointments in schema {SCHEMA} ...")
+            await build(conn, args.rows, args.shops, args.barbers_per_shop, args.partitions)
+        shops = await shop_ids(conn, 1000)
+        barbers = args.shops * args.barbers_per_shop
+        days = max(1, args.rows // barbers // SLOTS_PER_DAY)
+        sample_params = {"shop_id": shops[0], "day_start": BASE, "day_end": BASE + timedelta(days=1)}
+
+        print(f"{'table':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  one plan")
+        for label, query in (("heap", HEAP_QUERY), ("partitioned", PARTITIONED_QUERY)):
+            await measure(conn, query, shops, days, 20)  # warm the cache and statement plans
+            latencies = await measure(conn, query, shops, days, args.samples)
+            cuts = quantiles(latencies, n=100)
+            summary = await plan_summary(conn, query, sample_params)
+            print(f"{label:<12} {median(latencies):>8.2f} {cuts[94]:>8.2f} {cuts[98]:>8.2f}  {summary}")
+        await conn.rollback()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--shops", type=int, default=5000)
+    parser.add_argument("--barbers-per-shop", type=int, default=5)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--reuse", action="store_true", help="Skip the load and reuse the existing tables")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark for the in-memory pricing pass behind POST /quotes/batch.
+
+Prices a slot picker's worth of candidates (every free-looking slot over a
+week for a handful of barbers) against synthetic services, surcharge rules
+and bookings, so it measures the pricing pass alone, without the database.
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.schemas.quote import QuoteCandidate
+from app.services.availability_service import BarberSchedule
+from app.services.pricing_service import BarberPricing, ServicePricing, SurchargeRule, pricing_service
+from app.services.schedule_index import BarberTimeline, epoch_minute
+
+ALL_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def fixture(barbers: int, candidates: int, tz_name: str):
+    shop_id = uuid.uuid4()
+    service_id = uuid.uuid4()
+    services = {service_id: ServicePricing(shop_id, 2500, 30)}
+    first = datetime(2030, 3, 25, 9, tzinfo=timezone.utc)
+    barber_pricing = {}
+    timelines = {}
+    for _ in range(barbers):
+        barber_id = uuid.uuid4()
+        barber_pricing[barber_id] = BarberPricing(
+            shop_id,
+            tz_name,
+            BarberSchedule.from_barber(barber_id, ALL_DAYS, [{"start": "09:00", "end": "18:00"}]),
+            [SurchargeRule("percentage", 0, 20), SurchargeRule("fixed", 100, 500)],
+        )
+        bookings = []
+        for day in range(7):
+            for hour in (10, 13, 15):
+                start = epoch_minute(first + timedelta(days=day, hours=hour - 9))
+                bookings.append((start, start + 45, uuid.uuid4()))
+        timelines[barber_id] = BarberTimeline(barber_id, epoch_minute(first) - 2880, bookings, time.monotonic())
+
+    barber_ids = list(barber_pricing)
+    slots = [
+        QuoteCandidate(
+            barber_id=barber_ids[index % barbers],
+            service_id=service_id,
+            start=first + timedelta(minutes=15 * (index // barbers)),
+        )
+        for index in range(candidates)
+    ]
+    return slots, services, barber_pricing, timelines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--barbers", type=int, default=8)
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--timezone", default="Europe/London")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    slots, services, barbers, timelines = fixture(args.barbers, args.candidates, args.timezone)
+    quotes = pricing_service.price(slots, services, barbers, timelines)
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        pricing_service.price(slots, services, barbers, timelines)
+    elapsed = (time.perf_counter() - started) / args.iterations
+    available = sum(1 for quote in quotes if quote.available)
+    print(f"{len(slots)} candidates, {available} available: {elapsed * 1000:.2f} ms per batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Fan-out cost of the live schedule event hub.
+
+Connects --clients in-process subscribers (spread over --shops shops, a
+quarter of them filtered to one barber) to a ScheduleEventHub, publishes
+--events appointment changes as the LISTEN connection would, and reports
+how long each event takes to reach every matching client, plus the cost
+of a Last-Event-ID resume. No database is needed.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from statistics import quantiles
+
+from app.services.schedule_events import ScheduleEventHub, Subscription
+
+
+def payload(seq: int, shop_id: uuid.UUID, barber_id: uuid.UUID) -> str:
+    now = datetime.now(timezone.utc).isoformat()
+    row = {
+        "id": str(uuid.uuid4()),
+        "shop_id": str(shop_id),
+        "barber_id": str(barber_id),
+        "customer_id": str(uuid.uuid4()),
+        "service_id": str(uuid.uuid4()),
+        "appointment_date": now,
+        "duration_minutes": 30,
+        "price": 2500,
+        "discount": 0,
+        "booking_fee": 200,
+        "surcharge": 300,
+        "total_price": 3000,
+        "status": "scheduled",
+        "notes": None,
+        "series_id": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    return json.dumps(
+        {
+            "seq": seq,
+            "op": "insert",
+            "shop_id": row["shop_id"],
+            "barber_id": row["barber_id"],
+            "previous_shop_id": None,
+            "previous_barber_id": None,
+            "id": row["id"],
+            "appointment": row,
+        }
+    )
+
+
+async def consume(subscription: Subscription, received: list) -> None:
+    async for frame in subscription.frames(keepalive=3600):
+        if frame.startswith(b"id: "):
+            received.append(time.perf_counter())
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    hub = ScheduleEventHub("postgresql://localhost/unused", args.events, args.events, keepalive=3600)
+    shops = {uuid.uuid4(): [uuid.uuid4() for _ in range(4)] for _ in range(args.shops)}
+    shop_ids = list(shops)
+    received = []
+    consumers = []
+    for index in range(args.clients):
+        shop_id = shop_ids[index % len(shop_ids)]
+        barber_id = rng.choice(shops[shop_id]) if index % 4 == 0 else None
+        consumers.append(asyncio.create_task(consume(hub.subscribe(shop_id, barber_id), received)))
+    await asyncio.sleep(0)
+
+    payloads = []
+    for seq in range(1, args.events + 1):
+        shop_id = rng.choice(shop_ids)
+        payloads.append(payload(seq, shop_id, rng.choice(shops[shop_id])))
+
+    latencies, publish_cost = [], []
+    for text in payloads:
+        delivered = len(received)
+        started = time.perf_counter()
+        hub._on_notification(None, 0, "appointment_changes", text)
+        publish_cost.append(time.perf_counter() - started)
+        # Let every consumer task drain its queue
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        if len(received) > delivered:
+            latencies.append(max(received[delivered:]) - started)
+
+    cuts = quantiles([value * 1000 for value in latencies], n=100, method="inclusive")
+    publish_cuts = quantiles([value * 1000 for value in publish_cost], n=100, method="inclusive")
+    print(f"{args.clients} clients over {args.shops} shops, {args.events} events, {len(received)} frames delivered")
+    print(f"publish (parse, encode once, enqueue):  p50 {publish_cuts[49]:.3f} ms  p95 {publish_cuts[94]:.3f} ms")
+    print(f"publish to last matching client:        p50 {cuts[49]:.3f} ms  p95 {cuts[94]:.3f} ms")
+
+    started = time.perf_counter()
+    resumed = hub.subscribe(shop_ids[0], None, last_event_id=1)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"resume from the oldest buffered event:  {elapsed_ms:.3f} ms, {len(resumed.pending)} events replayed")
+
+    await hub.stop()
+    await asyncio.gather(*consumers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--shops", type=int, default=200)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
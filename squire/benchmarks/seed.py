@@ -0,0 +1,383 @@
+"""Seeded synthetic data for benchmarks and load tests.
+
+Generates shops (spread over a few timezones), barbers with realistic
+days_on and working_hours, services, surcharge settings, customers and
+years of appointments, and bulk-loads them into the database configured in
+DATABASE_URL:
+
+  python -m benchmarks.seed --shops 20 --customers 5000 --years 2 --seed 1
+
+Appointments fill each barber's working days up to roughly --occupancy, in
+shop-local time; past ones are mostly completed (with some cancellations
+and no-shows), upcoming ones scheduled or confirmed, and a barber's
+appointments never overlap. The same --seed and --today always produce the
+same rows, so runs on different commits measure the same data; loading the
+same seed twice needs --reset, which empties every table first.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import insert, text
+
+from app.config import settings
+from app.database import engine
+from app.models.appointment import Appointment
+from app.models.barber import Barber
+from app.models.customer import Customer
+from app.models.service import Service
+from app.models.shop import Shop
+from app.models.surcharge_setting import SurchargeSetting
+from app.services.availability_service import WEEKDAYS, parse_hhmm
+
+CHUNK_ROWS = 5000
+TIMEZONES = (
+    "UTC",
+    "Europe/London",
+    "Europe/Berlin",
+    "America/New_York",
+    "America/Chicago",
+    "America/Los_Angeles",
+    "Australia/Sydney",
+)
+STREETS = ("Main St", "High St", "Market St", "Church Rd", "Station Rd", "Park Ave", "Mill Lane", "King St")
+SHOP_NAMES = ("Cuts", "Barbers", "Grooming", "Clippers", "Barber Co.", "Fades", "Shave Club")
+FIRST_NAMES = (
+    "James", "Maria", "David", "Aisha", "Tom", "Sofia", "Liam", "Chen", "Noah", "Priya",
+    "Omar", "Emma", "Lucas", "Hana", "Mateo", "Zoe", "Ethan", "Ines", "Ravi", "Grace",
+)
+LAST_NAMES = (
+    "Smith", "Garcia", "Jones", "Khan", "Brown", "Rossi", "Wilson", "Wang", "Taylor", "Patel",
+    "Murphy", "Novak", "Silva", "Kim", "Walker", "Müller", "Cohen", "Okafor", "Lopez", "Evans",
+)
+# (name, description, base price in cents, duration in minutes)
+CATALOG = (
+    ("Haircut", "Classic cut and style", 2500, 30),
+    ("Skin Fade", "Fade down to the skin", 3000, 45),
+    ("Beard Trim", "Beard shaping and line up", 1500, 15),
+    ("Cut & Beard", "Haircut with beard trim", 3800, 45),
+    ("Kids Cut", "Under 12s", 1800, 30),
+    ("Hot Towel Shave", "Straight razor shave", 2800, 30),
+    ("Colour", "Full colour", 5500, 60),
+    ("Line Up", "Edges only", 1000, 15),
+)
+DAYS_ON = (
+    WEEKDAYS[0:5],
+    WEEKDAYS[1:6],
+    WEEKDAYS[2:7],
+    WEEKDAYS[0:6],
+    ("monday", "wednesday", "friday", "saturday"),
+)
+WORKING_HOURS = (
+    [{"start": "09:00", "end": "17:00"}],
+    [{"start": "10:00", "end": "19:00"}],
+    [{"start": "08:00", "end": "12:30"}, {"start": "13:30", "end": "17:00"}],
+    [{"start": "11:00", "end": "15:00"}, {"start": "16:00", "end": "20:00"}],
+)
+NOTES = ("Regular", "Prefers scissors over clippers", "Running late", "First visit", "Gift voucher")
+
+
+@dataclass
+class Scale:
+    shops: int = 20
+    barbers_per_shop: int = 4
+    services_per_shop: int = 6
+    customers: int = 5000
+    years: float = 2.0
+    future_days: int = 60
+    occupancy: float = 0.7
+
+
+@dataclass
+class SeedBarber:
+    id: uuid.UUID
+    shop_id: uuid.UUID
+    timezone: str
+    days_on: frozenset
+    working_hours: list
+    surcharged: bool
+
+
+@dataclass
+class SeedService:
+    id: uuid.UUID
+    price: int
+    duration_minutes: int
+
+
+class Generator:
+    """Builds rows for every table from one random.Random, so a seed always yields the same data."""
+
+    def __init__(self, seed: int, scale: Scale, today: date) -> None:
+        self.rng = random.Random(seed)
+        self.scale = scale
+        self.today = today
+        self.now = datetime.combine(today, datetime.min.time(), timezone.utc)
+
+    def new_id(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def person(self) -> tuple:
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def created_at(self) -> datetime:
+        return self.now - timedelta(days=self.scale.years * 365 + self.rng.randrange(30, 400))
+
+    def customers(self) -> List[dict]:
+        rows = []
+        for index in range(self.scale.customers):
+            first, last = self.person()
+            created = self.created_at()
+            rows.append(
+                {
+                    "id": self.new_id(),
+                    "name": f"{first} {last}",
+                    "email": f"{first}.{last}{index}@example.com".lower() if self.rng.random() < 0.8 else None,
+                    "phone": f"+1555{index:07d}",
+                    "created_at": created,
+                    "updated_at": created,
+                }
+            )
+        return rows
+
+    def shop(self, index: int) -> dict:
+        created = self.created_at()
+        name = f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(SHOP_NAMES)}"
+        return {
+            "id": self.new_id(),
+            "name": name,
+            "address": f"{self.rng.randrange(1, 400)} {self.rng.choice(STREETS)}",
+            "phone": f"+1555{index:04d}000",
+            "email": f"hello{index}@example.com",
+            "timezone": self.rng.choice(TIMEZONES),
+            "created_at": created,
+            "updated_at": created,
+        }
+
+    def services(self, shop: dict) -> List[dict]:
+        # Each shop prices the catalogue at its own level, rounded to 50 cents
+        level = self.rng.uniform(0.8, 1.4)
+        count = min(self.scale.services_per_shop, len(CATALOG))
+        return [
+            {
+                "id": self.new_id(),
+                "shop_id": shop["id"],
+                "name": name,
+                "description": description,
+                "price": round(price * level / 50) * 50,
+                "duration_minutes": duration,
+                "is_active": True,
+                "created_at": shop["created_at"],
+                "updated_at": shop["created_at"],
+            }
+            for name, description, price, duration in self.rng.sample(CATALOG, count)
+        ]
+
+    def barbers(self, shop: dict) -> List[dict]:
+        rows = []
+        for _ in range(self.scale.barbers_per_shop):
+            first, last = self.person()
+            rows.append(
+                {
+                    "id": self.new_id(),
+                    "shop_id": shop["id"],
+                    "name": f"{first} {last}",
+                    "email": f"{first}.{last}@{shop['email'].split('@')[1]}".lower(),
+                    "phone": shop["phone"],
+                    "days_on": list(self.rng.choice(DAYS_ON)),
+                    "working_hours": self.rng.choice(WORKING_HOURS),
+                    "is_active": self.rng.random() < 0.95,
+                    "created_at": shop["created_at"],
+                    "updated_at": shop["created_at"],
+                }
+            )
+        return rows
+
+    def surcharge_settings(self, barber: dict) -> List[dict]:
+        if self.rng.random() < 0.5:
+            return []
+        kind = self.rng.choice(("percentage", "fixed"))
+        return [
+            {
+                "id": self.new_id(),
+                "barber_id": barber["id"],
+                "type": kind,
+                "min_value": 0,
+                "max_value": 20 if kind == "percentage" else 500,
+                "is_active": True,
+                "created_at": barber["created_at"],
+                "updated_at": barber["created_at"],
+            }
+        ]
+
+    def appointments(
+        self, barber: SeedBarber, services: List[SeedService], customers: List[uuid.UUID]
+    ) -> Iterator[dict]:
+        rng = self.rng
+        tz = ZoneInfo(barber.timezone)
+        windows = [(parse_hhmm(hours["start"]), parse_hhmm(hours["end"])) for hours in barber.working_hours]
+        # Most visits come from the barber's regulars
+        regulars = rng.sample(customers, min(len(customers), 150))
+        day = self.today - timedelta(days=int(self.scale.years * 365))
+        last_day = self.today + timedelta(days=self.scale.future_days)
+        while day <= last_day:
+            if day.weekday() in barber.days_on:
+                midnight = datetime.combine(day, datetime.min.time(), tz)
+                for start, end in windows:
+                    minute = start
+                    while True:
+                        service = rng.choice(services)
+                        if minute + service.duration_minutes > end:
+                            break
+                        if rng.random() >= self.scale.occupancy:
+                            minute += 15
+                            continue
+                        starts_at = (midnight + timedelta(minutes=minute)).astimezone(timezone.utc)
+                        minute += service.duration_minutes
+                        yield self.appointment(barber, service, regulars, customers, starts_at)
+            day += timedelta(days=1)
+
+    def appointment(
+        self,
+        barber: SeedBarber,
+        service: SeedService,
+        regulars: List[uuid.UUID],
+        customers: List[uuid.UUID],
+        starts_at: datetime,
+    ) -> dict:
+        rng = self.rng
+        roll = rng.random()
+        if starts_at < self.now:
+            status = "cancelled" if roll < 0.06 else "no_show" if roll < 0.09 else "completed"
+        else:
+            status = "cancelled" if roll < 0.04 else "confirmed" if roll < 0.45 else "scheduled"
+        booked_at = min(starts_at, self.now) - timedelta(hours=rng.randrange(1, 24 * 30))
+        return {
+            "id": self.new_id(),
+            "shop_id": barber.shop_id,
+            "barber_id": barber.id,
+            "customer_id": rng.choice(regulars) if rng.random() < 0.6 else rng.choice(customers),
+            "service_id": service.id,
+            "appointment_date": starts_at,
+            "duration_minutes": service.duration_minutes,
+            "price": service.price,
+            "discount": service.price // 10 if rng.random() < 0.1 else 0,
+            "booking_fee": settings.BOOKING_FEE,
+            "surcharge": rng.choice((0, 0, 100, 200, 300)) if barber.surcharged else 0,
+            "status": status,
+            "notes": rng.choice(NOTES) if rng.random() < 0.05 else None,
+            "created_at": booked_at,
+            "updated_at": booked_at,
+        }
+
+
+async def insert_rows(conn, model, rows: List[dict]) -> None:
+    for first in range(0, len(rows), CHUNK_ROWS):
+        await conn.execute(insert(model.__table__), rows[first : first + CHUNK_ROWS])
+
+
+async def seed(seed_value: int, scale: Scale, today: date, reset: bool = False) -> Dict[str, int]:
+    """Load one seeded dataset and return the number of rows written per table."""
+    generator = Generator(seed_value, scale, today)
+    counts = dict.fromkeys(("shops", "barbers", "services", "surcharge_settings", "customers", "appointments"), 0)
+    async with engine.connect() as conn:
+        if reset:
+            await conn.execute(text("TRUNCATE shops, customers CASCADE"))
+
+        customers = generator.customers()
+        await insert_rows(conn, Customer, customers)
+        counts["customers"] = len(customers)
+        customer_ids = [row["id"] for row in customers]
+        await conn.commit()
+
+        pending: List[dict] = []
+        for index in range(scale.shops):
+            shop = generator.shop(index)
+            services = generator.services(shop)
+            barbers = generator.barbers(shop)
+            settings_rows = [row for barber in barbers for row in generator.surcharge_settings(barber)]
+            await insert_rows(conn, Shop, [shop])
+            await insert_rows(conn, Service, services)
+            await insert_rows(conn, Barber, barbers)
+            await insert_rows(conn, SurchargeSetting, settings_rows)
+            counts["shops"] += 1
+            counts["services"] += len(services)
+            counts["barbers"] += len(barbers)
+            counts["surcharge_settings"] += len(settings_rows)
+
+            surcharged = {row["barber_id"] for row in settings_rows}
+            bookable = [SeedService(row["id"], row["price"], row["duration_minutes"]) for row in services]
+            for row in barbers:
+                barber = SeedBarber(
+                    row["id"],
+                    shop["id"],
+                    shop["timezone"],
+                    frozenset(WEEKDAYS.index(day) for day in row["days_on"]),
+                    row["working_hours"],
+                    row["id"] in surcharged,
+                )
+                for appointment in generator.appointments(barber, bookable, customer_ids):
+                    pending.append(appointment)
+                    if len(pending) == CHUNK_ROWS:
+                        await insert_rows(conn, Appointment, pending)
+                        counts["appointments"] += len(pending)
+                        pending = []
+            await conn.commit()
+            print(f"  shop {index + 1}/{scale.shops}: {counts['appointments']:,} appointments so far", flush=True)
+
+        await insert_rows(conn, Appointment, pending)
+        counts["appointments"] += len(pending)
+        for table in ("shops", "barbers", "services", "surcharge_settings", "customers", "appointments"):
+            await conn.execute(text(f"ANALYZE {table}"))
+        await conn.commit()
+    return counts
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Scale()
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--shops", type=int, default=defaults.shops)
+    parser.add_argument("--barbers-per-shop", type=int, default=defaults.barbers_per_shop)
+    parser.add_argument("--services-per-shop", type=int, default=defaults.services_per_shop)
+    parser.add_argument("--customers", type=int, default=defaults.customers)
+    parser.add_argument("--years", type=float, default=defaults.years, help="History before --today")
+    parser.add_argument("--future-days", type=int, default=defaults.future_days, help="Bookings after --today")
+    parser.add_argument("--occupancy", type=float, default=defaults.occupancy)
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD")
+    parser.add_argument("--reset", action="store_true", help="Empty every table before loading")
+
+
+def scale_from(args: argparse.Namespace) -> Scale:
+    return Scale(
+        shops=args.shops,
+        barbers_per_shop=args.barbers_per_shop,
+        services_per_shop=args.services_per_shop,
+        customers=args.customers,
+        years=args.years,
+        future_days=args.future_days,
+        occupancy=args.occupancy,
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    counts = await seed(args.seed, scale_from(args), args.today, args.reset)
+    await engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{count:,} {table}" for table, count in counts.items()) + f" in {elapsed:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_scale_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
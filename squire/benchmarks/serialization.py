@@ -0,0 +1,154 @@
+"""Serialization cost of a page of appointments: ORM path vs row path.
+
+Encodes the same N AppointmentResponse rows (10k by default) the way the
+list endpoints used to and the way they do now, and reports CPU time and
+peak allocated memory for each:
+
+  orm   ORM instances, validated into the response model with
+        from_attributes by FastAPI's serialize_response, then JSONResponse
+  rows  plain row tuples, zipped into dicts and encoded by pydantic-core
+        (utils.rows.rows_json)
+
+With --database the rows are also fetched from DATABASE_URL (run
+benchmarks.seed first), so hydration and driver costs are included.
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, engine
+from app.main import app  # noqa: F401  (configures every mapper)
+from app.models.appointment import Appointment
+from app.schemas.appointment import AppointmentResponse
+from app.schemas.expanded import ExpandedAppointmentResponse
+from app.utils.rows import projected_columns, rows_json
+
+COLUMNS = projected_columns(Appointment, AppointmentResponse)
+RESPONSE_FIELD = create_response_field(name="response", type_=List[ExpandedAppointmentResponse])
+
+
+def synthetic_rows(count: int) -> list:
+    base = datetime(2030, 1, 1, 9, tzinfo=timezone.utc)
+    shop_id, barber_id, service_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    values = []
+    for index in range(count):
+        start = base + timedelta(minutes=30 * index)
+        row = {
+            "barber_id": barber_id,
+            "customer_id": uuid.uuid4(),
+            "service_id": service_id,
+            "appointment_date": start,
+            "duration_minutes": 30,
+            "price": 2500,
+            "discount": 0,
+            "booking_fee": 200,
+            "surcharge": 300,
+            "status": "scheduled",
+            "notes": "Regular" if index % 10 == 0 else None,
+            "series_id": None,
+            "id": uuid.uuid4(),
+            "shop_id": shop_id,
+            "total_price": 3000,
+            "created_at": start - timedelta(days=3),
+            "updated_at": start - timedelta(days=3),
+        }
+        values.append(tuple(row[column.key] for column in COLUMNS))
+    return values
+
+
+def orm_instances(rows: list) -> list:
+    keys = [column.key for column in COLUMNS]
+    return [Appointment(**dict(zip(keys, row))) for row in rows]
+
+
+async def orm_path(rows: list) -> bytes:
+    content = await serialize_response(
+        field=RESPONSE_FIELD, response_content=orm_instances(rows), exclude_unset=True, is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+async def rows_path(rows: list) -> bytes:
+    return rows_json(rows, COLUMNS)
+
+
+async def measure(path: Callable, rows: list, iterations: int) -> tuple:
+    await path(rows)  # warm up validators and caches
+    gc.collect()
+    started = time.process_time()
+    for _ in range(iterations):
+        body = await path(rows)
+    cpu_ms = (time.process_time() - started) * 1000 / iterations
+    gc.collect()
+    tracemalloc.start()
+    await path(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1024 / 1024, body
+
+
+async def fetch(limit: int, entities: bool) -> list:
+    async with AsyncSessionLocal() as db:
+        if entities:
+            query = select(Appointment).order_by(Appointment.appointment_date).limit(limit)
+            return list((await db.scalars(query)).all())
+        return (await db.execute(select(*COLUMNS).order_by(Appointment.appointment_date).limit(limit))).all()
+
+
+async def measure_database(limit: int, iterations: int) -> None:
+    print(f"\nfetch + encode {limit} rows from the database")
+    for label, entities in (("orm", True), ("rows", False)):
+        await fetch(limit, entities)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        for _ in range(iterations):
+            fetched = await fetch(limit, entities)
+            if entities:
+                content = await serialize_response(
+                    field=RESPONSE_FIELD, response_content=fetched, exclude_unset=True, is_coroutine=True
+                )
+                JSONResponse(content)
+            else:
+                rows_json(fetched, COLUMNS)
+        wall_ms = (time.perf_counter() - started) * 1000 / iterations
+        cpu_ms = (time.process_time() - cpu_started) * 1000 / iterations
+        print(f"{label:<6} {wall_ms:>9.1f} ms wall {cpu_ms:>9.1f} ms cpu")
+    await engine.dispose()
+
+
+async def run(args: argparse.Namespace) -> None:
+    rows = synthetic_rows(args.rows)
+    results = {}
+    print(f"{'path':<6} {'cpu ms':>9} {'peak MiB':>9}")
+    for label, path in (("orm", orm_path), ("rows", rows_path)):
+        cpu_ms, peak_mib, body = await measure(path, rows, args.iterations)
+        results[label] = (cpu_ms, peak_mib, body)
+        print(f"{label:<6} {cpu_ms:>9.1f} {peak_mib:>9.1f}")
+    assert results["orm"][2] == results["rows"][2], "the two paths must produce identical JSON"
+    orm_cpu, orm_peak, _ = results["orm"]
+    rows_cpu, rows_peak, _ = results["rows"]
+    print(f"rows path: {orm_cpu / rows_cpu:.1f}x less CPU, {orm_peak / rows_peak:.1f}x less peak memory")
+    if args.database:
+        await measure_database(args.rows, args.iterations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--database", action="store_true", help="Also time fetching the rows from DATABASE_URL")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Cold start time of the production server (python -m app.serve).
+
+Starts the server --runs times as a fresh process and measures the wall
+time until it answers its first request. Each run also reports the
+supervisor's own milestones from /system/startup, in ms since the
+supervisor module started:
+
+  imported  app and every router imported
+  warmed    mappers, OpenAPI schema and caches primed (needs the database)
+  ready     first worker accepting connections
+
+Then it stops the server with SIGTERM and times the shutdown. Exits
+non-zero when the median cold start is over --budget seconds.
+--imports N lists the N packages that take longest to import, each with
+whatever it imported first, from python -X importtime.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from statistics import median
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cold_start(workers: int, timeout: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while True:
+                if time.perf_counter() - started > timeout or server.poll() is not None:
+                    raise RuntimeError(f"server did not answer within {timeout}s (exit code {server.poll()})")
+                try:
+                    response = client.get("/system/startup")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+        answered = time.perf_counter() - started
+        phases = response.json()["phases"]
+        stopping = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+        return {"cold_start": answered, "shutdown": time.perf_counter() - stopping, **phases}
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+
+def slowest_imports(count: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.serve"], capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        # Packages only, each timed with everything it imported first
+        if "." not in name and not name.startswith("_"):
+            timings[name] = max(timings.get(name, 0), int(cumulative) / 1000)
+    print("\nslowest packages imported by app.serve:")
+    for name, elapsed in sorted(timings.items(), key=lambda item: -item[1])[:count]:
+        print(f"  {elapsed:>8.1f} ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds allowed for a cold start")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--imports", type=int, default=0, help="List this many of the slowest imports")
+    args = parser.parse_args()
+
+    # Compile once so no run pays for writing .pyc files
+    subprocess.run([sys.executable, "-m", "compileall", "-q", "app"], check=True, cwd=os.getcwd())
+    runs = [cold_start(args.workers, args.timeout) for _ in range(args.runs)]
+
+    print(f"{'run':>3} {'answered ms':>12} {'imported':>9} {'warmed':>9} {'ready':>9} {'shutdown ms':>12}")
+    for number, run in enumerate(runs, 1):
+        print(
+            f"{number:>3} {run['cold_start'] * 1000:>12.0f} {run.get('imported', 0):>9.0f} "
+            f"{run.get('warmed', 0):>9.0f} {run.get('ready', 0):>9.0f} {run['shutdown'] * 1000:>12.0f}"
+        )
+    typical = median(run["cold_start"] for run in runs)
+    verdict = "within" if typical <= args.budget else "OVER"
+    print(f"median cold start {typical * 1000:.0f} ms with {args.workers} workers, {verdict} the {args.budget:g}s budget")
+
+    if args.imports:
+        slowest_imports(args.imports)
+    if typical > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Micro-benchmark for the create/patch write path.
+
+Runs the same customer create and patch N times with the old commit-then-
+refresh pattern and with the current RETURNING-based path, against the
+database configured in DATABASE_URL, and reports mean latency and database
+round trips (statements plus BEGIN/COMMIT) per write.
+"""
+import argparse
+import asyncio
+import time
+from statistics import mean
+
+from sqlalchemy import event
+
+from app.database import AsyncSessionLocal, engine
+from app.models.customer import Customer
+from app.utils.crud import update_by_id
+
+import app.main  # noqa: F401  (configures every mapper)
+
+
+class RoundTripCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        sync_engine = engine.sync_engine
+        for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+            event.listen(sync_engine, name, self._increment)
+
+    def _increment(self, *args, **kwargs) -> None:
+        self.count += 1
+
+
+async def legacy_create(session, index: int) -> Customer:
+    customer = Customer(name=f"Bench {index}", phone="+15550000000")
+    session.add(customer)
+    await session.commit()
+    await session.refresh(customer)
+    return customer
+
+
+async def legacy_patch(session, customer_id, index: int) -> Customer:
+    customer = await session.get(Customer, customer_id)
+    customer.name = f"Bench {index} (edited)"
+    await session.commit()
+    await session.refresh(customer)
+    return customer
+
+
+async def returning_create(session, index: int) -> Customer:
+    customer = Customer(name=f"Bench {index}", phone="+15550000000")
+    session.add(customer)
+    await session.commit()
+    return customer
+
+
+async def returning_patch(session, customer_id, index: int) -> Customer:
+    customer = await update_by_id(session, Customer, customer_id, {"name": f"Bench {index} (edited)"})
+    await session.commit()
+    return customer
+
+
+async def measure(counter: RoundTripCounter, operation, arguments) -> tuple:
+    latencies = []
+    trips = []
+    results = []
+    for args in arguments:
+        # A fresh session per write, as each request gets one from get_db
+        async with AsyncSessionLocal() as session:
+            before = counter.count
+            started = time.perf_counter()
+            results.append(await operation(session, *args))
+            latencies.append(time.perf_counter() - started)
+            trips.append(counter.count - before)
+    return mean(latencies) * 1000, mean(trips), results
+
+
+async def run(iterations: int) -> None:
+    counter = RoundTripCounter()
+    # Warm the pool and statement caches so the first variant isn't penalized
+    await measure(counter, returning_create, [(0,)])
+
+    rows = {}
+    for label, create, patch in (
+        ("refresh", legacy_create, legacy_patch),
+        ("returning", returning_create, returning_patch),
+    ):
+        create_ms, create_trips, customers = await measure(counter, create, [(i,) for i in range(iterations)])
+        patch_ms, patch_trips, patched = await measure(
+            counter, patch, [(customer.id, i) for i, customer in enumerate(customers)]
+        )
+        assert all(customer.updated_at is not None for customer in patched)
+        rows[label] = (create_ms, create_trips, patch_ms, patch_trips)
+
+    print(f"{'path':<10} {'create ms':>10} {'trips':>6} {'patch ms':>10} {'trips':>6}")
+    for label, (create_ms, create_trips, patch_ms, patch_trips) in rows.items():
+        print(f"{label:<10} {create_ms:>10.2f} {create_trips:>6.1f} {patch_ms:>10.2f} {patch_trips:>6.1f}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.utils.coalesce import CoalescingMiddleware, Singleflight
+from app.utils.profiling import PROFILE_HEADER
+from app.utils.replicas import PRIMARY_PIN_COOKIE
+
+ROUTES = (("GET", "/appointments/"),)
+
+
+class Listing:
+    """An endpoint counting its runs, held at a gate until every request has arrived."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.gate = asyncio.Event()
+        self.fail = False
+
+    def app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/appointments/")
+        async def list_appointments(barber_id: str = ""):
+            self.runs += 1
+            await self.gate.wait()
+            if self.fail:
+                raise RuntimeError("listing failed")
+            return {"barber_id": barber_id, "run": self.runs}
+
+        @app.get("/shops/")
+        async def list_shops():
+            self.runs += 1
+            await self.gate.wait()
+            return {"run": self.runs}
+
+        return app
+
+
+def client(listing: Listing, flights: Singleflight) -> httpx.AsyncClient:
+    app = CoalescingMiddleware(listing.app(), flights=flights, routes=ROUTES)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def burst(listing: Listing, requests) -> list:
+    """Send every request at once, opening the gate once they've all reached the app."""
+    tasks = [asyncio.create_task(request) for request in requests]
+    for _ in range(100):
+        await asyncio.sleep(0.001)
+    listing.gate.set()
+    return await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_gets_share_one_run():
+    listing, flights = Listing(), Singleflight()
+    async with client(listing, flights) as http:
+        responses = await burst(listing, [http.get("/appointments/", params={"barber_id": "a"}) for _ in range(20)])
+
+    assert listing.runs == 1
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json() == {"barber_id": "a", "run": 1} for response in responses)
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 19}
+
+
+@pytest.mark.asyncio
+async def test_different_queries_run_separately():
+    listing, flights = Listing(), Singleflight()
+    async with client(listing, flights) as http:
+        responses = await burst(
+            listing, [http.get("/appointments/", params={"barber_id": barber}) for barber in "abab"]
+        )
+
+    assert listing.runs == 2
+    assert [response.json()["barber_id"] for response in responses] == list("abab")
+
+
+@pytest.mark.asyncio
+async def test_requests_that_must_run_alone_are_not_shared():
+    listing, flights = Listing(), Singleflight()
+    pinned = {"Cookie": f"{PRIMARY_PIN_COOKIE}={int(time.time()) + 60}"}
+    async with client(listing, flights) as http:
+        await burst(
+            listing,
+            [
+                http.get("/appointments/"),
+                http.get("/appointments/", headers={"Cache-Control": "no-cache"}),
+                http.get("/appointments/", headers={PROFILE_HEADER: "1"}),
+                http.get("/appointments/", headers=pinned),
+                http.get("/shops/"),
+                http.get("/shops/"),
+            ],
+        )
+
+    assert listing.runs == 6
+    assert flights.leaders == 1 and flights.followers == 0
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_kept_after_the_response():
+    listing, flights = Listing(), Singleflight()
+    listing.gate.set()
+    async with client(listing, flights) as http:
+        first = await http.get("/appointments/")
+        second = await http.get("/appointments/")
+
+    assert (first.json()["run"], second.json()["run"]) == (1, 2)
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller():
+    listing, flights = Listing(), Singleflight()
+    listing.fail = True
+    async with client(listing, flights) as http:
+        responses = await burst(listing, [http.get("/appointments/") for _ in range(5)])
+
+    assert listing.runs == 1
+    assert all(response.status_code == 500 for response in responses)
+
+
+@pytest.mark.asyncio
+async def test_singleflight_survives_a_cancelled_caller():
+    flights = Singleflight()
+    gate = asyncio.Event()
+
+    async def call():
+        await gate.wait()
+        return "done"
+
+    leader = asyncio.create_task(flights.do("key", call))
+    follower = asyncio.create_task(flights.do("key", call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    gate.set()
+
+    assert await follower == "done"
+    assert leader.cancelled()
@@ -0,0 +1,130 @@
+"""Statements per page of ?expand= must not grow with the page size.
+
+Needs the database in DATABASE_URL, with init/init.sql applied; skipped
+when it can't be reached. Each run adds a shop with one barber, a few
+hundred appointments and their customers.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, exc, text
+
+from app.database import engine, replicas
+from app.main import app
+
+PAGE_SIZES = (10, 50, 200)
+CUSTOMERS = max(PAGE_SIZES)
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        self.engines = [engine.sync_engine, *(replica.engine.sync_engine for replica in replicas.replicas)]
+        for sync_engine in self.engines:
+            event.listen(sync_engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args, **kwargs) -> None:
+        self.count += 1
+
+    def remove(self) -> None:
+        for sync_engine in self.engines:
+            event.remove(sync_engine, "before_cursor_execute", self._increment)
+
+
+@pytest_asyncio.fixture
+async def client():
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except (OSError, exc.DBAPIError) as error:
+        await engine.dispose()
+        pytest.skip(f"no database at DATABASE_URL: {error}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+    await engine.dispose()
+
+
+@pytest.fixture
+def counter():
+    counter = StatementCounter()
+    yield counter
+    counter.remove()
+
+
+async def create(client: httpx.AsyncClient, path: str, payload) -> dict:
+    response = await client.post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def seed(client: httpx.AsyncClient) -> dict:
+    """One barber with max(PAGE_SIZES) appointments, one per customer."""
+    shop = await create(client, "/shops/", {"name": f"test-{uuid.uuid4().hex[:8]}"})
+    service = await create(
+        client, "/services/", {"shop_id": shop["id"], "name": "Cut", "price": 2500, "duration_minutes": 30}
+    )
+    barber = await create(
+        client,
+        "/barbers/",
+        {
+            "shop_id": shop["id"],
+            "name": "Test Barber",
+            "days_on": ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"],
+            "working_hours": [{"start": "00:00", "end": "24:00"}],
+        },
+    )
+    customer_ids = [
+        (await create(client, "/customers/", {"name": f"Test Customer {index}", "phone": "+15550000000"}))["id"]
+        for index in range(CUSTOMERS)
+    ]
+    base = datetime(2031, 1, 6, tzinfo=timezone.utc)
+    operations = [
+        {
+            "action": "create",
+            "data": {
+                "barber_id": barber["id"],
+                "customer_id": customer_id,
+                "service_id": service["id"],
+                "appointment_date": (base + timedelta(minutes=30 * index)).isoformat(),
+                "duration_minutes": 30,
+                "price": 2500,
+            },
+        }
+        for index, customer_id in enumerate(customer_ids)
+    ]
+    result = await create(client, "/appointments/batch", {"operations": operations})
+    assert result["committed"], result["results"][:3]
+    return {"barber_id": barber["id"]}
+
+
+async def statements_per_page(client, counter, path: str, params: dict) -> dict:
+    # Warm up first, so caches filled on first use don't count against the smallest page
+    (await client.get(path, params={**params, "limit": 1})).raise_for_status()
+    counts = {}
+    for size in PAGE_SIZES:
+        before = counter.count
+        response = await client.get(path, params={**params, "limit": size})
+        response.raise_for_status()
+        items = response.json()
+        assert len(items) == size
+        for name in params["expand"].split(","):
+            assert name in items[0]
+        counts[size] = counter.count - before
+    return counts
+
+
+@pytest.mark.asyncio
+async def test_expand_query_count_is_constant(client, counter):
+    fixture = await seed(client)
+
+    appointments = await statements_per_page(
+        client, counter, "/appointments/", {"barber_id": fixture["barber_id"], "expand": "barber,service,customer"}
+    )
+    customers = await statements_per_page(client, counter, "/customers/", {"expand": "appointments"})
+
+    assert len(set(appointments.values())) == 1, appointments
+    assert len(set(customers.values())) == 1, customers
@@ -0,0 +1,213 @@
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.utils.idempotency import IdempotencyMiddleware, IdempotencyStore, StoredResponse
+
+ROUTES = (("POST", "/appointments/"), ("PATCH", "/appointments/{appointment_id}"))
+APPOINTMENT_ID = "5b0c6b1e-8d4f-4a8e-9a43-2f6d3c1b7e10"
+
+
+class MemoryStore(IdempotencyStore):
+    """IdempotencyStore keeping keys in a dict instead of idempotency_keys."""
+
+    def __init__(self, pending_seconds: int = 60) -> None:
+        super().__init__(sessions=None, ttl_seconds=3600, pending_seconds=pending_seconds, sweep_interval=3600)
+        self.rows: Dict[str, StoredResponse] = {}
+        self.extended = 0
+
+    async def claim(self, key: str, request_fingerprint: bytes) -> Optional[StoredResponse]:
+        if key not in self.rows:
+            self.rows[key] = StoredResponse(request_fingerprint, None, None, None)
+            return None
+        return self.rows[key]
+
+    async def complete(self, key, request_fingerprint, status_code, content_type, body) -> None:
+        row = self.rows.get(key)
+        if row is not None and row.fingerprint == request_fingerprint:
+            self.rows[key] = StoredResponse(request_fingerprint, status_code, content_type, body)
+            self.counts["stored"] += 1
+
+    async def extend(self, key: str, request_fingerprint: bytes) -> None:
+        self.extended += 1
+
+    async def release(self, key: str, request_fingerprint: bytes) -> None:
+        if key in self.rows and self.rows[key].fingerprint == request_fingerprint:
+            del self.rows[key]
+        self.counts["released"] += 1
+
+
+class Booking:
+    """An endpoint counting its runs, with a gate to hold them mid-request."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.started = asyncio.Event()
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.status_code = 201
+        self.fail = False
+
+    def app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/appointments/")
+        async def create(payload: dict):
+            self.runs += 1
+            self.started.set()
+            await self.gate.wait()
+            if self.fail:
+                raise RuntimeError("booking failed")
+            return JSONResponse({"run": self.runs, **payload}, status_code=self.status_code)
+
+        @app.post("/shops/")
+        async def create_shop(payload: dict):
+            self.runs += 1
+            return {"run": self.runs}
+
+        return app
+
+
+def client(booking: Booking, store: MemoryStore) -> httpx.AsyncClient:
+    app = IdempotencyMiddleware(booking.app(), store=store, routes=ROUTES)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def keyed(key: str) -> dict:
+    return {"Idempotency-Key": key}
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_stored_response():
+    booking, store = Booking(), MemoryStore()
+    async with client(booking, store) as http:
+        first = await http.post("/appointments/", json={"notes": "a"}, headers=keyed("k1"))
+        retry = await http.post("/appointments/", json={"notes": "a"}, headers=keyed("k1"))
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() == {"run": 1, "notes": "a"}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["content-type"] == "application/json"
+    assert "idempotent-replayed" not in first.headers
+    assert booking.runs == 1
+    assert store.counts["stored"] == 1 and store.counts["replayed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_stored_too():
+    booking, store = Booking(), MemoryStore()
+    booking.status_code = 409
+    async with client(booking, store) as http:
+        first = await http.post("/appointments/", json={}, headers=keyed("k1"))
+        retry = await http.post("/appointments/", json={}, headers=keyed("k1"))
+
+    assert first.status_code == retry.status_code == 409
+    assert booking.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_repeat_while_running_gets_409():
+    booking, store = Booking(), MemoryStore()
+    booking.gate.clear()
+    async with client(booking, store) as http:
+        first = asyncio.create_task(http.post("/appointments/", json={}, headers=keyed("k1")))
+        await booking.started.wait()
+        repeat = await http.post("/appointments/", json={}, headers=keyed("k1"))
+        booking.gate.set()
+        first = await first
+
+    assert repeat.status_code == 409
+    assert repeat.headers["retry-after"] == "1"
+    assert first.status_code == 201
+    assert booking.runs == 1
+    assert store.counts["in_progress"] == 1
+
+
+@pytest.mark.asyncio
+async def test_key_reused_for_different_request_gets_422():
+    booking, store = Booking(), MemoryStore()
+    async with client(booking, store) as http:
+        await http.post("/appointments/", json={"notes": "a"}, headers=keyed("k1"))
+        other_body = await http.post("/appointments/", json={"notes": "b"}, headers=keyed("k1"))
+        other_path = await http.patch(f"/appointments/{APPOINTMENT_ID}", json={"notes": "a"}, headers=keyed("k1"))
+
+    assert other_body.status_code == other_path.status_code == 422
+    assert booking.runs == 1
+    assert store.counts["mismatched"] == 2
+
+
+@pytest.mark.asyncio
+async def test_server_error_releases_key():
+    booking, store = Booking(), MemoryStore()
+    booking.status_code = 503
+    async with client(booking, store) as http:
+        first = await http.post("/appointments/", json={}, headers=keyed("k1"))
+        booking.status_code = 201
+        retry = await http.post("/appointments/", json={}, headers=keyed("k1"))
+
+    assert first.status_code == 503
+    assert retry.status_code == 201
+    assert "idempotent-replayed" not in retry.headers
+    assert booking.runs == 2
+    assert store.counts["released"] == 1
+
+
+@pytest.mark.asyncio
+async def test_exception_releases_key():
+    booking, store = Booking(), MemoryStore()
+    booking.fail = True
+    async with client(booking, store) as http:
+        first = await http.post("/appointments/", json={}, headers=keyed("k1"))
+        booking.fail = False
+        retry = await http.post("/appointments/", json={}, headers=keyed("k1"))
+
+    assert first.status_code == 500
+    assert retry.status_code == 201
+    assert booking.runs == 2
+    assert store.counts["released"] == 1
+
+
+@pytest.mark.asyncio
+async def test_claim_is_renewed_while_request_runs():
+    booking, store = Booking(), MemoryStore(pending_seconds=0.03)
+    booking.gate.clear()
+    async with client(booking, store) as http:
+        first = asyncio.create_task(http.post("/appointments/", json={}, headers=keyed("k1")))
+        await booking.started.wait()
+        await asyncio.sleep(0.1)
+        booking.gate.set()
+        assert (await first).status_code == 201
+
+    renewals = store.extended
+    assert renewals >= 2
+    await asyncio.sleep(0.05)
+    assert store.extended == renewals
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_or_to_other_routes_pass_through():
+    booking, store = Booking(), MemoryStore()
+    async with client(booking, store) as http:
+        await http.post("/appointments/", json={})
+        await http.post("/appointments/", json={})
+        await http.post("/shops/", json={}, headers=keyed("k1"))
+        await http.post("/shops/", json={}, headers=keyed("k1"))
+
+    assert booking.runs == 4
+    assert store.rows == {}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("key", ["", "   ", "k" * 256])
+async def test_invalid_key_is_rejected(key):
+    booking, store = Booking(), MemoryStore()
+    async with client(booking, store) as http:
+        response = await http.post("/appointments/", json={}, headers=keyed(key))
+
+    assert response.status_code == 400
+    assert booking.runs == 0
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta, timezone
+from datetime import time as clock
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.availability_service import BarberSchedule, interval_mask
+from app.utils.timezones import local_day
+
+ZONES = (
+    "UTC",
+    "America/New_York",
+    "America/Sao_Paulo",  # changed at local midnight until 2019
+    "America/Santiago",  # changes at local midnight
+    "America/Havana",  # changes at local midnight
+    "Europe/London",
+    "Europe/Dublin",  # "negative" DST in tzdata
+    "Australia/Sydney",
+    "Australia/Lord_Howe",  # 30-minute DST
+    "Asia/Kolkata",
+    "Asia/Beirut",
+)
+YEARS = (2012, 2019, 2024, 2025, 2026)
+WORKING_HOURS = [
+    {"start": "00:30", "end": "02:30"},
+    {"start": "09:00", "end": "17:00"},
+    {"start": "23:00", "end": "24:00"},
+]
+ALL_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def utc_minute(day: date, wall_minute: int, tz: ZoneInfo) -> int:
+    """What zoneinfo itself says a local wall-clock minute is in UTC (fold=0)."""
+    if wall_minute >= 24 * 60:
+        return int(datetime.combine(day + timedelta(days=1), clock(), tzinfo=tz).timestamp()) // 60
+    moment = datetime.combine(day, clock(wall_minute // 60, wall_minute % 60), tzinfo=tz)
+    return int(moment.timestamp()) // 60
+
+
+def minutes(value: str) -> int:
+    hours, minute = value.split(":")
+    return int(hours) * 60 + int(minute)
+
+
+def days_of(year: int):
+    day = date(year, 1, 1)
+    while day.year == year:
+        yield day
+        day += timedelta(days=1)
+
+
+@pytest.mark.parametrize("year", YEARS)
+@pytest.mark.parametrize("zone_name", ZONES)
+def test_local_days_match_zoneinfo(zone_name, year):
+    tz = ZoneInfo(zone_name)
+    schedule = BarberSchedule.from_barber(None, ALL_DAYS, WORKING_HOURS)
+    for day in days_of(year):
+        local = local_day(zone_name, day)
+        assert (local.start, local.end) == (utc_minute(day, 0, tz), utc_minute(day, 24 * 60, tz)), day
+
+        expected = 0
+        for interval in WORKING_HOURS:
+            start = utc_minute(day, minutes(interval["start"]), tz) - local.start
+            end = utc_minute(day, minutes(interval["end"]), tz) - local.start
+            expected |= interval_mask(start, end, local.length)
+        assert schedule.day_mask(local) == expected, day
+
+        if not local.delta:
+            continue
+        # Minute by minute on the days the offset changes
+        for wall in range(24 * 60):
+            assert local.start + local.elapsed(wall) == utc_minute(day, wall, tz), (day, wall)
+        for elapsed in range(local.length):
+            moment = datetime.fromtimestamp((local.start + elapsed) * 60, tz=timezone.utc).astimezone(tz)
+            assert local.wall(elapsed) == moment.hour * 60 + moment.minute, (day, elapsed)
+
+
+@pytest.mark.parametrize(
+    "zone_name, day",
+    [
+        ("Europe/London", date(2025, 3, 30)),
+        ("Europe/London", date(2025, 10, 26)),
+        ("America/Santiago", date(2025, 9, 7)),
+        ("Australia/Lord_Howe", date(2025, 4, 6)),
+    ],
+)
+def test_matrix_covers_offset_changes(zone_name, day):
+    assert local_day(zone_name, day).delta